@@ -0,0 +1,443 @@
+# Performance Benchmark Suite
+# חבילת מדידת ביצועים
+
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from financial_metrics import BASE_COLUMNS
+
+DEFAULT_HISTORY = 'benchmark_history.json'
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+DEFAULT_THRESHOLD = 0.20
+
+
+def synthetic_ledger(months=36, line_items=1, seed=0, start='2025-01-01', scale=1.0):
+    """
+    Generate a ledger in the shape of agent_test.csv
+
+    Revenue follows a growing trend with quarterly seasonality and noise;
+    costs are proportional to revenue as in the sample ledger.
+
+    Args:
+        months (int): Number of months
+        line_items (int): Postings per month (rows sharing the same month)
+        seed (int): Random seed
+        start (str): First month
+        scale (float): Revenue scale factor
+
+    Returns:
+        pd.DataFrame: Raw ledger with the columns of BASE_COLUMNS
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=months, freq='MS')
+    t = np.arange(months)
+    monthly = scale * 5000 * (1.02 ** t) * (1 + 0.3 * np.sin(2 * np.pi * t / 12))
+
+    n = months * line_items
+    revenue = np.repeat(monthly / line_items, line_items) * rng.uniform(0.8, 1.2, n)
+    revenue = revenue.round(2)
+    df = pd.DataFrame({
+        'monthes': np.repeat(dates.strftime('%b-%y'), line_items),
+        'revenue': revenue,
+        'opex': (revenue * rng.uniform(0.08, 0.12, n)).round(2),
+        'tax': (revenue * rng.uniform(0.18, 0.22, n)).round(3),
+        'fianance cost': np.full(n, 120.0 / line_items),
+        'sg@a': np.full(n, 360.0 / line_items),
+    })
+    return df[BASE_COLUMNS]
+
+
+def synthetic_ledgers(entities=10, months=36, line_items=1, seed=0):
+    """Generate one ledger per entity with different scales and seeds"""
+    return {f'entity_{i:04d}': synthetic_ledger(months, line_items, seed=seed + i, scale=1 + i % 7)
+            for i in range(entities)}
+
+
+def _quiet(func, *args, **kwargs):
+    """Call func with stdout suppressed (the analysis functions print their results)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def _peak_rss_mb():
+    """Peak RSS of the whole process so far (ru_maxrss never decreases, so it is not per case)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 1024 / (1024 if platform.system() == 'Darwin' else 1)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark cases
+#
+# Each case receives the context built by build_context() and returns the
+# number of ledger rows it processed, used for the throughput figure.
+# ---------------------------------------------------------------------------
+
+def _case_load_financial_data(ctx):
+    from financial_analysis_crew import load_financial_data
+    _quiet(load_financial_data, ctx['csv_path'])
+    return ctx['rows']
+
+
+def _case_load_and_analyze_data(ctx):
+    from detailed_results import load_and_analyze_data
+    load_and_analyze_data(ctx['csv_path'])
+    return ctx['rows']
+
+
+def _case_load_and_prepare_data(ctx):
+    from create_visualizations import load_and_prepare_data
+    load_and_prepare_data(ctx['csv_path'])
+    return ctx['rows']
+
+
+def _case_calculate_correct_npv(ctx):
+    from detailed_results import calculate_correct_npv
+    calculate_correct_npv(ctx['analyzed']['net_profit_after_tax'].values)
+    return ctx['rows']
+
+
+def _case_quarterly_groupby(ctx):
+    ctx['analyzed'].groupby('quarter_label').agg({
+        'revenue': 'sum',
+        'net_profit_after_tax': 'sum',
+        'npv_net_profit': 'sum'
+    }).round(2)
+    return ctx['rows']
+
+
+def _case_build_cube(ctx):
+    from financial_cube import FinancialCube
+    FinancialCube(ctx['analyzed'])
+    return ctx['rows']
+
+
+def _case_cube_quarterly(ctx):
+    ctx['cube'].quarterly(['revenue', 'net_profit_after_tax', 'npv_net_profit']).round(2)
+    return ctx['rows']
+
+
+def _case_store_quarterly(ctx):
+    ctx['store'].quarterly(ctx['entity'])
+    return ctx['rows']
+
+
+def _case_store_quarter_lookup(ctx):
+    ctx['store'].value(ctx['entity'], 'revenue', 2025, quarter=3)
+    return 1
+
+
+def _case_agent_tools(ctx):
+    from financial_tools import FinancialToolkit
+    # A fresh toolkit per call: every tool runs cold, as on a crew's first calls
+    toolkit = FinancialToolkit(ctx['analyzed'])
+    toolkit.quarterly_segmentation()
+    toolkit.npv(0.06)
+    toolkit.growth_rates('net_profit_after_tax')
+    toolkit.scenario_forecast(ctx['months_ahead'])
+    toolkit.cost_structure()
+    return ctx['rows']
+
+
+def _case_create_monthly_forecast_table(ctx):
+    from detailed_results import create_monthly_forecast_table
+    _quiet(create_monthly_forecast_table, ctx['analyzed'], months_ahead=ctx['months_ahead'], export_to_file=False)
+    return ctx['months_ahead'] * 3
+
+
+def _case_export_forecast_data(ctx):
+    from detailed_results import export_forecast_data
+    # A fresh directory per call, so the export manifest never short-circuits the write
+    with tempfile.TemporaryDirectory(dir=ctx['work_dir']) as output_dir:
+        _quiet(export_forecast_data, ctx['forecast'], ctx['months_ahead'], output_dir=output_dir)
+    return ctx['months_ahead'] * 3
+
+
+def _case_compute_detailed_results(ctx):
+    from detailed_results import compute_detailed_results
+    compute_detailed_results(ctx['analyzed'], months_ahead=ctx['months_ahead'])
+    return ctx['rows']
+
+
+def _case_render_chart(ctx):
+    import matplotlib
+    matplotlib.use('Agg')
+    from create_visualizations import render_chart
+    render_chart(ctx['prepared'], '01_revenue_vs_profit', output_dir=ctx['work_dir'], profile='preview')
+    return ctx['rows']
+
+
+def _case_render_dashboard(ctx):
+    import matplotlib
+    matplotlib.use('Agg')
+    from create_visualizations import DASHBOARD_NAME, render_chart
+    render_chart(ctx['prepared'], DASHBOARD_NAME, output_dir=ctx['work_dir'], profile='preview')
+    return ctx['rows']
+
+
+BENCHMARK_CASES = {
+    'load_financial_data': _case_load_financial_data,
+    'load_and_analyze_data': _case_load_and_analyze_data,
+    'load_and_prepare_data': _case_load_and_prepare_data,
+    'calculate_correct_npv': _case_calculate_correct_npv,
+    'quarterly_groupby': _case_quarterly_groupby,
+    'build_cube': _case_build_cube,
+    'cube_quarterly': _case_cube_quarterly,
+    'store_quarterly': _case_store_quarterly,
+    'store_quarter_lookup': _case_store_quarter_lookup,
+    'agent_tools': _case_agent_tools,
+    'create_monthly_forecast_table': _case_create_monthly_forecast_table,
+    'export_forecast_data': _case_export_forecast_data,
+    'compute_detailed_results': _case_compute_detailed_results,
+    'render_chart': _case_render_chart,
+    'render_dashboard': _case_render_dashboard,
+}
+
+
+def build_context(work_dir, months=36, line_items=1, months_ahead=60, seed=0, entity='synthetic_ledger'):
+    """
+    Write a synthetic ledger to work_dir and prepare the inputs shared by all cases
+
+    The CSV and the ledger store are named after the entity, so the
+    contexts of several entities in one work_dir do not overwrite each other.
+    """
+    from detailed_results import forecast_scenarios, load_and_analyze_data
+    from create_visualizations import load_and_prepare_data
+    from financial_cube import FinancialCube
+    from ledger_store import LedgerStore
+
+    ledger = synthetic_ledger(months, line_items, seed=seed)
+    csv_path = os.path.join(work_dir, f'{entity}.csv')
+    ledger.to_csv(csv_path, index=False)
+    analyzed = load_and_analyze_data(csv_path)
+    store = LedgerStore(os.path.join(work_dir, f'{entity}_store.db'))
+    store.ingest(csv_path, entity=entity)
+    return {
+        'work_dir': work_dir,
+        'entity': entity,
+        'csv_path': csv_path,
+        'rows': len(ledger),
+        'months_ahead': months_ahead,
+        'analyzed': analyzed,
+        'prepared': load_and_prepare_data(csv_path),
+        'forecast': forecast_scenarios(analyzed, months_ahead),
+        'store': store,
+        'cube': FinancialCube(analyzed),
+    }
+
+
+def run_case(case, ctx, repeats=20, warmup=1):
+    """
+    Time one benchmark case
+
+    Returns:
+        dict: Latency percentiles (ms), throughput (rows/s) and the process's peak RSS so far (MB)
+    """
+    for _ in range(warmup):
+        case(ctx)
+
+    latencies = []
+    rows = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rows += case(ctx)
+        latencies.append(time.perf_counter() - start)
+
+    latencies = np.array(latencies) * 1000
+    return {
+        'repeats': repeats,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p90_ms': float(np.percentile(latencies, 90)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'mean_ms': float(latencies.mean()),
+        'rows_per_s': float(rows / (latencies.sum() / 1000)) if latencies.sum() else None,
+        'process_peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def run_benchmarks(cases=None, months=36, entities=1, line_items=1, months_ahead=60, repeats=20, seed=0):
+    """
+    Run benchmark cases on synthetic ledgers
+
+    With entities > 1, every case is run once per entity ledger and the
+    latencies are pooled.
+
+    Args:
+        cases (list, optional): Case names (default: all of BENCHMARK_CASES)
+        months (int): Months per synthetic ledger
+        entities (int): Number of synthetic entities
+        line_items (int): Postings per month
+        months_ahead (int): Forecast horizon
+        repeats (int): Timed calls per case and entity
+        seed (int): Random seed
+
+    Returns:
+        dict: Run record with parameters, environment and per-case results
+    """
+    cases = cases or list(BENCHMARK_CASES)
+    params = {'months': months, 'entities': entities, 'line_items': line_items,
+              'months_ahead': months_ahead, 'repeats': repeats, 'seed': seed}
+    results = {}
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        contexts = [build_context(work_dir, months, line_items, months_ahead, seed=seed + i,
+                                  entity=f'entity_{i:04d}' if entities > 1 else 'synthetic_ledger')
+                    for i in range(entities)]
+        for name in cases:
+            try:
+                per_entity = [run_case(BENCHMARK_CASES[name], ctx, repeats) for ctx in contexts]
+            except ImportError as e:
+                print(f"⚠️ Skipping {name}: {e}")
+                continue
+            results[name] = per_entity[0] if entities == 1 else _pool(per_entity)
+            print(f"⏱️ {name:<32} p50 {results[name]['p50_ms']:>9.2f} ms")
+        for ctx in contexts:
+            ctx['store'].close()
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'params': params,
+        'results': results,
+    }
+
+
+def _pool(per_entity):
+    """Combine per-entity results: mean of percentiles, overall throughput, process peak RSS"""
+    pooled = {key: float(np.mean([r[key] for r in per_entity]))
+              for key in ['p50_ms', 'p90_ms', 'p99_ms', 'mean_ms']}
+    # All rows over all timed seconds, not the mean of the per-entity rates
+    seconds = [r['mean_ms'] * r['repeats'] / 1000 for r in per_entity]
+    rows = sum((r['rows_per_s'] or 0) * second for r, second in zip(per_entity, seconds))
+    pooled['rows_per_s'] = rows / sum(seconds) if sum(seconds) else None
+    pooled['repeats'] = sum(r['repeats'] for r in per_entity)
+    pooled['process_peak_rss_mb'] = per_entity[-1]['process_peak_rss_mb']
+    return pooled
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def append_history(run, path=DEFAULT_HISTORY):
+    """Append a run record to the JSON history file"""
+    history = []
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as fh:
+            history = json.load(fh)
+    history.append(run)
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(history, fh, indent=2)
+
+
+def save_baseline(run, path=DEFAULT_BASELINE):
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(run, fh, indent=2)
+    print(f"✅ Baseline saved: {path}")
+
+
+def find_regressions(run, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare median latencies against a baseline run
+
+    Args:
+        run (dict): Current run record
+        baseline (dict): Baseline run record
+        threshold (float): Allowed relative slowdown (0.2 = 20%)
+
+    Returns:
+        list: (case, baseline p50, current p50, ratio) for every regressed case
+    """
+    if baseline.get('params') != run['params']:
+        print("⚠️ Baseline was recorded with different parameters; comparison may be meaningless")
+
+    regressions = []
+    for name, result in run['results'].items():
+        base = baseline['results'].get(name)
+        if not base or not base['p50_ms']:
+            continue
+        ratio = result['p50_ms'] / base['p50_ms']
+        if ratio > 1 + threshold:
+            regressions.append((name, base['p50_ms'], result['p50_ms'], ratio))
+    return regressions
+
+
+def print_benchmark_report(run, baseline=None, threshold=DEFAULT_THRESHOLD):
+    """Print the results table and, with a baseline, the change per case"""
+    print(f"\n📊 BENCHMARK RESULTS ({run['params']['entities']} entities x {run['params']['months']} months, "
+          f"{run['params']['line_items']} line items)")
+    # RSS is the process peak so far (ru_maxrss), not the peak of each case
+    print(f"{'Case':<32} {'p50 (ms)':>10} {'p90 (ms)':>10} {'p99 (ms)':>10} {'rows/s':>12} {'Peak MB':>10} {'vs base':>9}")
+    print("-" * 99)
+    for name, result in run['results'].items():
+        change = ''
+        if baseline and name in baseline['results'] and baseline['results'][name]['p50_ms']:
+            ratio = result['p50_ms'] / baseline['results'][name]['p50_ms']
+            change = f"{(ratio - 1) * 100:+.0f}%"
+            if ratio > 1 + threshold:
+                change += ' ❌'
+        peak = result.get('process_peak_rss_mb')
+        rss = f"{peak:.0f}" if peak is not None else '-'
+        print(f"{name:<32} {result['p50_ms']:>10.2f} {result['p90_ms']:>10.2f} {result['p99_ms']:>10.2f} "
+              f"{result['rows_per_s'] or 0:>12,.0f} {rss:>10} {change:>9}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Benchmark the analytics, forecasting, export and chart paths")
+    parser.add_argument('--cases', nargs='+', choices=list(BENCHMARK_CASES), help="Cases to run (default: all)")
+    parser.add_argument('--months', type=int, default=36)
+    parser.add_argument('--entities', type=int, default=1)
+    parser.add_argument('--line-items', type=int, default=1)
+    parser.add_argument('--months-ahead', type=int, default=60)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--history', default=DEFAULT_HISTORY)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    run = run_benchmarks(args.cases, args.months, args.entities, args.line_items, args.months_ahead, args.repeats)
+    append_history(run, args.history)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as fh:
+            baseline = json.load(fh)
+    print_benchmark_report(run, baseline, args.threshold)
+
+    if args.save_baseline:
+        save_baseline(run, args.baseline)
+    elif baseline:
+        regressions = find_regressions(run, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) above {args.threshold:.0%}:")
+            for name, base, current, ratio in regressions:
+                print(f"   {name}: {base:.2f} ms -> {current:.2f} ms ({ratio:.2f}x)")
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
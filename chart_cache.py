@@ -0,0 +1,176 @@
+# Content-Addressed Chart Cache
+# מטמון גרפים לפי תוכן
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+# Default cache size limit: 512 MB
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Eviction trims the cache to this fraction of max_bytes, so a full cache is
+# not rescanned on every store
+EVICT_TARGET = 0.9
+
+
+def hash_series(hasher, series):
+    """Feed a pandas Series into a hashlib object, independent of its index"""
+    hasher.update(str(series.name).encode('utf-8'))
+    hasher.update(pd.util.hash_pandas_object(series, index=False).values.tobytes())
+
+
+def chart_cache_key(series, style):
+    """
+    Build the cache key of a chart
+
+    Args:
+        series (list): The pandas Series plotted by the chart
+        style (dict): JSON-serializable style parameters (figsize, dpi, colors, ...)
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    hasher = hashlib.sha256()
+    for s in series:
+        hash_series(hasher, s)
+    hasher.update(json.dumps(style, sort_keys=True, default=str).encode('utf-8'))
+    return hasher.hexdigest()
+
+
+class ChartCache:
+    """
+    Directory of rendered chart files named by content hash
+
+    Entries are evicted least-recently-used first once the total size of the
+    cache exceeds max_bytes. The directory is scanned once to build an
+    in-memory index of entry sizes and access times; stores and hits keep it
+    and the running byte total up to date, and the directory is only
+    rescanned (picking up entries written by other processes) when the total
+    goes over the limit.
+    """
+
+    def __init__(self, cache_dir='.chart_cache', max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._index = None
+        self._total = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, key, ext):
+        return os.path.join(self.cache_dir, key[:2], f'{key}{ext}')
+
+    def fetch(self, key, dest_path):
+        """
+        Copy a cached artifact to dest_path
+
+        Returns:
+            bool: True on a cache hit, False if the chart must be rendered
+        """
+        entry = self._entry_path(key, os.path.splitext(dest_path)[1])
+        try:
+            _atomic_copy(entry, dest_path)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        # Mark the entry as recently used for eviction
+        try:
+            os.utime(entry)
+            self._touch(entry)
+        except FileNotFoundError:
+            pass
+        self.hits += 1
+        return True
+
+    def store(self, key, src_path):
+        """Add a freshly rendered artifact to the cache and enforce the size limit"""
+        entry = self._entry_path(key, os.path.splitext(src_path)[1])
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        _atomic_copy(src_path, entry)
+        self._touch(entry)
+        if self._total > self.max_bytes:
+            self.evict()
+
+    def size(self):
+        """Return the total size of all cached artifacts in bytes"""
+        self._load_index()
+        return self._total
+
+    def _load_index(self, rescan=False):
+        """Build the in-memory index from the cache directory on first use"""
+        if self._index is not None and not rescan:
+            return
+        self._index = {path: (mtime, size) for mtime, path, size in self._entries()}
+        self._total = sum(size for _, size in self._index.values())
+
+    def _touch(self, path):
+        """Record a stored or hit entry in the index and the running total"""
+        if self._index is None:
+            # The first scan already sees the entry
+            self._load_index()
+            return
+        stat = os.stat(path)
+        _, old_size = self._index.get(path, (0, 0))
+        self._index[path] = (stat.st_mtime, stat.st_size)
+        self._total += stat.st_size - old_size
+
+    def _entries(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.startswith('.tmp_'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+    def evict(self):
+        """
+        Remove least-recently-used artifacts once the cache exceeds max_bytes
+
+        Rescans the directory, then trims the cache to EVICT_TARGET of max_bytes.
+
+        Returns:
+            int: Number of artifacts removed
+        """
+        self._load_index(rescan=True)
+        if self._total <= self.max_bytes:
+            return 0
+        target = self.max_bytes * EVICT_TARGET
+        removed = 0
+        for path, (_, size) in sorted(self._index.items(), key=lambda item: item[1]):
+            if self._total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            del self._index[path]
+            self._total -= size
+            removed += 1
+        return removed
+
+
+def _atomic_copy(src, dest):
+    """Copy src to dest through a temporary file in the destination directory"""
+    if not os.path.exists(src):
+        raise FileNotFoundError(src)
+    directory = os.path.dirname(dest) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', suffix=os.path.splitext(dest)[1], dir=directory)
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, dest)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
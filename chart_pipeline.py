@@ -0,0 +1,131 @@
+# Parallel Headless Chart Rendering Pipeline
+# צינור יצירת גרפים מקבילי ללא תצוגה
+
+import os
+
+# Use the non-interactive backend before pyplot is imported anywhere
+import matplotlib
+matplotlib.use('Agg')
+
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from chart_cache import DEFAULT_MAX_BYTES, ChartCache
+from chart_templates import TemplateRenderer
+from create_visualizations import CHART_SPECS, DASHBOARD_NAME, load_and_prepare_data, render_chart
+
+# All charts of a chart pack: the eight individual charts plus the dashboard
+CHART_NAMES = [name for name, _, _ in CHART_SPECS] + [DASHBOARD_NAME]
+# Entities per worker job; a job renders one chart for all of them on one reused figure
+ENTITIES_PER_JOB = 8
+
+
+def _render_job(job):
+    """Render one chart for a group of entities in a worker process, timing each"""
+    name, entities, dpi, cache, profile = job
+    # The individual charts reuse one figure across the group (see chart_templates)
+    renderer = None if name == DASHBOARD_NAME else TemplateRenderer(dpi=dpi, profile=profile)
+    records = []
+    try:
+        for entity, df, output_dir in entities:
+            hits_before = cache.hits if cache else 0
+            start = time.perf_counter()
+            if renderer is None:
+                path = render_chart(df, name, output_dir=output_dir, dpi=dpi, show=False, cache=cache,
+                                    profile=profile)
+            else:
+                path = renderer.render(df, name, output_dir=output_dir, cache=cache)
+            records.append({
+                'entity': entity,
+                'chart': name,
+                'path': path,
+                'seconds': time.perf_counter() - start,
+                'bytes': os.path.getsize(path),
+                'cached': bool(cache) and cache.hits > hits_before,
+            })
+    finally:
+        if renderer is not None:
+            renderer.close()
+    return records
+
+
+def _entity_data(source):
+    """Accept either a prepared DataFrame or a path to a ledger CSV"""
+    if isinstance(source, str):
+        return load_and_prepare_data(source)
+    return source
+
+
+def render_chart_packs(sources, output_root="financial_charts", charts=None, workers=None, dpi=None,
+                       cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES, profile='preview'):
+    """
+    Render chart packs for many entities in parallel worker processes
+
+    Each job renders one chart for up to ENTITIES_PER_JOB entities, so the
+    chart's figure is built once per job and only its data is swapped for
+    the other entities.
+
+    Args:
+        sources (dict): Entity name -> ledger CSV path or prepared DataFrame
+        output_root (str): Root directory; each entity gets a subdirectory
+        charts (list, optional): Chart names to render (default: all nine)
+        workers (int, optional): Number of worker processes (default: CPU count)
+        dpi (int, optional): Output resolution (default: the profile's dpi)
+        cache_dir (str, optional): Chart cache directory; unchanged charts are copied, not rendered
+        cache_max_bytes (int): Size limit of the chart cache
+        profile (str): Output profile; 'preview' by default, 'print' for full resolution
+
+    Returns:
+        list: One record per chart with entity, chart, path, seconds, bytes and cached
+    """
+    charts = charts or CHART_NAMES
+    cache = ChartCache(cache_dir, max_bytes=cache_max_bytes) if cache_dir else None
+
+    entities = []
+    for entity, source in sources.items():
+        df = _entity_data(source)
+        output_dir = os.path.join(output_root, entity) if len(sources) > 1 else output_root
+        os.makedirs(output_dir, exist_ok=True)
+        entities.append((entity, df, output_dir))
+
+    jobs = [(name, entities[start:start + ENTITIES_PER_JOB], dpi, cache, profile)
+            for name in charts for start in range(0, len(entities), ENTITIES_PER_JOB)]
+    print(f"🚀 Rendering {len(charts) * len(entities)} charts for {len(sources)} entities "
+          f"with {workers or os.cpu_count()} workers")
+
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_render_job, job) for job in jobs]
+        for future in as_completed(futures):
+            results.extend(future.result())
+    elapsed = time.perf_counter() - start
+
+    results.sort(key=lambda r: (r['entity'], r['chart']))
+    cached = sum(1 for record in results if record['cached'])
+    print(f"✅ Rendered {len(results)} charts in {elapsed:.2f}s "
+          f"({len(results) / elapsed:.1f} charts/s, {cached} from cache)")
+    return results
+
+
+def print_render_report(results):
+    """Print per-chart render time and file size"""
+    print(f"\n{'Entity':<20} {'Chart':<30} {'Seconds':>10} {'Size (KB)':>12} {'Cached':>8}")
+    print("-" * 84)
+    for record in results:
+        print(f"{record['entity']:<20} {record['chart']:<30} "
+              f"{record['seconds']:>10.3f} {record['bytes'] / 1024:>12.1f} "
+              f"{'yes' if record['cached'] else 'no':>8}")
+
+    total = sum(record['seconds'] for record in results)
+    print("-" * 84)
+    print(f"{'Total render time (all workers)':<51} {total:>10.3f}")
+
+
+if __name__ == "__main__":
+    import sys
+    
+    # Usage: python chart_pipeline.py [profile]
+    profile = sys.argv[1] if len(sys.argv) > 1 else 'preview'
+    results = render_chart_packs({'agent_test': 'agent_test.csv'}, cache_dir='.chart_cache', profile=profile)
+    print_render_report(results)
@@ -0,0 +1,299 @@
+# Template-Based Chart Renderer
+# יצירת גרפים מתבניות לשימוש חוזר
+
+import os
+
+import matplotlib
+matplotlib.use('Agg')
+
+import tempfile
+import time
+
+import numpy as np
+import matplotlib.pyplot as plt
+from seaborn.utils import relative_luminance
+
+from create_visualizations import (CHART_SPECS, OUTPUT_PROFILES, chart_key, chart_path, load_and_prepare_data,
+                                   render_chart, save_figure)
+from financial_cube import cube_for
+from financial_metrics import FinancialFrame, as_frame
+from tracing import span
+
+
+class ChartTemplate:
+    """
+    A chart whose figure, axes and decorations are built once
+
+    The first render draws the chart with its regular drawing function and
+    freezes the layout. Later renders only swap the data on the existing
+    artists before saving. Subclasses implement update(); when the shape of
+    the new data does not fit the existing artists (for example a different
+    number of quarters), the axes are redrawn in place.
+    """
+
+    def __init__(self, name, figsize, draw, dpi=300):
+        self.name = name
+        self.figsize = figsize
+        self.draw = draw
+        self.dpi = dpi
+        self.fig = None
+        self.ax = None
+
+    def build(self, frame):
+        """Create the figure and draw the chart with the first dataset"""
+        self.fig, self.ax = plt.subplots(figsize=self.figsize)
+        self.draw(self.ax, frame)
+        self.fig.tight_layout()
+
+    def redraw(self, frame):
+        """Fallback: clear the axes and draw the chart again on the same figure"""
+        for extra_ax in self.fig.axes:
+            if extra_ax is not self.ax:
+                extra_ax.remove()
+        self.ax.clear()
+        self.draw(self.ax, frame)
+
+    def update(self, frame):
+        """Swap the data of the existing artists (default: redraw)"""
+        self.redraw(frame)
+
+    def render(self, df, path):
+        """Render the chart for one dataset and save it to path"""
+        frame = as_frame(df, discount_basis='quarter')
+        if self.fig is None:
+            self.build(frame)
+        else:
+            self.update(frame)
+        # Same tight bbox as render_chart, so template PNGs match the regular charts
+        save_figure(self.fig, path, dpi=self.dpi)
+        return path
+
+    def close(self):
+        if self.fig is not None:
+            plt.close(self.fig)
+            self.fig = self.ax = None
+
+
+class LineTemplate(ChartTemplate):
+    """Line charts over time: update with Line2D.set_data"""
+
+    def __init__(self, name, figsize, draw, series, dpi=300):
+        super().__init__(name, figsize, draw, dpi)
+        self.series = series
+
+    def update(self, frame):
+        dates = frame.data['date']
+        for line, series in zip(self.ax.lines, self.series):
+            line.set_data(dates, frame[series])
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+
+class BarTemplate(ChartTemplate):
+    """Quarterly bar charts: update bar heights and value labels"""
+
+    def __init__(self, name, figsize, draw, series, dpi=300):
+        super().__init__(name, figsize, draw, dpi)
+        self.series = series
+
+    def update(self, frame):
+        quarterly = cube_for(frame).quarterly([self.series])[self.series]
+        bars = self.ax.patches
+        labels = self.ax.texts
+        if len(bars) != len(quarterly) or len(labels) != len(quarterly):
+            self.redraw(frame)
+            return
+
+        offset = max(quarterly.values) * 0.01
+        for bar, label, value in zip(bars, labels, quarterly.values):
+            bar.set_height(value)
+            label.set_position((bar.get_x() + bar.get_width()/2, value + offset))
+            label.set_text(f'${value:,.0f}')
+        self.ax.set_xticks(range(len(quarterly)))
+        self.ax.set_xticklabels(quarterly.index, rotation=45)
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+
+class HeatmapTemplate(ChartTemplate):
+    """Year x month heatmap: update the color mesh array and annotations"""
+
+    def _pivot(self, frame):
+        return cube_for(frame).heatmap('revenue')
+
+    def build(self, frame):
+        super().build(frame)
+        self.pivot = self._pivot(frame)
+
+    def redraw(self, frame):
+        super().redraw(frame)
+        self.pivot = self._pivot(frame)
+
+    def update(self, frame):
+        pivot = self._pivot(frame)
+        same_cells = (pivot.index.equals(self.pivot.index)
+                      and pivot.columns.equals(self.pivot.columns)
+                      and (pivot.isna().values == self.pivot.isna().values).all())
+        if not same_cells:
+            self.redraw(frame)
+            return
+
+        values = np.ma.masked_invalid(pivot.values)
+        mesh = self.ax.collections[0]
+        mesh.set_array(values.ravel())
+        mesh.set_clim(values.min(), values.max())
+        mesh.update_scalarmappable()
+
+        # Annotations follow seaborn: one per unmasked cell, in row-major order
+        mask = np.ma.getmaskarray(values)
+        cells = [(val, color) for val, masked, color
+                 in zip(values.data.flat, mask.flat, mesh.get_facecolors()) if not masked]
+        for text, (val, color) in zip(self.ax.texts, cells):
+            text.set_text(f'{val:.0f}')
+            text.set_color('.15' if relative_luminance(color) > .408 else 'w')
+        self.pivot = pivot
+
+
+# Template type and the series it swaps, per chart
+TEMPLATE_TYPES = {
+    '01_revenue_vs_profit': (LineTemplate, ['revenue', 'net_profit_after_tax']),
+    '02_profit_margin_trend': (LineTemplate, ['profit_margin']),
+    '03_quarterly_revenue': (BarTemplate, 'revenue'),
+    '04_quarterly_profit': (BarTemplate, 'net_profit_after_tax'),
+    '05_npv_analysis': (LineTemplate, ['npv_net_profit']),
+    '06_monthly_heatmap': (HeatmapTemplate, None),
+    # Pie wedges cannot be resized in place; the figure is still reused
+    '07_cost_structure': (ChartTemplate, None),
+    '08_growth_analysis': (LineTemplate, ['revenue_growth', 'profit_growth']),
+}
+
+
+class TemplateRenderer:
+    """
+    Renders the eight individual charts for many entities, reusing one figure per chart
+
+    chart_pipeline.render_chart_packs gives each worker job one chart for a
+    group of entities, so every figure after the first only swaps data.
+    """
+
+    def __init__(self, dpi=None, profile='print'):
+        self.profile = profile
+        dpi = dpi or OUTPUT_PROFILES[profile]['dpi']
+        self.templates = {}
+        for name, figsize, draw in CHART_SPECS:
+            template_class, series = TEMPLATE_TYPES[name]
+            if series is None:
+                self.templates[name] = template_class(name, figsize, draw, dpi=dpi)
+            else:
+                self.templates[name] = template_class(name, figsize, draw, series, dpi=dpi)
+
+    def render(self, df, name, output_dir="financial_charts", cache=None):
+        """
+        Render one chart, like create_visualizations.render_chart but on the chart's template
+
+        Args:
+            df: DataFrame or FinancialFrame with the prepared data
+            name (str): Chart name from CHART_SPECS
+            output_dir (str): Directory for the chart file
+            cache (ChartCache, optional): Reuse a previously rendered identical chart
+
+        Returns:
+            str: Path of the written file
+        """
+        template = self.templates[name]
+        path = chart_path(output_dir, name, self.profile)
+        os.makedirs(output_dir, exist_ok=True)
+        frame = as_frame(df, discount_basis='quarter')
+        with span(name, 'charts', profile=self.profile, dpi=template.dpi, template=True) as chart_span:
+            key = None
+            if cache is not None:
+                key = chart_key(frame, name, dpi=template.dpi, fmt=OUTPUT_PROFILES[self.profile]['format'])
+                if cache.fetch(key, path):
+                    chart_span.set(cached=True)
+                    return path
+            template.render(frame, path)
+            if key is not None:
+                cache.store(key, path)
+        return path
+
+    def render_pack(self, df, output_dir="financial_charts"):
+        """Render all eight charts for one entity"""
+        frame = as_frame(df, discount_basis='quarter')
+        return [self.render(frame, name, output_dir) for name in self.templates]
+
+    def close(self):
+        for template in self.templates.values():
+            template.close()
+
+
+def benchmark_templates(datasets, dpi=100):
+    """
+    Compare per-chart cost of building every figure from scratch with template reuse
+
+    Both paths render every chart once untimed first (matplotlib and font
+    cache warm-up, the template's initial build), then the timed renders
+    alternate between the two paths chart by chart, so neither is charged
+    for warm-up or drift.
+
+    Args:
+        datasets (list): Prepared DataFrames, one per entity
+        dpi (int): Output resolution used by both renderers
+
+    Returns:
+        dict: Chart name -> {'before': seconds, 'after': seconds} averaged per entity
+    """
+    names = [name for name, _, _ in CHART_SPECS]
+    before = dict.fromkeys(names, 0.0)
+    after = dict.fromkeys(names, 0.0)
+
+    def from_scratch(frame, name, output_dir):
+        render_chart(frame, name, output_dir=output_dir, dpi=dpi)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        renderer = TemplateRenderer(dpi=dpi)
+        warmup = as_frame(datasets[0], discount_basis='quarter')
+        for name in names:
+            from_scratch(warmup, name, output_dir)
+            renderer.render(warmup, name, output_dir)
+
+        for index, df in enumerate(datasets):
+            frame = as_frame(df, discount_basis='quarter')
+            for name in names:
+                timed = [(before, from_scratch), (after, renderer.render)]
+                if index % 2:
+                    timed.reverse()
+                for totals, render in timed:
+                    start = time.perf_counter()
+                    render(frame, name, output_dir)
+                    totals[name] += time.perf_counter() - start
+        renderer.close()
+
+    results = {name: {'before': before[name] / len(datasets), 'after': after[name] / len(datasets)}
+               for name in names}
+
+    print(f"\n⏱️ PER-CHART RENDER COST ({len(datasets)} entities, {dpi} dpi)")
+    print(f"{'Chart':<28} {'Before (ms)':>12} {'After (ms)':>12} {'Speedup':>9}")
+    print("-" * 64)
+    for name, timing in results.items():
+        speedup = timing['before'] / timing['after'] if timing['after'] else float('inf')
+        print(f"{name:<28} {timing['before'] * 1000:>12.1f} {timing['after'] * 1000:>12.1f} {speedup:>8.2f}x")
+    total_before = sum(t['before'] for t in results.values())
+    total_after = sum(t['after'] for t in results.values())
+    print("-" * 64)
+    print(f"{'Total per entity':<28} {total_before * 1000:>12.1f} {total_after * 1000:>12.1f} "
+          f"{total_before / total_after:>8.2f}x")
+    return results
+
+
+if __name__ == "__main__":
+    base_df = load_and_prepare_data('agent_test.csv')
+
+    # Synthetic entities: the sample ledger scaled by different factors
+    entities = []
+    for factor in np.linspace(0.5, 2.0, 10):
+        entity_df = base_df.copy()
+        for column in ['revenue', 'opex', 'tax', 'fianance cost', 'sg@a']:
+            entity_df[column] = entity_df[column] * factor
+        entities.append(FinancialFrame(entity_df, discount_basis='quarter'))
+
+    benchmark_templates(entities)
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+# Financial Analysis Command Line Interface
+# ממשק שורת פקודה לניתוח פיננסי
+
+import argparse
+import collections
+import glob
+import os
+import statistics
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# Only the standard library is imported at module level. Every subcommand
+# imports what it needs inside its handler, so `--help` or a cost estimate
+# never pays for pandas, matplotlib or crewai.
+
+DEFAULT_CSV = 'agent_test.csv'
+
+
+def expand_inputs(patterns, shard=None):
+    """
+    Expand file globs into a sorted, de-duplicated list of ledger paths
+
+    Args:
+        patterns (list): File names or glob patterns ('ledgers/*.csv')
+        shard (str, optional): 'I/N' keeps every N-th file starting at I, so N
+            nodes can split one glob without coordination
+
+    Returns:
+        list: Matching file paths
+    """
+    paths = []
+    for pattern in patterns or [DEFAULT_CSV]:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        paths.extend(path for path in matches if path not in paths)
+    if shard:
+        index, count = (int(part) for part in shard.split('/'))
+        paths = paths[index::count]
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        raise SystemExit(f"❌ Input not found: {', '.join(missing)}")
+    if not paths:
+        raise SystemExit(f"❌ No input files match: {' '.join(patterns)}")
+    return paths
+
+
+def entity_name(path):
+    """Entity name of a ledger file: its file name without extension"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def iter_per_file(func, paths, workers=1, *args):
+    """
+    Apply func(path, *args) to every file, in worker processes when workers > 1
+
+    Returns:
+        iterator: (path, result, error) in input order, each yielded as soon as
+        it is ready so callers can consume results without keeping them all
+    """
+    if workers == 1 or len(paths) == 1:
+        for path in paths:
+            try:
+                outcome = (path, func(path, *args), None)
+            except Exception as e:
+                outcome = (path, None, e)
+            yield outcome
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque((path, executor.submit(func, path, *args)) for path in paths)
+        while pending:
+            # Drop each future once consumed so its result can be freed
+            path, future = pending.popleft()
+            try:
+                outcome = (path, future.result(), None)
+            except Exception as e:
+                outcome = (path, None, e)
+            yield outcome
+
+
+def run_per_file(func, paths, workers=1, *args):
+    """
+    Apply func(path, *args) to every file, in worker processes when workers > 1
+
+    Returns:
+        list: (path, result, error) in input order
+    """
+    return list(iter_per_file(func, paths, workers, *args))
+
+
+def _report_errors(results):
+    errors = [(path, error) for path, _, error in results if error is not None]
+    for path, error in errors:
+        print(f"❌ {path}: {error}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def cmd_models(args):
+    """List the available OpenAI models"""
+    from model_config import get_model_info
+    get_model_info()
+
+
+def cmd_cost(args):
+    """Estimate the cost of processing a text of a given length"""
+    from model_config import MODEL_CONFIGS, estimate_cost
+    models = [args.model] if args.model else list(MODEL_CONFIGS)
+    print(f"💰 Estimated cost for {args.chars:,} characters:")
+    for model in models:
+        cost = estimate_cost(args.chars, model)
+        if cost is not None:
+            print(f"   {model}: ${cost:.4f}")
+
+
+def cmd_summary(args):
+    """Print the financial summary of a ledger (no charts, no crew)"""
+    from financial_metrics import compute_financial_summary, load_ledger
+    from result_renderers import render_summary_console
+    render_summary_console(compute_financial_summary(load_ledger(args.csv), discount_basis='quarter'))
+
+
+def cmd_startup(args):
+    """Measure the import cost of each subcommand against its budget"""
+    failures = check_import_budgets(repeats=args.repeats)
+    sys.exit(1 if failures else 0)
+
+
+def _ingest_file(path, output_dir, fmt):
+    from financial_metrics import FinancialFrame, load_ledger
+    df = FinancialFrame(load_ledger(path)).materialize([
+        'net_profit_after_tax', 'quarter', 'year', 'quarter_label', 'profit_margin'])
+    output_path = os.path.join(output_dir, f"{entity_name(path)}.{fmt}")
+    if fmt == 'parquet':
+        df.to_parquet(output_path, index=False)
+    else:
+        df.to_csv(output_path, index=False)
+    return len(df), output_path
+
+
+def cmd_ingest(args):
+    """Validate ledgers and write them with derived columns"""
+    os.makedirs(args.output_dir, exist_ok=True)
+    results = run_per_file(_ingest_file, expand_inputs(args.inputs, args.shard), args.workers,
+                           args.output_dir, args.format)
+    for path, result, error in results:
+        if error is None:
+            print(f"✅ {path}: {result[0]} records -> {result[1]}")
+    return _report_errors(results)
+
+
+def _analyze_file(path, fmt, months_ahead, manifest=None, output_dir=None):
+    from detailed_results import compute_detailed_results, load_and_analyze_data, run_detailed_analysis
+    from result_renderers import render_json, render_markdown
+    if manifest:
+        # Writes the report and forecast export, or reuses an identical earlier run
+        return run_detailed_analysis(path, output_dir=output_dir, months_ahead=months_ahead,
+                                     formats=(fmt,), manifest=manifest)
+    results = compute_detailed_results(load_and_analyze_data(path), months_ahead=months_ahead)
+    if fmt == 'console':
+        # Rendered by the parent process, so the output of parallel workers does not interleave
+        return results
+    return render_json(results) if fmt == 'json' else render_markdown(results)
+
+
+def cmd_analyze(args):
+    """Detailed analysis of each ledger as console output, JSON or Markdown"""
+    if args.manifest and (args.format == 'console' or not args.output_dir):
+        raise SystemExit("❌ --manifest needs --format json/markdown and --output-dir")
+    results = run_per_file(_analyze_file, expand_inputs(args.inputs, args.shard), args.workers,
+                           args.format, args.months_ahead, args.manifest, args.output_dir)
+    extension = {'json': 'json', 'markdown': 'md'}.get(args.format)
+    if args.output_dir and extension:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    for path, result, error in results:
+        if error is not None:
+            continue
+        if args.manifest:
+            artifacts, reused = result
+            print(f"{'♻️' if reused else '✅'} {path} -> {artifacts[0]}")
+        elif args.format == 'console':
+            from result_renderers import render_console
+            print(f"\n📄 {path}")
+            render_console(result, include_forecast=False)
+        elif args.output_dir:
+            output_path = os.path.join(args.output_dir, f"{entity_name(path)}.{extension}")
+            with open(output_path, 'w', encoding='utf-8') as fh:
+                fh.write(result)
+            print(f"✅ {path} -> {output_path}")
+        else:
+            print(result)
+    return _report_errors(results)
+
+
+def _forecast_file(path, months_ahead, store=None):
+    from detailed_results import forecast_scenarios, load_and_analyze_data
+    if not store:
+        return forecast_scenarios(load_and_analyze_data(path), months_ahead)
+    # Postings and monthly totals come from the indexed store
+    from ledger_store import LedgerStore
+    with LedgerStore(store) as ledger_store:
+        df = load_and_analyze_data(path, store=ledger_store)
+        return forecast_scenarios(df, months_ahead, monthly_data=ledger_store.monthly(entity_name(path)))
+
+
+def cmd_forecast(args):
+    """Forecast every ledger and export all entities into one file per scenario"""
+    from forecast_export import ForecastExporter
+    # Each forecast is handed to the exporter as it arrives and then dropped
+    errors = []
+    with ForecastExporter(args.output_dir, formats=tuple(args.formats), excel=args.excel,
+                          months_ahead=args.months_ahead) as exporter:
+        for path, forecast, error in iter_per_file(_forecast_file, expand_inputs(args.inputs, args.shard),
+                                                   args.workers, args.months_ahead, args.store):
+            if error is None:
+                exporter.add(forecast, entity=entity_name(path))
+            else:
+                errors.append((path, None, error))
+    print(f"📊 {exporter.entities} entities, {args.months_ahead} months per scenario")
+    return _report_errors(errors)
+
+
+def cmd_store(args):
+    """Ingest ledgers into the ledger store (unchanged files are skipped)"""
+    from ledger_store import LedgerStore
+    # SQLite allows one writer at a time, so ingestion runs in this process
+    with LedgerStore(args.store) as store:
+        for path in expand_inputs(args.inputs, args.shard):
+            entity, rows, ingested = store.ingest(path, force=args.force)
+            print(f"{'✅' if ingested else '♻️'} {path}: {entity}, {rows} postings"
+                  f"{'' if ingested else ' (unchanged)'}")
+
+
+def cmd_query(args):
+    """Look up aggregates in the ledger store"""
+    from ledger_store import LedgerStore, print_quarterly
+    if args.metric and args.year is None:
+        raise SystemExit("❌ --metric needs --year (and optionally --quarter or --month)")
+    with LedgerStore(args.store) as store:
+        if not args.entity:
+            for entity in store.entities():
+                print(f"{entity['entity']:<24} {entity['rows']:>10} postings  {entity['path']}")
+        elif args.metric:
+            value = store.value(args.entity, args.metric, args.year, quarter=args.quarter, month=args.month)
+            if value is None:
+                print(f"❌ No data for {args.entity} in that period", file=sys.stderr)
+                return 1
+            print(f"{value:.2f}")
+        else:
+            print_quarterly(store, args.entity, year=args.year, quarter=args.quarter)
+    return 0
+
+
+def cmd_render(args):
+    """Render chart packs for every ledger in parallel worker processes"""
+    from chart_pipeline import print_render_report, render_chart_packs
+    sources = {entity_name(path): path for path in expand_inputs(args.inputs, args.shard)}
+    results = render_chart_packs(sources, output_root=args.output_dir, charts=args.charts,
+                                 workers=args.workers, dpi=args.dpi, cache_dir=args.cache_dir,
+                                 profile=args.profile)
+    if args.report:
+        print_render_report(results)
+
+
+def _crew_file(path, model, manifest=None, output_dir='.', gating=True, semantic_cache=None):
+    from financial_analysis_crew import PROMPT_VERSION, load_financial_data, shared_crew_pool
+    df = load_financial_data(path)
+    cache = None
+    if semantic_cache:
+        from semantic_cache import shared_cache
+        cache = shared_cache(semantic_cache)
+    # One crew per process, rebound to each ledger this process handles
+    pool = shared_crew_pool(model, gating=gating, semantic_cache=cache)
+    if not manifest:
+        return pool.run(df.to_dict('records'), entity_name(path))[1]
+
+    from run_manifest import RunManifest, frame_digest, run_fingerprint
+    params = {'model': model, 'prompt_version': PROMPT_VERSION, 'gating': gating,
+              'semantic_cache': bool(semantic_cache)}
+    fingerprint = run_fingerprint('crew', {'ledger': frame_digest(df)}, **params)
+
+    def produce():
+        result = pool.run(df.to_dict('records'), entity_name(path))[0]
+        os.makedirs(output_dir, exist_ok=True)
+        report_path = os.path.join(output_dir, f"crew_{entity_name(path)}_{fingerprint[:12]}.md")
+        with open(report_path, 'w', encoding='utf-8') as fh:
+            fh.write(str(result))
+        return [report_path]
+
+    with RunManifest(manifest) as store:
+        artifacts, reused = store.run_once('crew', fingerprint, params, produce)
+    return f"{'reused' if reused else 'report'} {artifacts[0]}"
+
+
+def cmd_crew(args):
+    """Run the agent crew on every ledger"""
+    import logging
+    logging.basicConfig(level=logging.INFO)
+    from llm_scheduler import WORKERS_ENV
+    from model_config import DEFAULT_MODEL
+    # Worker processes inherit this and split the API key's rate limits between them
+    os.environ[WORKERS_ENV] = str(args.workers)
+    results = run_per_file(_crew_file, expand_inputs(args.inputs, args.shard), args.workers,
+                           args.model or DEFAULT_MODEL, args.manifest, args.output_dir, not args.no_gates,
+                           args.semantic_cache)
+    for path, summary, error in results:
+        if error is None:
+            print(f"✅ {path}: {summary}")
+    return _report_errors(results)
+
+
+def cmd_bench(args):
+    """Run the numeric benchmark suite, or the crew benchmark with --crew"""
+    import json
+    if args.crew:
+        from crew_benchmark import print_crew_report, run_crew_benchmark
+        print_crew_report(run_crew_benchmark(expand_inputs(args.inputs)[0], latency=args.latency,
+                                             runs=args.crew_runs, concurrency=tuple(args.concurrency)))
+        return 0
+
+    from benchmark_suite import (DEFAULT_BASELINE, append_history, find_regressions,
+                                 print_benchmark_report, run_benchmarks, save_baseline)
+    run = run_benchmarks(args.cases, args.months, args.entities, args.line_items, repeats=args.repeats)
+    append_history(run)
+    baseline = None
+    if os.path.exists(DEFAULT_BASELINE) and not args.save_baseline:
+        with open(DEFAULT_BASELINE, 'r', encoding='utf-8') as fh:
+            baseline = json.load(fh)
+    print_benchmark_report(run, baseline)
+    if args.save_baseline:
+        save_baseline(run)
+    elif baseline and find_regressions(run, baseline):
+        return 1
+    return 0
+
+
+# Subcommand -> handler, modules its handler imports, import-time budget (ms).
+# Budgets are measured in a fresh interpreter by check_import_budgets.
+COMMANDS = {
+    'models': {'handler': cmd_models, 'modules': ['model_config'], 'budget_ms': 150},
+    'cost': {'handler': cmd_cost, 'modules': ['model_config'], 'budget_ms': 150},
+    'summary': {'handler': cmd_summary, 'modules': ['financial_metrics', 'result_renderers'], 'budget_ms': 1000},
+    'startup': {'handler': cmd_startup, 'modules': [], 'budget_ms': 100},
+    'ingest': {'handler': cmd_ingest, 'modules': ['financial_metrics'], 'budget_ms': 1000},
+    'analyze': {'handler': cmd_analyze, 'modules': ['detailed_results', 'result_renderers', 'run_manifest'],
+                'budget_ms': 1000},
+    'forecast': {'handler': cmd_forecast, 'modules': ['detailed_results', 'forecast_export'], 'budget_ms': 1000},
+    'store': {'handler': cmd_store, 'modules': ['ledger_store', 'financial_metrics'], 'budget_ms': 1000},
+    'query': {'handler': cmd_query, 'modules': ['ledger_store'], 'budget_ms': 1000},
+    'render': {'handler': cmd_render, 'modules': ['chart_pipeline'], 'budget_ms': 2500},
+    # crewai itself is imported when the first crew is built
+    'crew': {'handler': cmd_crew, 'modules': ['financial_analysis_crew', 'financial_metrics', 'run_manifest'],
+             'budget_ms': 1000},
+    'bench': {'handler': cmd_bench, 'modules': ['benchmark_suite'], 'budget_ms': 1000},
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='financial-analysis',
+                                     description="Financial analysis: summaries, forecasts, charts and the agent crew")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('models', help="List available OpenAI models")
+
+    cost = subparsers.add_parser('cost', help="Estimate model cost for a text length")
+    cost.add_argument('--chars', type=int, default=5000, help="Text length in characters")
+    cost.add_argument('--model', help="Single model (default: all)")
+
+    summary = subparsers.add_parser('summary', help="Print the financial summary of a ledger")
+    summary.add_argument('csv', nargs='?', default=DEFAULT_CSV)
+
+    startup = subparsers.add_parser('startup', help="Check the import-time budget of every subcommand")
+    startup.add_argument('--repeats', type=int, default=5)
+
+    # Batch commands share input globs, sharding and a worker count
+    batch = argparse.ArgumentParser(add_help=False)
+    batch.add_argument('inputs', nargs='*', help=f"Ledger files or globs (default: {DEFAULT_CSV})")
+    batch.add_argument('--workers', type=int, default=1, help="Worker processes")
+    batch.add_argument('--shard', help="Process only shard I of N of the inputs, e.g. 0/4")
+    manifest = argparse.ArgumentParser(add_help=False)
+    manifest.add_argument('--manifest', nargs='?', const='run_manifest.db',
+                          help="SQLite run manifest (shareable path); identical runs reuse earlier results")
+
+    ingest = subparsers.add_parser('ingest', parents=[batch], help="Validate ledgers and write them with derived columns")
+    ingest.add_argument('--output-dir', default='ingested')
+    ingest.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+
+    analyze = subparsers.add_parser('analyze', parents=[batch, manifest], help="Detailed analysis per ledger")
+    analyze.add_argument('--format', choices=['console', 'json', 'markdown'], default='console')
+    analyze.add_argument('--output-dir', help="Write one JSON/Markdown file per ledger instead of stdout")
+    analyze.add_argument('--months-ahead', type=int, default=60)
+
+    forecast = subparsers.add_parser('forecast', parents=[batch], help="Forecast and bulk-export all ledgers")
+    forecast.add_argument('--months-ahead', type=int, default=60)
+    forecast.add_argument('--output-dir', default='forecast_exports')
+    forecast.add_argument('--formats', nargs='+', choices=['csv', 'parquet'], default=['csv'])
+    forecast.add_argument('--excel', action='store_true', help="Also write the Excel workbook")
+    forecast.add_argument('--store', help="Read postings and monthly totals through this ledger store")
+
+    store = subparsers.add_parser('store', parents=[batch], help="Ingest ledgers into the indexed ledger store")
+    store.add_argument('--store', default='ledger_store.db', help="Ledger store database")
+    store.add_argument('--force', action='store_true', help="Re-ingest unchanged files")
+
+    query = subparsers.add_parser('query', help="Query the ledger store (lists entities without arguments)")
+    query.add_argument('entity', nargs='?')
+    query.add_argument('--store', default='ledger_store.db', help="Ledger store database")
+    query.add_argument('--metric', help="revenue, opex, tax, finance_cost, sga or net_profit (single value)")
+    query.add_argument('--year', type=int)
+    query.add_argument('--quarter', type=int, choices=[1, 2, 3, 4])
+    query.add_argument('--month', type=int, choices=range(1, 13), metavar='1-12')
+
+    render = subparsers.add_parser('render', parents=[batch], help="Render chart packs")
+    render.add_argument('--output-dir', default='financial_charts')
+    render.add_argument('--cache-dir', help="Chart cache directory (unchanged charts are copied)")
+    render.add_argument('--profile', default='preview', help="Output profile: print, preview, thumbnail, svg, pdf")
+    render.add_argument('--dpi', type=int)
+    render.add_argument('--charts', nargs='+', help="Chart names (default: all)")
+    render.add_argument('--report', action='store_true', help="Print per-chart timings")
+    # render_chart_packs picks the CPU count when workers is None
+    render.set_defaults(workers=None)
+
+    crew = subparsers.add_parser('crew', parents=[batch, manifest], help="Run the agent crew per ledger")
+    crew.add_argument('--model', help="OpenAI model (default: model_config.DEFAULT_MODEL)")
+    crew.add_argument('--output-dir', default='crew_reports', help="Report directory (with --manifest)")
+    crew.add_argument('--no-gates', action='store_true',
+                      help="Run every agent stage, even when the validation gates would skip it")
+    crew.add_argument('--semantic-cache', metavar='DB',
+                      help="SQLite cache of earlier answers; near-identical re-runs only ask for a delta update")
+
+    bench = subparsers.add_parser('bench', help="Run the benchmark suite")
+    bench.add_argument('inputs', nargs='*', help="Ledger for --crew (default: agent_test.csv)")
+    bench.add_argument('--cases', nargs='+')
+    bench.add_argument('--months', type=int, default=36)
+    bench.add_argument('--entities', type=int, default=1)
+    bench.add_argument('--line-items', type=int, default=1)
+    bench.add_argument('--repeats', type=int, default=20)
+    bench.add_argument('--save-baseline', action='store_true')
+    bench.add_argument('--crew', action='store_true', help="Benchmark the crew against a local OpenAI stub")
+    bench.add_argument('--latency', type=float, default=0.5, help="Stub latency per completion (--crew)")
+    bench.add_argument('--crew-runs', type=int, default=3, help="Sequential crew runs for phase timings (--crew)")
+    bench.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8])
+
+    return parser
+
+
+def measure_import_ms(modules, repeats=5):
+    """
+    Median time to import this CLI plus the given modules in a fresh interpreter
+
+    Args:
+        modules (list): Module names imported by a subcommand's handler
+        repeats (int): Number of fresh interpreters to start
+
+    Returns:
+        float: Median import time in milliseconds
+    """
+    code = ("import time; start = time.perf_counter(); import cli; "
+            + "".join(f"import {module}; " for module in modules)
+            + "print((time.perf_counter() - start) * 1000)")
+    timings = []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def check_import_budgets(repeats=5):
+    """
+    Measure every subcommand's import time and compare it with its budget
+
+    Returns:
+        list: Names of subcommands over budget
+    """
+    print(f"\n⏱️ IMPORT-TIME BUDGETS (median of {repeats} fresh interpreters)")
+    print(f"{'Command':<12} {'Import (ms)':>12} {'Budget (ms)':>12} {'Status':>8}")
+    print("-" * 47)
+    failures = []
+    for name, command in COMMANDS.items():
+        elapsed = measure_import_ms(command['modules'], repeats)
+        ok = elapsed <= command['budget_ms']
+        if not ok:
+            failures.append(name)
+        print(f"{name:<12} {elapsed:>12.0f} {command['budget_ms']:>12} {'✅' if ok else '❌':>7}")
+    return failures
+
+
+def main(argv=None):
+    """Console entry point: financial-analysis <command> [options]"""
+    args = build_parser().parse_args(argv)
+    return COMMANDS[args.command]['handler'](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
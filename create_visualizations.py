@@ -11,6 +11,13 @@ import seaborn as sns
 from datetime import datetime, timedelta
 import matplotlib.dates as mdates
 import os
+import tempfile
+import time
+from chart_cache import chart_cache_key
+from financial_cube import cube_for
+from financial_metrics import FinancialFrame, as_frame, compute_financial_summary, load_ledger
+from result_renderers import render_summary_console
+from tracing import span, traced
 
 # Set style for professional charts
 plt.style.use('seaborn-v0_8')
@@ -18,36 +25,20 @@ plt.rcParams['font.size'] = 12
 plt.rcParams['axes.titlesize'] = 14
 plt.rcParams['axes.labelsize'] = 12
 
+@traced('load_and_prepare_data', 'ingestion')
 def load_and_prepare_data(csv_file_path):
     """Load financial data from CSV file and prepare for analysis"""
     try:
-        # Read CSV file
-        df = pd.read_csv(csv_file_path)
+        # Read CSV file, clean column names, drop empty rows and parse dates
+        df = load_ledger(csv_file_path)
         
-        # Clean column names
-        df.columns = df.columns.str.strip()
-        
-        # Remove empty rows
-        df = df.dropna(subset=['revenue'])
-        
-        # Convert date column
-        df['date'] = pd.to_datetime(df['monthes'], format='%b-%y')
-        
-        # Calculate net profit after tax
-        df['net_profit_after_tax'] = df['revenue'] - df['opex'] - df['tax'] - df['fianance cost'] - df['sg@a']
-        
-        # Add quarter information
-        df['quarter'] = df['date'].dt.quarter
-        df['year'] = df['date'].dt.year
-        df['quarter_label'] = 'Q' + df['quarter'].astype(str) + '-' + df['year'].astype(str)
-        
-        # Calculate profit margin
-        df['profit_margin'] = (df['net_profit_after_tax'] / df['revenue']) * 100
-        
-        # Calculate NPV with 6% discount rate
-        df['quarter_number'] = (df['date'].dt.year - df['date'].dt.year.min()) * 4 + df['date'].dt.quarter
-        df['discount_factor'] = 1 / ((1 + 0.06) ** (df['quarter_number'] / 4))
-        df['npv_net_profit'] = df['net_profit_after_tax'] * df['discount_factor']
+        # Net profit, quarter information, profit margin and NPV (6% annual
+        # discount rate applied per quarter) from the metric registry
+        frame = FinancialFrame(df, discount_rate=0.06, discount_basis='quarter')
+        df = frame.materialize([
+            'net_profit_after_tax', 'quarter', 'year', 'quarter_label', 'profit_margin',
+            'quarter_number', 'discount_factor', 'npv_net_profit'
+        ])
         
         print(f"✅ Data loaded successfully: {len(df)} records")
         print(f"📊 Date range: {df['date'].min().strftime('%Y-%m')} to {df['date'].max().strftime('%Y-%m')}")
@@ -58,141 +49,287 @@ def load_and_prepare_data(csv_file_path):
         print(f"❌ Error loading data: {str(e)}")
         raise
 
-def create_individual_charts(df):
+# Chart colors, shared by the individual charts and the dashboard
+CHART_COLORS = {
+    'revenue': 'b',
+    'profit': 'g',
+    'margin': 'r',
+    'npv': 'purple',
+    'quarterly_revenue': 'skyblue',
+    'quarterly_profit': 'lightgreen',
+    'heatmap': 'YlOrRd',
+    'costs': ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4'],
+}
+
+# Bump when a drawing function changes so cached charts are re-rendered
+CHART_STYLE_VERSION = 1
+
+# Chart drawing functions
+# Each function draws one chart on the given axes. compact=True is used for
+# the smaller panels of the comprehensive dashboard.
+
+def _chart_title(ax, title, compact):
+    if compact:
+        ax.set_title(title)
+    else:
+        ax.set_title(title, fontsize=16, fontweight='bold')
+
+def _add_bar_labels(ax, bars, values, compact):
+    """Add value labels on bars"""
+    offset = max(values) * 0.01
+    for bar, value in zip(bars, values):
+        ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + offset,
+                f'${value:,.0f}', ha='center', va='bottom', fontsize=8 if compact else 10)
+
+def draw_revenue_vs_profit(ax, frame, compact=False):
+    """Revenue and Net Profit Over Time"""
+    df = frame.data
+    ax.plot(df['date'], df['revenue'], '-', color=CHART_COLORS['revenue'], label='Revenue', linewidth=2, marker='o')
+    ax.plot(df['date'], frame['net_profit_after_tax'], '-', color=CHART_COLORS['profit'], label='Net Profit', linewidth=2, marker='s')
+    _chart_title(ax, 'Revenue vs Net Profit Over Time', compact)
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Amount (USD)')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    ax.tick_params(axis='x', rotation=45)
+
+def draw_profit_margin_trend(ax, frame, compact=False):
+    """Profit Margin Trend"""
+    df = frame.data
+    ax.plot(df['date'], frame['profit_margin'], '-', color=CHART_COLORS['margin'], linewidth=2, marker='o')
+    _chart_title(ax, 'Profit Margin Trend', compact)
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Profit Margin (%)')
+    ax.grid(True, alpha=0.3)
+    ax.tick_params(axis='x', rotation=45)
+
+def draw_quarterly_revenue(ax, frame, compact=False):
+    """Quarterly Revenue Breakdown"""
+    quarterly_revenue = cube_for(frame).quarterly(['revenue'])['revenue']
+    bars = ax.bar(range(len(quarterly_revenue)), quarterly_revenue.values, color=CHART_COLORS['quarterly_revenue'], alpha=0.7)
+    _chart_title(ax, 'Quarterly Revenue Breakdown', compact)
+    ax.set_xlabel('Quarter')
+    ax.set_ylabel('Revenue (USD)')
+    ax.set_xticks(range(len(quarterly_revenue)))
+    ax.set_xticklabels(quarterly_revenue.index, rotation=45)
+    _add_bar_labels(ax, bars, quarterly_revenue.values, compact)
+
+def draw_quarterly_profit(ax, frame, compact=False):
+    """Net Profit After Tax by Quarter"""
+    quarterly_profit = cube_for(frame).quarterly(['net_profit_after_tax'])['net_profit_after_tax']
+    bars = ax.bar(range(len(quarterly_profit)), quarterly_profit.values, color=CHART_COLORS['quarterly_profit'], alpha=0.7)
+    _chart_title(ax, 'Net Profit After Tax by Quarter', compact)
+    ax.set_xlabel('Quarter')
+    ax.set_ylabel('Net Profit (USD)')
+    ax.set_xticks(range(len(quarterly_profit)))
+    ax.set_xticklabels(quarterly_profit.index, rotation=45)
+    _add_bar_labels(ax, bars, quarterly_profit.values, compact)
+
+def draw_npv_analysis(ax, frame, compact=False):
+    """NPV Analysis"""
+    df = frame.data
+    ax.plot(df['date'], frame['npv_net_profit'], color=CHART_COLORS['npv'], linewidth=2, marker='o')
+    if compact:
+        _chart_title(ax, 'NPV of Net Profit (6% Discount)', compact)
+    else:
+        _chart_title(ax, 'NPV of Net Profit (6% Discount Rate)', compact)
+    ax.set_xlabel('Date')
+    ax.set_ylabel('NPV (USD)')
+    ax.grid(True, alpha=0.3)
+    ax.tick_params(axis='x', rotation=45)
+
+def draw_monthly_heatmap(ax, frame, compact=False):
+    """Monthly Performance Heatmap"""
+    monthly_data = cube_for(frame).heatmap('revenue')
+    sns.heatmap(monthly_data, annot=True, fmt='.0f', cmap=CHART_COLORS['heatmap'], ax=ax)
+    _chart_title(ax, 'Monthly Revenue Heatmap', compact)
+    ax.set_xlabel('Month')
+    ax.set_ylabel('Year')
+
+def draw_cost_structure(ax, frame, compact=False):
+    """Cost Structure Analysis"""
+    cost_labels = ['Operating Expenses', 'Tax', 'Finance Cost', 'SG&A']
+    avg_costs = cube_for(frame).cost_structure()['mean'].values
+    
+    ax.pie(avg_costs, labels=cost_labels, autopct='%1.1f%%', colors=CHART_COLORS['costs'], startangle=90)
+    _chart_title(ax, 'Average Cost Structure', compact)
+
+def draw_growth_analysis(ax, frame, compact=False):
+    """Growth Rate Analysis"""
+    df = frame.data
+    ax.plot(df['date'], frame['revenue_growth'], '-', color=CHART_COLORS['revenue'], label='Revenue Growth', linewidth=2, marker='o')
+    ax.plot(df['date'], frame['profit_growth'], '-', color=CHART_COLORS['profit'], label='Profit Growth', linewidth=2, marker='s')
+    _chart_title(ax, 'Growth Rate Analysis', compact)
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Growth Rate (%)')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    ax.tick_params(axis='x', rotation=45)
+
+# Individual charts: (file name, figure size, drawing function)
+CHART_SPECS = [
+    ('01_revenue_vs_profit', (12, 8), draw_revenue_vs_profit),
+    ('02_profit_margin_trend', (12, 8), draw_profit_margin_trend),
+    ('03_quarterly_revenue', (14, 8), draw_quarterly_revenue),
+    ('04_quarterly_profit', (14, 8), draw_quarterly_profit),
+    ('05_npv_analysis', (12, 8), draw_npv_analysis),
+    ('06_monthly_heatmap', (12, 8), draw_monthly_heatmap),
+    ('07_cost_structure', (10, 8), draw_cost_structure),
+    ('08_growth_analysis', (12, 8), draw_growth_analysis),
+]
+
+DASHBOARD_NAME = '09_comprehensive_dashboard'
+
+# Series plotted by each chart; together with the style they form the cache key
+CHART_SERIES = {
+    '01_revenue_vs_profit': ['date', 'revenue', 'net_profit_after_tax'],
+    '02_profit_margin_trend': ['date', 'profit_margin'],
+    '03_quarterly_revenue': ['quarter_label', 'revenue'],
+    '04_quarterly_profit': ['quarter_label', 'net_profit_after_tax'],
+    '05_npv_analysis': ['date', 'npv_net_profit'],
+    '06_monthly_heatmap': ['date', 'revenue'],
+    '07_cost_structure': ['opex', 'tax', 'fianance cost', 'sg@a'],
+    '08_growth_analysis': ['date', 'revenue_growth', 'profit_growth'],
+}
+CHART_SERIES[DASHBOARD_NAME] = sorted({name for names in CHART_SERIES.values() for name in names})
+DASHBOARD_FIGSIZE = (20, 16)
+
+# Output profiles: full-resolution print output, cheap raster previews and vector formats.
+# For vector formats dpi only applies to rasterized elements.
+OUTPUT_PROFILES = {
+    'print': {'format': 'png', 'dpi': 300, 'suffix': ''},
+    'preview': {'format': 'png', 'dpi': 72, 'suffix': '_preview'},
+    'thumbnail': {'format': 'png', 'dpi': 30, 'suffix': '_thumb'},
+    'svg': {'format': 'svg', 'dpi': 72, 'suffix': ''},
+    'pdf': {'format': 'pdf', 'dpi': 72, 'suffix': ''},
+}
+
+def chart_path(output_dir, name, profile='print'):
+    """Return the file path of a chart rendered with the given output profile"""
+    if profile not in OUTPUT_PROFILES:
+        raise KeyError(f"Unknown output profile: '{profile}'. Available: {list(OUTPUT_PROFILES.keys())}")
+    settings = OUTPUT_PROFILES[profile]
+    return os.path.join(output_dir, f"{name}{settings['suffix']}.{settings['format']}")
+
+def chart_key(frame, name, dpi=300, fmt='png'):
+    """Content hash of a chart: plotted series plus style parameters"""
+    figsizes = {spec_name: figsize for spec_name, figsize, _ in CHART_SPECS}
+    style = {
+        'chart': name,
+        'version': CHART_STYLE_VERSION,
+        'figsize': figsizes.get(name, DASHBOARD_FIGSIZE),
+        'dpi': dpi,
+        'format': fmt,
+        'colors': CHART_COLORS,
+        'rc': {key: plt.rcParams[key] for key in ('font.size', 'axes.titlesize', 'axes.labelsize')},
+    }
+    return chart_cache_key([frame[series] for series in CHART_SERIES[name]], style)
+
+def save_figure(fig, path, dpi=300, bbox_inches='tight'):
+    """
+    Save a figure atomically
+
+    The image is written to a temporary file in the target directory and
+    moved into place, so readers never see a partially written chart.
+
+    Args:
+        fig: Matplotlib figure
+        path (str): Destination path; the extension selects the format
+        dpi (int): Output resolution
+        bbox_inches: 'tight' to crop to the drawn content, None to keep the figure size
+    """
+    directory = os.path.dirname(path) or '.'
+    fmt = os.path.splitext(path)[1].lstrip('.') or 'png'
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', suffix=f'.{fmt}', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fig.savefig(fh, format=fmt, dpi=dpi, bbox_inches=bbox_inches)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def render_chart(df, name, output_dir="financial_charts", dpi=None, show=False, cache=None, profile='print'):
+    """
+    Render a single named chart to '<output_dir>/<name><suffix>.<format>'
+
+    Args:
+        df: DataFrame or FinancialFrame with the prepared data
+        name (str): Chart name from CHART_SPECS, or DASHBOARD_NAME
+        output_dir (str): Directory for the chart file
+        dpi (int, optional): Output resolution (default: the profile's dpi)
+        show (bool): Also display the figure interactively
+        cache (ChartCache, optional): Reuse a previously rendered identical chart
+        profile (str): Output profile from OUTPUT_PROFILES
+
+    Returns:
+        str: Path of the written file
+    """
+    path = chart_path(output_dir, name, profile)
+    os.makedirs(output_dir, exist_ok=True)
+    dpi = dpi or OUTPUT_PROFILES[profile]['dpi']
+    frame = as_frame(df, discount_basis='quarter')
+    
+    with span(name, 'charts', profile=profile, dpi=dpi) as chart_span:
+        key = None
+        if cache is not None and not show:
+            key = chart_key(frame, name, dpi=dpi, fmt=OUTPUT_PROFILES[profile]['format'])
+            if cache.fetch(key, path):
+                chart_span.set(cached=True)
+                return path
+        
+        if name == DASHBOARD_NAME:
+            create_comprehensive_dashboard(frame, output_path=path, dpi=dpi, show=show)
+        else:
+            _render_single_chart(frame, name, path, dpi, show)
+        
+        if key is not None:
+            cache.store(key, path)
+    return path
+
+def _render_single_chart(frame, name, path, dpi, show):
+    specs = {spec_name: (figsize, draw) for spec_name, figsize, draw in CHART_SPECS}
+    if name not in specs:
+        raise KeyError(f"Unknown chart: '{name}'")
+    figsize, draw = specs[name]
+    
+    fig, ax = plt.subplots(figsize=figsize)
+    try:
+        draw(ax, frame)
+        fig.tight_layout()
+        save_figure(fig, path, dpi=dpi)
+        if show:
+            plt.show()
+    finally:
+        plt.close(fig)
+
+def create_individual_charts(df, output_dir="financial_charts", dpi=None, show=True, cache=None, profile='print'):
     """Create individual charts, each on a separate page"""
     
+    # Derived series (growth rates) are read from the metric frame, not added to df
+    frame = as_frame(df, discount_basis='quarter')
+    
     # Create output directory for charts
-    output_dir = "financial_charts"
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
     print(f"📁 Creating charts in directory: {output_dir}")
     
-    # 1. Revenue and Net Profit Over Time
-    plt.figure(figsize=(12, 8))
-    plt.plot(df['date'], df['revenue'], 'b-', label='Revenue', linewidth=2, marker='o')
-    plt.plot(df['date'], df['net_profit_after_tax'], 'g-', label='Net Profit', linewidth=2, marker='s')
-    plt.title('Revenue vs Net Profit Over Time', fontsize=16, fontweight='bold')
-    plt.xlabel('Date')
-    plt.ylabel('Amount (USD)')
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(f'{output_dir}/01_revenue_vs_profit.png', dpi=300, bbox_inches='tight')
-    plt.show()
-    
-    # 2. Profit Margin Trend
-    plt.figure(figsize=(12, 8))
-    plt.plot(df['date'], df['profit_margin'], 'r-', linewidth=2, marker='o')
-    plt.title('Profit Margin Trend', fontsize=16, fontweight='bold')
-    plt.xlabel('Date')
-    plt.ylabel('Profit Margin (%)')
-    plt.grid(True, alpha=0.3)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(f'{output_dir}/02_profit_margin_trend.png', dpi=300, bbox_inches='tight')
-    plt.show()
-    
-    # 3. Quarterly Revenue Breakdown
-    plt.figure(figsize=(14, 8))
-    quarterly_revenue = df.groupby('quarter_label')['revenue'].sum()
-    bars = plt.bar(range(len(quarterly_revenue)), quarterly_revenue.values, color='skyblue', alpha=0.7)
-    plt.title('Quarterly Revenue Breakdown', fontsize=16, fontweight='bold')
-    plt.xlabel('Quarter')
-    plt.ylabel('Revenue (USD)')
-    plt.xticks(range(len(quarterly_revenue)), quarterly_revenue.index, rotation=45)
-    
-    # Add value labels on bars
-    for bar, value in zip(bars, quarterly_revenue.values):
-        plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + max(quarterly_revenue.values)*0.01,
-                f'${value:,.0f}', ha='center', va='bottom', fontsize=10)
-    
-    plt.tight_layout()
-    plt.savefig(f'{output_dir}/03_quarterly_revenue.png', dpi=300, bbox_inches='tight')
-    plt.show()
-    
-    # 4. Net Profit After Tax by Quarter
-    plt.figure(figsize=(14, 8))
-    quarterly_profit = df.groupby('quarter_label')['net_profit_after_tax'].sum()
-    bars = plt.bar(range(len(quarterly_profit)), quarterly_profit.values, color='lightgreen', alpha=0.7)
-    plt.title('Net Profit After Tax by Quarter', fontsize=16, fontweight='bold')
-    plt.xlabel('Quarter')
-    plt.ylabel('Net Profit (USD)')
-    plt.xticks(range(len(quarterly_profit)), quarterly_profit.index, rotation=45)
-    
-    # Add value labels on bars
-    for bar, value in zip(bars, quarterly_profit.values):
-        plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + max(quarterly_profit.values)*0.01,
-                f'${value:,.0f}', ha='center', va='bottom', fontsize=10)
-    
-    plt.tight_layout()
-    plt.savefig(f'{output_dir}/04_quarterly_profit.png', dpi=300, bbox_inches='tight')
-    plt.show()
-    
-    # 5. NPV Analysis
-    plt.figure(figsize=(12, 8))
-    plt.plot(df['date'], df['npv_net_profit'], 'purple', linewidth=2, marker='o')
-    plt.title('NPV of Net Profit (6% Discount Rate)', fontsize=16, fontweight='bold')
-    plt.xlabel('Date')
-    plt.ylabel('NPV (USD)')
-    plt.grid(True, alpha=0.3)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(f'{output_dir}/05_npv_analysis.png', dpi=300, bbox_inches='tight')
-    plt.show()
-    
-    # 6. Monthly Performance Heatmap
-    plt.figure(figsize=(12, 8))
-    monthly_data = df.pivot_table(values='revenue', index=df['date'].dt.year, 
-                                 columns=df['date'].dt.month, aggfunc='sum')
-    sns.heatmap(monthly_data, annot=True, fmt='.0f', cmap='YlOrRd')
-    plt.title('Monthly Revenue Heatmap', fontsize=16, fontweight='bold')
-    plt.xlabel('Month')
-    plt.ylabel('Year')
-    plt.tight_layout()
-    plt.savefig(f'{output_dir}/06_monthly_heatmap.png', dpi=300, bbox_inches='tight')
-    plt.show()
-    
-    # 7. Cost Structure Analysis
-    plt.figure(figsize=(10, 8))
-    cost_columns = ['opex', 'tax', 'fianance cost', 'sg@a']
-    cost_labels = ['Operating Expenses', 'Tax', 'Finance Cost', 'SG&A']
-    avg_costs = [df[col].mean() for col in cost_columns]
-    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4']
-    
-    wedges, texts, autotexts = plt.pie(avg_costs, labels=cost_labels, autopct='%1.1f%%', 
-                                       colors=colors, startangle=90)
-    plt.title('Average Cost Structure', fontsize=16, fontweight='bold')
-    plt.tight_layout()
-    plt.savefig(f'{output_dir}/07_cost_structure.png', dpi=300, bbox_inches='tight')
-    plt.show()
-    
-    # 8. Growth Rate Analysis
-    plt.figure(figsize=(12, 8))
-    df['revenue_growth'] = df['revenue'].pct_change() * 100
-    df['profit_growth'] = df['net_profit_after_tax'].pct_change() * 100
-    
-    plt.plot(df['date'], df['revenue_growth'], 'b-', label='Revenue Growth', linewidth=2, marker='o')
-    plt.plot(df['date'], df['profit_growth'], 'g-', label='Profit Growth', linewidth=2, marker='s')
-    plt.title('Growth Rate Analysis', fontsize=16, fontweight='bold')
-    plt.xlabel('Date')
-    plt.ylabel('Growth Rate (%)')
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(f'{output_dir}/08_growth_analysis.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    for name, _, _ in CHART_SPECS:
+        render_chart(frame, name, output_dir=output_dir, dpi=dpi, show=show, cache=cache, profile=profile)
     
     print(f"✅ All charts have been created and saved in '{output_dir}' directory")
-    return df
+    return frame.data
 
-def create_comprehensive_dashboard(df):
+def create_comprehensive_dashboard(df, output_path=None, dpi=300, show=True):
     """Create comprehensive financial dashboard with multiple charts"""
     
+    frame = as_frame(df, discount_basis='quarter')
+    
     # Create figure with subplots
-    fig = plt.figure(figsize=(20, 16))
+    fig = plt.figure(figsize=DASHBOARD_FIGSIZE)
     
     # Create grid layout
     gs = fig.add_gridspec(3, 3, hspace=0.3, wspace=0.3)
@@ -201,154 +338,78 @@ def create_comprehensive_dashboard(df):
     fig.suptitle('Financial Analysis Dashboard', 
                  fontsize=16, fontweight='bold', y=0.98)
     
-    # 1. Revenue and Net Profit Over Time (top left)
-    ax1 = fig.add_subplot(gs[0, :2])
-    ax1.plot(df['date'], df['revenue'], 'b-', label='Revenue', linewidth=2, marker='o')
-    ax1.plot(df['date'], df['net_profit_after_tax'], 'g-', label='Net Profit', linewidth=2, marker='s')
-    ax1.set_title('Revenue vs Net Profit Over Time')
-    ax1.set_xlabel('Date')
-    ax1.set_ylabel('Amount (USD)')
-    ax1.legend()
-    ax1.grid(True, alpha=0.3)
-    ax1.tick_params(axis='x', rotation=45)
-    
-    # 2. Profit Margin Trend (top right)
-    ax2 = fig.add_subplot(gs[0, 2])
-    ax2.plot(df['date'], df['profit_margin'], 'r-', linewidth=2, marker='o')
-    ax2.set_title('Profit Margin Trend')
-    ax2.set_xlabel('Date')
-    ax2.set_ylabel('Profit Margin (%)')
-    ax2.grid(True, alpha=0.3)
-    ax2.tick_params(axis='x', rotation=45)
-    
-    # 3. Quarterly Revenue Breakdown (middle left)
-    ax3 = fig.add_subplot(gs[1, 0])
-    quarterly_revenue = df.groupby('quarter_label')['revenue'].sum()
-    bars = ax3.bar(range(len(quarterly_revenue)), quarterly_revenue.values, color='skyblue', alpha=0.7)
-    ax3.set_title('Quarterly Revenue Breakdown')
-    ax3.set_xlabel('Quarter')
-    ax3.set_ylabel('Revenue (USD)')
-    ax3.set_xticks(range(len(quarterly_revenue)))
-    ax3.set_xticklabels(quarterly_revenue.index, rotation=45)
-    
-    # Add value labels on bars
-    for bar, value in zip(bars, quarterly_revenue.values):
-        ax3.text(bar.get_x() + bar.get_width()/2, bar.get_height() + max(quarterly_revenue.values)*0.01,
-                f'${value:,.0f}', ha='center', va='bottom', fontsize=8)
-    
-    # 4. Net Profit After Tax by Quarter (middle center)
-    ax4 = fig.add_subplot(gs[1, 1])
-    quarterly_profit = df.groupby('quarter_label')['net_profit_after_tax'].sum()
-    bars = ax4.bar(range(len(quarterly_profit)), quarterly_profit.values, color='lightgreen', alpha=0.7)
-    ax4.set_title('Net Profit After Tax by Quarter')
-    ax4.set_xlabel('Quarter')
-    ax4.set_ylabel('Net Profit (USD)')
-    ax4.set_xticks(range(len(quarterly_profit)))
-    ax4.set_xticklabels(quarterly_profit.index, rotation=45)
-    
-    # Add value labels on bars
-    for bar, value in zip(bars, quarterly_profit.values):
-        ax4.text(bar.get_x() + bar.get_width()/2, bar.get_height() + max(quarterly_profit.values)*0.01,
-                f'${value:,.0f}', ha='center', va='bottom', fontsize=8)
-    
-    # 5. NPV Analysis (middle right)
-    ax5 = fig.add_subplot(gs[1, 2])
-    ax5.plot(df['date'], df['npv_net_profit'], 'purple', linewidth=2, marker='o')
-    ax5.set_title('NPV of Net Profit (6% Discount)')
-    ax5.set_xlabel('Date')
-    ax5.set_ylabel('NPV (USD)')
-    ax5.grid(True, alpha=0.3)
-    ax5.tick_params(axis='x', rotation=45)
-    
-    # 6. Monthly Performance Heatmap (bottom left)
-    ax6 = fig.add_subplot(gs[2, 0])
-    monthly_data = df.pivot_table(values='revenue', index=df['date'].dt.year, 
-                                 columns=df['date'].dt.month, aggfunc='sum')
-    sns.heatmap(monthly_data, annot=True, fmt='.0f', cmap='YlOrRd', ax=ax6)
-    ax6.set_title('Monthly Revenue Heatmap')
-    ax6.set_xlabel('Month')
-    ax6.set_ylabel('Year')
-    
-    # 7. Cost Structure Analysis (bottom center)
-    ax7 = fig.add_subplot(gs[2, 1])
-    cost_columns = ['opex', 'tax', 'fianance cost', 'sg@a']
-    cost_labels = ['Operating Expenses', 'Tax', 'Finance Cost', 'SG&A']
-    avg_costs = [df[col].mean() for col in cost_columns]
-    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4']
-    
-    wedges, texts, autotexts = ax7.pie(avg_costs, labels=cost_labels, autopct='%1.1f%%', 
-                                       colors=colors, startangle=90)
-    ax7.set_title('Average Cost Structure')
-    
-    # 8. Growth Rate Analysis (bottom right)
-    ax8 = fig.add_subplot(gs[2, 2])
-    df['revenue_growth'] = df['revenue'].pct_change() * 100
-    df['profit_growth'] = df['net_profit_after_tax'].pct_change() * 100
-    
-    ax8.plot(df['date'], df['revenue_growth'], 'b-', label='Revenue Growth', linewidth=2, marker='o')
-    ax8.plot(df['date'], df['profit_growth'], 'g-', label='Profit Growth', linewidth=2, marker='s')
-    ax8.set_title('Growth Rate Analysis')
-    ax8.set_xlabel('Date')
-    ax8.set_ylabel('Growth Rate (%)')
-    ax8.legend()
-    ax8.grid(True, alpha=0.3)
-    ax8.tick_params(axis='x', rotation=45)
+    # Panel positions: top row, middle row, bottom row
+    panels = [
+        (gs[0, :2], draw_revenue_vs_profit),
+        (gs[0, 2], draw_profit_margin_trend),
+        (gs[1, 0], draw_quarterly_revenue),
+        (gs[1, 1], draw_quarterly_profit),
+        (gs[1, 2], draw_npv_analysis),
+        (gs[2, 0], draw_monthly_heatmap),
+        (gs[2, 1], draw_cost_structure),
+        (gs[2, 2], draw_growth_analysis),
+    ]
+    for position, draw in panels:
+        draw(fig.add_subplot(position), frame, compact=True)
     
     plt.tight_layout()
-    plt.show()
+    if output_path:
+        save_figure(fig, output_path, dpi=dpi)
+    if show:
+        plt.show()
+    plt.close(fig)
     
-    return df
+    return frame.data
+
+def measure_output_profiles(df, profiles=None, charts=None):
+    """
+    Measure encode time and file size of each output profile
+
+    Every chart is drawn once and then saved with each profile, so the timings
+    isolate encoding cost from figure construction.
+
+    Args:
+        df: DataFrame or FinancialFrame with the prepared data
+        profiles (list, optional): Profile names (default: all)
+        charts (list, optional): Chart names from CHART_SPECS (default: all)
+
+    Returns:
+        dict: Profile name -> {'seconds': total encode time, 'bytes': total size}
+    """
+    frame = as_frame(df, discount_basis='quarter')
+    profiles = profiles or list(OUTPUT_PROFILES.keys())
+    charts = charts or [name for name, _, _ in CHART_SPECS]
+    specs = {name: (figsize, draw) for name, figsize, draw in CHART_SPECS}
+    results = {profile: {'seconds': 0.0, 'bytes': 0} for profile in profiles}
+    
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name in charts:
+            figsize, draw = specs[name]
+            fig, ax = plt.subplots(figsize=figsize)
+            draw(ax, frame)
+            fig.tight_layout()
+            for profile in profiles:
+                path = chart_path(output_dir, name, profile)
+                start = time.perf_counter()
+                save_figure(fig, path, dpi=OUTPUT_PROFILES[profile]['dpi'])
+                results[profile]['seconds'] += time.perf_counter() - start
+                results[profile]['bytes'] += os.path.getsize(path)
+            plt.close(fig)
+    
+    print(f"\n📐 OUTPUT PROFILES ({len(charts)} charts)")
+    print(f"{'Profile':<12} {'Format':<8} {'DPI':>5} {'Encode (s)':>12} {'Size (KB)':>12}")
+    print("-" * 53)
+    for profile, measured in results.items():
+        settings = OUTPUT_PROFILES[profile]
+        print(f"{profile:<12} {settings['format']:<8} {settings['dpi']:>5} "
+              f"{measured['seconds']:>12.3f} {measured['bytes'] / 1024:>12.1f}")
+    
+    return results
 
 def print_financial_summary(df):
     """Print comprehensive financial summary"""
     
-    print("\n" + "="*80)
-    print("📊 COMPREHENSIVE FINANCIAL ANALYSIS - ניתוח פיננסי מקיף")
-    print("="*80)
-    
-    # Key Metrics
-    total_revenue = df['revenue'].sum()
-    total_profit = df['net_profit_after_tax'].sum()
-    total_npv = df['npv_net_profit'].sum()
-    avg_profit_margin = df['profit_margin'].mean()
-    
-    print(f"\n💰 KEY METRICS - מדדים מרכזיים:")
-    print(f"   Total Revenue: ${total_revenue:,.2f}")
-    print(f"   Total Net Profit After Tax: ${total_profit:,.2f}")
-    print(f"   Total NPV (6% discount): ${total_npv:,.2f}")
-    print(f"   Average Profit Margin: {avg_profit_margin:.2f}%")
-    
-    # Quarterly Analysis
-    print(f"\n📈 QUARTERLY ANALYSIS - ניתוח רבעוני:")
-    quarterly_summary = df.groupby('quarter_label').agg({
-        'revenue': 'sum',
-        'net_profit_after_tax': 'sum',
-        'npv_net_profit': 'sum'
-    }).round(2)
-    
-    print(quarterly_summary.to_string())
-    
-    # Growth Analysis
-    print(f"\n📊 GROWTH ANALYSIS - ניתוח צמיחה:")
-    revenue_growth = ((df['revenue'].iloc[-1] - df['revenue'].iloc[0]) / df['revenue'].iloc[0]) * 100
-    profit_growth = ((df['net_profit_after_tax'].iloc[-1] - df['net_profit_after_tax'].iloc[0]) / df['net_profit_after_tax'].iloc[0]) * 100
-    
-    print(f"   Revenue Growth: {revenue_growth:.2f}%")
-    print(f"   Profit Growth: {profit_growth:.2f}%")
-    
-    # Best and Worst Performers
-    print(f"\n🏆 PERFORMANCE HIGHLIGHTS - נקודות ציון ביצועים:")
-    best_month_revenue = df.loc[df['revenue'].idxmax()]
-    worst_month_revenue = df.loc[df['revenue'].idxmin()]
-    best_month_profit = df.loc[df['net_profit_after_tax'].idxmax()]
-    worst_month_profit = df.loc[df['net_profit_after_tax'].idxmin()]
-    
-    print(f"   Best Revenue Month: {best_month_revenue['monthes']} (${best_month_revenue['revenue']:,.2f})")
-    print(f"   Worst Revenue Month: {worst_month_revenue['monthes']} (${worst_month_revenue['revenue']:,.2f})")
-    print(f"   Best Profit Month: {best_month_profit['monthes']} (${best_month_profit['net_profit_after_tax']:,.2f})")
-    print(f"   Worst Profit Month: {worst_month_profit['monthes']} (${worst_month_profit['net_profit_after_tax']:,.2f})")
-    
-    print("\n" + "="*80)
+    render_summary_console(compute_financial_summary(df, discount_basis='quarter'))
 
 def create_forecast_analysis(df):
     """Create 5-year forecast analysis"""
@@ -358,10 +419,7 @@ def create_forecast_analysis(df):
     
     # Simple trend-based forecast
     # Calculate average quarterly growth
-    quarterly_data = df.groupby('quarter_label').agg({
-        'revenue': 'sum',
-        'net_profit_after_tax': 'sum'
-    })
+    quarterly_data = cube_for(df, discount_basis='quarter').quarterly(['revenue', 'net_profit_after_tax'])
     
     # Calculate growth rates
     revenue_growth_rate = (quarterly_data['revenue'].iloc[-1] / quarterly_data['revenue'].iloc[0]) ** (1/len(quarterly_data)) - 1
@@ -426,19 +484,22 @@ if __name__ == "__main__":
     print("🚀 Loading financial data...")
     financial_df = load_and_prepare_data('agent_test.csv')
     
+    # Share memoized derived metrics between the charts and the dashboard
+    financial_frame = FinancialFrame(financial_df, discount_basis='quarter')
+    
     # Create individual charts (each on separate page)
     print("\n📊 Creating individual charts...")
-    enhanced_df = create_individual_charts(financial_df)
+    enhanced_df = create_individual_charts(financial_frame)
     
     # Create comprehensive dashboard (optional)
     print("\n📊 Creating comprehensive dashboard...")
-    create_comprehensive_dashboard(enhanced_df)
+    create_comprehensive_dashboard(financial_frame)
     
     # Print financial summary
-    print_financial_summary(enhanced_df)
+    print_financial_summary(financial_frame)
     
     # Create forecast analysis
-    create_forecast_analysis(enhanced_df)
+    create_forecast_analysis(financial_frame)
     
     print("\n✅ Analysis completed successfully!")
     print("📈 All visualizations and analysis have been generated.") 
\ No newline at end of file
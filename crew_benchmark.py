@@ -0,0 +1,406 @@
+# Crew Throughput Benchmark
+# מדידת תפוקת צוות הסוכנים מול שרת LLM מקומי
+
+import base64
+import contextlib
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+EMBEDDING_DIM = 1536
+STUB_ANSWER = ("Thought: I now know the final answer\n"
+               "Final Answer: Benchmark stub response. Net profit, quarterly segmentation, "
+               "NPV at 6% and forecasts were computed from the provided data.")
+PHASES = ['setup_agents', 'create_tasks', 'crew_assembly', 'memory_setup', 'kickoff', 'kickoff_overhead']
+
+
+class OpenAIStub:
+    """
+    Local HTTP stand-in for the OpenAI API
+
+    Serves /v1/chat/completions (plain and streaming), /v1/embeddings and
+    /v1/models with canned responses after a configurable delay, so crew
+    runs can be timed without network access or API cost.
+
+    Usage:
+        with OpenAIStub(latency=0.5) as stub:
+            os.environ['OPENAI_API_BASE'] = stub.base_url
+    """
+
+    def __init__(self, latency=0.5, jitter=0.0, host='127.0.0.1', port=0, answer=STUB_ANSWER):
+        """
+        Args:
+            latency (float): Seconds before each chat completion is answered
+            jitter (float): Uniform random extra delay (seconds) added per request
+            host (str): Interface to bind
+            port (int): TCP port (0 picks a free port)
+            answer (str): Content of every chat completion
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.answer = answer
+        # 'connections' counts TCP connections accepted, so requests / connections is the keep-alive reuse
+        self.requests = {'chat': 0, 'embeddings': 0, 'connections': 0}
+        self.served_seconds = 0.0
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng(0)
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _delay(self):
+        with self._lock:
+            extra = self._rng.uniform(0, self.jitter) if self.jitter else 0.0
+        delay = self.latency + extra
+        time.sleep(delay)
+        with self._lock:
+            self.served_seconds += delay
+
+    def _count(self, kind):
+        with self._lock:
+            self.requests[kind] += 1
+
+    def _chat(self, request):
+        prompt_tokens = len(json.dumps(request.get('messages', []))) // 4
+        completion_tokens = len(self.answer) // 4
+        return {
+            'id': f"chatcmpl-stub-{self.requests['chat']}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': self.answer},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _chat_chunks(self, request):
+        base = {'id': 'chatcmpl-stub', 'object': 'chat.completion.chunk',
+                'created': int(time.time()), 'model': request.get('model', 'stub')}
+        yield dict(base, choices=[{'index': 0, 'delta': {'role': 'assistant', 'content': self.answer},
+                                   'finish_reason': None}])
+        yield dict(base, choices=[{'index': 0, 'delta': {}, 'finish_reason': 'stop'}])
+
+    @staticmethod
+    def _embedding(text):
+        # Deterministic pseudo-embedding, so identical texts map to identical vectors
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+        vector = np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def _embeddings(self, request):
+        inputs = request.get('input', [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        data = []
+        for index, text in enumerate(inputs):
+            vector = self._embedding(str(text))
+            if request.get('encoding_format') == 'base64':
+                embedding = base64.b64encode(vector.tobytes()).decode('ascii')
+            else:
+                embedding = vector.tolist()
+            data.append({'object': 'embedding', 'index': index, 'embedding': embedding})
+        tokens = sum(len(str(text)) // 4 for text in inputs)
+        return {'object': 'list', 'data': data, 'model': request.get('model', 'stub'),
+                'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}}
+
+    def _make_handler(self):
+        stub = self
+
+        class StubHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                stub._count('connections')
+
+            def _send_json(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip('/').endswith('/models'):
+                    self._send_json(200, {'object': 'list', 'data': [{'id': 'stub', 'object': 'model'}]})
+                else:
+                    self._send_json(404, {'error': {'message': 'not found'}})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                path = self.path.split('?')[0].rstrip('/')
+
+                if path.endswith('/chat/completions'):
+                    stub._count('chat')
+                    stub._delay()
+                    if request.get('stream'):
+                        self.send_response(200)
+                        self.send_header('Content-Type', 'text/event-stream')
+                        self.send_header('Connection', 'close')
+                        self.end_headers()
+                        for chunk in stub._chat_chunks(request):
+                            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                        self.wfile.write(b"data: [DONE]\n\n")
+                        self.close_connection = True
+                    else:
+                        self._send_json(200, stub._chat(request))
+                elif path.endswith('/embeddings'):
+                    stub._count('embeddings')
+                    self._send_json(200, stub._embeddings(request))
+                else:
+                    self._send_json(404, {'error': {'message': f'unknown endpoint {self.path}'}})
+
+            def log_message(self, format, *args):
+                pass
+
+        return StubHandler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def point_openai_at(base_url):
+    """Route the OpenAI client (and libraries built on it) to base_url"""
+    os.environ['OPENAI_API_BASE'] = base_url
+    os.environ['OPENAI_BASE_URL'] = base_url
+    # The OpenAI client needs a key; any placeholder works against the stub
+    os.environ.setdefault('OPENAI_API_KEY', 'sk-benchmark-stub')
+
+
+def _timed_run(crew_module, financial_data, stub):
+    """Run the crew once and time each phase; returns phase -> seconds"""
+    timings = {}
+
+    start = time.perf_counter()
+    analysis = crew_module.FinancialAnalysisCrew()
+    timings['setup_agents'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analysis.create_tasks(financial_data)
+    timings['create_tasks'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analysis.build_crew(memory=False)
+    timings['crew_assembly'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    crew = analysis.build_crew(memory=True)
+    timings['memory_setup'] = max(time.perf_counter() - start - timings['crew_assembly'], 0.0)
+
+    served_before = stub.served_seconds
+    start = time.perf_counter()
+    crew.kickoff()
+    timings['kickoff'] = time.perf_counter() - start
+    # Time spent in the crew itself rather than waiting for the (stubbed) model
+    timings['kickoff_overhead'] = max(timings['kickoff'] - (stub.served_seconds - served_before), 0.0)
+    return timings
+
+
+def _pooled_run(analysis, financial_data, stub):
+    """Run a reused crew once: reset and rebind instead of constructing; returns phase -> seconds"""
+    timings = {}
+    start = time.perf_counter()
+    analysis.reset()
+    crew = analysis.prepare(financial_data)
+    timings['rebind'] = time.perf_counter() - start
+
+    served_before = stub.served_seconds
+    start = time.perf_counter()
+    crew.kickoff()
+    timings['kickoff'] = time.perf_counter() - start
+    timings['kickoff_overhead'] = max(timings['kickoff'] - (stub.served_seconds - served_before), 0.0)
+    return timings
+
+
+def run_crew_benchmark(csv_file_path='agent_test.csv', latency=0.5, jitter=0.0, runs=3,
+                       concurrency=(1, 2, 4, 8), runs_per_level=None, quiet=True):
+    """
+    Benchmark FinancialAnalysisCrew end to end against a local OpenAI stub
+
+    Phase timings come from sequential runs. Throughput is measured by
+    starting independent crews in parallel threads at each concurrency level.
+
+    Args:
+        csv_file_path (str): Ledger used as crew input
+        latency (float): Stub delay per chat completion (seconds)
+        jitter (float): Random extra stub delay per request (seconds)
+        runs (int): Sequential runs for the phase timings
+        concurrency (tuple): Concurrency levels for the throughput test
+        runs_per_level (int, optional): Crews started per level (default: 2 x level)
+        quiet (bool): Suppress the crew's verbose console output
+
+    Returns:
+        dict: {'import_seconds', 'phases', 'pooled', 'gating', 'throughput', 'pooled_throughput',
+               'requests', 'client_pool'}
+    """
+    results = {'latency': latency, 'jitter': jitter}
+    output = contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()
+
+    with OpenAIStub(latency=latency, jitter=jitter) as stub:
+        point_openai_at(stub.base_url)
+        print(f"🧪 OpenAI stub at {stub.base_url} ({latency * 1000:.0f} ms per completion)")
+
+        with output:
+            start = time.perf_counter()
+            import financial_analysis_crew as crew_module
+            import crewai  # deferred by financial_analysis_crew until the first crew is built
+            results['import_seconds'] = time.perf_counter() - start
+            financial_data = crew_module.load_financial_data(csv_file_path).to_dict('records')
+
+            phase_runs = [_timed_run(crew_module, financial_data, stub) for _ in range(runs)]
+        results['phases'] = {
+            phase: {
+                'mean': float(np.mean([run[phase] for run in phase_runs])),
+                'p50': float(np.percentile([run[phase] for run in phase_runs], 50)),
+                'p95': float(np.percentile([run[phase] for run in phase_runs], 95)),
+            }
+            for phase in PHASES
+        }
+        requests_per_run = stub.requests['chat'] / runs
+
+        # The same runs on one reused crew: the first run builds it, later runs only rebind.
+        # The phase runs above always run all four stages; these go through the validation gates.
+        chat_before = stub.requests['chat']
+        with output:
+            start = time.perf_counter()
+            analysis = crew_module.FinancialAnalysisCrew()
+            build_seconds = time.perf_counter() - start
+            pooled_runs = [_pooled_run(analysis, financial_data, stub) for _ in range(runs + 1)]
+        gated_per_run = (stub.requests['chat'] - chat_before) / len(pooled_runs)
+        results['gating'] = {
+            'stages': list(analysis.stages),
+            'skipped': dict(analysis.gate_report['skipped']) if analysis.gate_report else {},
+            'calls_all_stages': requests_per_run,
+            'calls_gated': gated_per_run,
+            'cut_pct': (1 - gated_per_run / requests_per_run) * 100 if requests_per_run else 0.0,
+        }
+        fresh_setup = [sum(run[phase] for phase in PHASES[:4]) for run in phase_runs]
+        results['pooled'] = {
+            # Construction in the first run: agents plus tasks, crew and memory
+            'build': build_seconds + pooled_runs[0]['rebind'],
+            'fresh_setup_mean': float(np.mean(fresh_setup)),
+            'rebind_mean': float(np.mean([run['rebind'] for run in pooled_runs[1:]])),
+            'kickoff_overhead_mean': float(np.mean([run['kickoff_overhead'] for run in pooled_runs[1:]])),
+        }
+
+        results['throughput'] = []
+        for level in concurrency:
+            count = runs_per_level or 2 * level
+            start = time.perf_counter()
+            with output, ThreadPoolExecutor(max_workers=level) as executor:
+                list(executor.map(lambda _: _timed_run(crew_module, financial_data, stub), range(count)))
+            elapsed = time.perf_counter() - start
+            results['throughput'].append({
+                'concurrency': level,
+                'runs': count,
+                'seconds': elapsed,
+                'runs_per_minute': count / elapsed * 60,
+            })
+            print(f"⚡ concurrency {level:>3}: {count / elapsed * 60:8.1f} runs/min")
+
+        results['pooled_throughput'] = []
+        for level in concurrency:
+            count = runs_per_level or 2 * level
+            pool = crew_module.CrewPool(size=level)
+            with output, ThreadPoolExecutor(max_workers=level) as executor:
+                # Build the pooled crews first, so the timing shows steady-state batch throughput
+                list(executor.map(lambda _: pool.run(financial_data), range(level)))
+                start = time.perf_counter()
+                list(executor.map(lambda _: pool.run(financial_data), range(count)))
+                elapsed = time.perf_counter() - start
+            results['pooled_throughput'].append({
+                'concurrency': level,
+                'runs': count,
+                'seconds': elapsed,
+                'runs_per_minute': count / elapsed * 60,
+            })
+            print(f"♻️ pooled concurrency {level:>3}: {count / elapsed * 60:8.1f} runs/min")
+
+        results['requests'] = dict(stub.requests, chat_per_run=requests_per_run)
+        from llm_client_pool import shared_pool
+        results['client_pool'] = shared_pool().summary()
+
+    return results
+
+
+def print_crew_report(results):
+    """Print per-phase timings and throughput per concurrency level"""
+    print(f"\n🤖 CREW BENCHMARK (stub latency {results['latency'] * 1000:.0f} ms)")
+    print(f"Import of financial_analysis_crew: {results['import_seconds']:.2f}s")
+    print(f"LLM calls per run (all stages): {results['requests']['chat_per_run']:.1f}")
+    gating = results['gating']
+    print(f"LLM calls per run with validation gates: {gating['calls_gated']:.1f} "
+          f"({gating['cut_pct']:.0f}% fewer; skipped: {', '.join(gating['skipped']) or 'none'})")
+    served = results['requests']['chat'] + results['requests']['embeddings']
+    print(f"HTTP requests per connection: {served / max(results['requests']['connections'], 1):.1f}")
+
+    print(f"\n{'Phase':<20} {'Mean (s)':>10} {'p50 (s)':>10} {'p95 (s)':>10}")
+    print("-" * 53)
+    for phase, timing in results['phases'].items():
+        print(f"{phase:<20} {timing['mean']:>10.3f} {timing['p50']:>10.3f} {timing['p95']:>10.3f}")
+
+    pooled = results['pooled']
+    print(f"\n♻️ Reused crew: built once in {pooled['build']:.3f}s; per-run setup "
+          f"{pooled['fresh_setup_mean']:.3f}s fresh vs {pooled['rebind_mean']:.4f}s rebind")
+
+    print(f"\n{'Concurrency':>11} {'Runs':>6} {'Seconds':>10} {'Runs/min':>10} {'Pooled/min':>11}")
+    print("-" * 52)
+    for level, pooled_level in zip(results['throughput'], results['pooled_throughput']):
+        print(f"{level['concurrency']:>11} {level['runs']:>6} {level['seconds']:>10.2f} "
+              f"{level['runs_per_minute']:>10.1f} {pooled_level['runs_per_minute']:>11.1f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="End-to-end crew benchmark against a local OpenAI stub")
+    parser.add_argument('--csv', default='agent_test.csv')
+    parser.add_argument('--latency', type=float, default=0.5, help="Seconds per stubbed chat completion")
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--runs', type=int, default=3, help="Sequential runs for phase timings")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--verbose', action='store_true', help="Show the crew's console output")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run_crew_benchmark(args.csv, args.latency, args.jitter, args.runs,
+                                 tuple(args.concurrency), quiet=not args.verbose)
+    print_crew_report(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+        print(f"✅ Results saved: {args.output}")
@@ -0,0 +1,267 @@
+# Interactive Dashboard Server
+# שרת דשבורד אינטראקטיבי
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from financial_metrics import COST_COLUMNS, FinancialFrame, compute_financial_summary, load_ledger
+
+# Additive measures stored in the cubes; profit_margin is derived after aggregation
+CUBE_MEASURES = ['revenue'] + COST_COLUMNS + ['net_profit_after_tax', 'npv_net_profit']
+SERIES_METRICS = CUBE_MEASURES + ['profit_margin']
+GRAINS = {'raw': None, 'month': 'M', 'quarter': 'Q'}
+DEFAULT_MAX_POINTS = 500
+
+
+def lttb(x, y, threshold):
+    """
+    Downsample a series with Largest-Triangle-Three-Buckets
+
+    Keeps the first and last points and, for each bucket in between, the point
+    forming the largest triangle with the previously kept point and the
+    average of the next bucket. Preserves peaks and troughs far better than
+    plain decimation.
+
+    Args:
+        x (np.ndarray): Monotonic x values (e.g. epoch milliseconds)
+        y (np.ndarray): Values
+        threshold (int): Number of points to return
+
+    Returns:
+        tuple: (x, y) arrays of at most threshold points
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    bucket_size = (n - 2) / (threshold - 2)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(np.floor(i * bucket_size)) + 1
+        end = int(np.floor((i + 1) * bucket_size)) + 1
+        next_start = end
+        next_end = min(int(np.floor((i + 2) * bucket_size)) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a])
+                       - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+class MetricCube:
+    """Raw, monthly and quarterly aggregates of one entity, built once at load time"""
+
+    def __init__(self, df, **params):
+        frame = FinancialFrame(df, **params)
+        raw = pd.DataFrame({measure: frame[measure] for measure in CUBE_MEASURES})
+        raw.index = pd.DatetimeIndex(frame.data['date'])
+        raw = raw.sort_index()
+
+        self.summary = compute_financial_summary(frame)
+        self.grains = {}
+        for grain, freq in GRAINS.items():
+            if freq is None:
+                table = raw
+            else:
+                periods = raw.index.to_period(freq)
+                table = raw.groupby(periods).sum()
+                table.index = table.index.to_timestamp()
+            table = table.assign(profit_margin=table['net_profit_after_tax'] / table['revenue'] * 100)
+            # Epoch milliseconds for the browser
+            self.grains[grain] = (table.index.as_unit('ms').asi8, table)
+
+    def series(self, metric, grain='month', start=None, end=None, max_points=DEFAULT_MAX_POINTS):
+        """Return (x, y, total) for one metric, sliced by date and downsampled"""
+        x, table = self.grains[grain]
+        y = table[metric].to_numpy(dtype=float)
+        if start is not None or end is not None:
+            lo = 0 if start is None else np.searchsorted(x, pd.Timestamp(start).value // 10**6, 'left')
+            hi = len(x) if end is None else np.searchsorted(x, pd.Timestamp(end).value // 10**6, 'right')
+            x, y = x[lo:hi], y[lo:hi]
+        valid = ~np.isnan(y)
+        x, y = x[valid], y[valid]
+        total = len(x)
+        x, y = lttb(x, y, max_points)
+        return x, y, total
+
+
+class DashboardData:
+    """Cubes for all entities plus an LRU cache of serialized query results"""
+
+    def __init__(self, sources, cache_size=1024, **params):
+        """
+        Args:
+            sources (dict): Entity name -> ledger CSV path or DataFrame with a 'date' column
+            cache_size (int): Number of query results kept in the cache
+            **params: Metric parameters (default discount_basis='quarter', as in print_financial_summary)
+        """
+        params.setdefault('discount_basis', 'quarter')
+        self.cubes = {}
+        for entity, source in sources.items():
+            df = load_ledger(source) if isinstance(source, str) else source
+            self.cubes[entity] = MetricCube(df, **params)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key, build):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+        payload = json.dumps(build()).encode('utf-8')
+        with self._lock:
+            self._cache[key] = payload
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return payload
+
+    def entities(self):
+        return self._cached(('entities',), lambda: sorted(self.cubes.keys()))
+
+    def summary(self, entity):
+        def build():
+            summary = dict(self.cubes[entity].summary)
+            summary['quarterly'] = summary['quarterly'].reset_index().to_dict('records')
+            return summary
+        return self._cached(('summary', entity), build)
+
+    def series(self, entity, metric, grain='month', start=None, end=None, max_points=DEFAULT_MAX_POINTS):
+        def build():
+            x, y, total = self.cubes[entity].series(metric, grain, start, end, max_points)
+            return {
+                'entity': entity,
+                'metric': metric,
+                'grain': grain,
+                'total_points': int(total),
+                'points': [[int(t), float(v)] for t, v in zip(x, y)],
+            }
+        return self._cached(('series', entity, metric, grain, start, end, max_points), build)
+
+
+DASHBOARD_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Financial Analysis Dashboard</title>
+<style>body{font-family:sans-serif;margin:20px}canvas{border:1px solid #ccc}#info{color:#666}</style>
+</head><body>
+<h2>Financial Analysis Dashboard</h2>
+<select id="entity"></select>
+<select id="metric">%(metrics)s</select>
+<select id="grain"><option>month</option><option>quarter</option><option>raw</option></select>
+<span id="info"></span><br><canvas id="chart" width="1000" height="400"></canvas>
+<pre id="summary"></pre>
+<script>
+const $ = id => document.getElementById(id);
+async function draw() {
+  const q = new URLSearchParams({entity: $('entity').value, metric: $('metric').value, grain: $('grain').value});
+  const started = performance.now();
+  const s = await (await fetch('/api/series?' + q)).json();
+  $('info').textContent = `${s.points.length}/${s.total_points} points in ${(performance.now() - started).toFixed(0)} ms`;
+  const c = $('chart').getContext('2d'), w = c.canvas.width, h = c.canvas.height;
+  c.clearRect(0, 0, w, h);
+  if (!s.points.length) return;
+  const xs = s.points.map(p => p[0]), ys = s.points.map(p => p[1]);
+  const x0 = Math.min(...xs), x1 = Math.max(...xs), y0 = Math.min(...ys), y1 = Math.max(...ys);
+  c.beginPath();
+  s.points.forEach(([x, y], i) => {
+    const px = 10 + (w - 20) * (x - x0) / ((x1 - x0) || 1), py = h - 10 - (h - 20) * (y - y0) / ((y1 - y0) || 1);
+    i ? c.lineTo(px, py) : c.moveTo(px, py);
+  });
+  c.strokeStyle = 'steelblue'; c.lineWidth = 2; c.stroke();
+  const summary = await (await fetch('/api/summary?entity=' + encodeURIComponent($('entity').value))).json();
+  delete summary.quarterly;
+  $('summary').textContent = JSON.stringify(summary, null, 2);
+}
+(async () => {
+  const entities = await (await fetch('/api/entities')).json();
+  $('entity').innerHTML = entities.map(e => `<option>${e}</option>`).join('');
+  ['entity', 'metric', 'grain'].forEach(id => $(id).onchange = draw);
+  draw();
+})();
+</script></body></html>
+""" % {'metrics': ''.join(f'<option>{metric}</option>' for metric in SERIES_METRICS)}
+
+
+def make_handler(data):
+    """Build a request handler class bound to a DashboardData instance"""
+
+    class DashboardHandler(BaseHTTPRequestHandler):
+        def _send(self, status, body, content_type='application/json'):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            try:
+                if url.path == '/':
+                    self._send(200, DASHBOARD_HTML.encode('utf-8'), 'text/html; charset=utf-8')
+                elif url.path == '/api/entities':
+                    self._send(200, data.entities())
+                elif url.path == '/api/summary':
+                    self._send(200, data.summary(params['entity']))
+                elif url.path == '/api/series':
+                    grain = params.get('grain', 'month')
+                    metric = params.get('metric', 'revenue')
+                    if grain not in GRAINS or metric not in SERIES_METRICS:
+                        raise ValueError(f"Unknown grain or metric: {grain}, {metric}")
+                    self._send(200, data.series(
+                        params['entity'], metric, grain,
+                        params.get('start'), params.get('end'),
+                        int(params.get('max_points', DEFAULT_MAX_POINTS))))
+                else:
+                    self._send(404, b'{"error": "not found"}')
+            except (KeyError, ValueError) as e:
+                self._send(400, json.dumps({'error': str(e)}).encode('utf-8'))
+
+        def log_message(self, format, *args):
+            # Keep the console quiet; every request would otherwise be logged
+            pass
+
+    return DashboardHandler
+
+
+def serve_dashboard(sources, host='127.0.0.1', port=8050, **params):
+    """
+    Serve the interactive dashboard until interrupted
+
+    Args:
+        sources (dict): Entity name -> ledger CSV path or DataFrame
+        host (str): Interface to bind (local only by default)
+        port (int): TCP port
+    """
+    start = time.perf_counter()
+    data = DashboardData(sources, **params)
+    print(f"✅ Built cubes for {len(data.cubes)} entities in {time.perf_counter() - start:.2f}s")
+
+    server = ThreadingHTTPServer((host, port), make_handler(data))
+    print(f"🌐 Dashboard running at http://{host}:{port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Dashboard stopped")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve_dashboard({'agent_test': 'agent_test.csv'})
@@ -4,61 +4,40 @@
 import warnings
 warnings.filterwarnings('ignore')
 
-# Import required libraries
-from crewai import Agent, Task, Crew
-from dotenv import load_dotenv
-import os
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime, timedelta
-import json
+# Heavy libraries (crewai, pandas, matplotlib) are imported where they are
+# used, so importing this module stays cheap for CLI commands that never
+# build a crew. Every agent gets the crew's model explicitly, so crews of
+# different models can share one process.
+import contextlib
+import functools
 import logging
+import queue
+import threading
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# Load environment variables
-load_dotenv()
-
-# Set OpenAI configuration
-from model_config import set_model, DEFAULT_MODEL
+from model_config import DEFAULT_MODEL, MODEL_CONFIGS
+from tracing import TaskSpanRecorder, span, traced
 
-# Set the model (default: gpt-3.5-turbo for cost-effectiveness)
-set_model(DEFAULT_MODEL)
+logger = logging.getLogger(__name__)
 
 # Global variables for safety and control
 MAX_ITERATIONS = 10
 TASK_TIMEOUT = 300  # 5 minutes
 MEMORY_SIZE = 1000
-
-print("✅ Libraries imported successfully")
+# Bump when agent or task prompts change, so run manifests do not reuse old crew reports
+PROMPT_VERSION = 3
 
 # Load and prepare financial data from CSV
+@traced('load_financial_data', 'ingestion')
 def load_financial_data(csv_file_path):
     """Load financial data from CSV file and prepare for analysis"""
+    from financial_metrics import FinancialFrame, load_ledger
+    
     try:
-        # Read CSV file
-        df = pd.read_csv(csv_file_path)
+        # Read CSV file, clean column names, drop empty rows and parse dates
+        df = load_ledger(csv_file_path)
         
-        # Clean column names
-        df.columns = df.columns.str.strip()
-        
-        # Remove empty rows
-        df = df.dropna(subset=['revenue'])
-        
-        # Convert date column
-        df['date'] = pd.to_datetime(df['monthes'], format='%b-%y')
-        
-        # Calculate net profit after tax
-        df['net_profit_after_tax'] = df['revenue'] - df['opex'] - df['tax'] - df['fianance cost'] - df['sg@a']
-        
-        # Add quarter information
-        df['quarter'] = df['date'].dt.quarter
-        df['year'] = df['date'].dt.year
-        df['quarter_label'] = 'Q' + df['quarter'].astype(str) + '-' + df['year'].astype(str)
+        # Net profit after tax and quarter information from the metric registry
+        df = FinancialFrame(df).materialize(['net_profit_after_tax', 'quarter', 'year', 'quarter_label'])
         
         print(f"✅ Data loaded successfully: {len(df)} records")
         print(f"📊 Date range: {df['date'].min().strftime('%Y-%m')} to {df['date'].max().strftime('%Y-%m')}")
@@ -70,15 +49,65 @@ def load_financial_data(csv_file_path):
         raise
 
 class FinancialAnalysisCrew:
-    def __init__(self):
+    def __init__(self, model_name=DEFAULT_MODEL, gating=True, semantic_cache=None):
+        # Passed to every agent's LLM (default: gpt-3.5-turbo for cost-effectiveness);
+        # OPENAI_MODEL_NAME is left alone, so pooled crews of other models are unaffected
+        if model_name not in MODEL_CONFIGS:
+            logger.warning(f"⚠️ Model '{model_name}' has no entry in model_config; costs cannot be estimated")
+        self.model_name = model_name
+        # Skip LLM stages that the deterministic checks make unnecessary (see validation_gates)
+        self.gating = gating
+        self.gate_report = None
+        # Earlier answers of near-identical runs, updated instead of redone (see semantic_cache)
+        self.semantic_cache = semantic_cache
+        self.delta_updates = {}
+        
         self.agents = {}
         self.tasks = {}
+        # Original task descriptions; a delta update replaces a description for one run
+        self.descriptions = {}
         self.results = {}
         self.iteration_count = 0
+        # Built by the first run_analysis and reused by later runs (see prepare),
+        # one Crew per set of stages the gates select
+        self.crews = {}
+        self.crew = None
+        self.stages = []
+        self.runs = 0
+        # Records one tracing span per finished task (no-op unless tracing is enabled)
+        self.task_spans = TaskSpanRecorder()
+        # Local analytics tools; bound to the ledger in create_tasks
+        from financial_tools import FinancialToolkit
+        self.toolkit = FinancialToolkit()
+        # Rate limits, retries and coalescing shared by every crew in the process
+        from llm_scheduler import shared_scheduler
+        self.scheduler = shared_scheduler()
+        # Keep-alive HTTP connections reused by every agent and crew in the process
+        from llm_client_pool import shared_pool
+        self.client_pool = shared_pool()
+        self.client_pool.install()
+        self.scheduled = False
         self.setup_agents()
     
+    def llm_options(self, agent_name):
+        """Agent LLM settings: a scheduled LLM when crewai has one, else the static per-agent RPM cap"""
+        from llm_scheduler import AGENT_PRIORITY, scheduled_llm
+        llm = scheduled_llm(self.scheduler, AGENT_PRIORITY[agent_name], model=self.model_name)
+        if llm is None:
+            # Older crewai releases take a LangChain chat model
+            try:
+                from langchain_openai import ChatOpenAI
+            except ImportError:
+                return {'max_rpm': 10}
+            return {'llm': ChatOpenAI(model=self.model_name), 'max_rpm': 10}
+        self.scheduled = True
+        # The scheduler enforces the limits; crewai's own RPM cap would stall for whole minutes
+        return {'llm': llm, 'max_rpm': None}
+    
     def setup_agents(self):
         """Setup all four specialized agents with comprehensive prompts and safety mechanisms"""
+        from crewai import Agent
+        from financial_tools import agent_tools
         
         # Agent 1: Math Analyst Agent - חישוב רווח לאחר מס ופילוח הכנסות
         self.agents['math_analyst'] = Agent(
@@ -93,12 +122,14 @@ class FinancialAnalysisCrew:
             
             verbose=True,
             allow_delegation=False,
+            # Tools are memoized per data version by the toolkit; crewai's cache would outlive a rebind
+            cache=False,
             max_iter=3,
             
-            tools=[],
+            tools=agent_tools(self.toolkit, 'math_analyst'),
             
             memory=True,
-            max_rpm=10,
+            **self.llm_options('math_analyst'),
             
             prompt_template="""You are a Financial Math Analyst specializing in profit calculations and revenue analysis.
             
@@ -109,6 +140,7 @@ class FinancialAnalysisCrew:
             4. Use only verified financial formulas and tax rates
             5. Provide confidence intervals for your calculations
             6. If uncertain about any calculation, request clarification rather than guessing
+            7. Take every figure from your tools (exact values computed from the ledger) instead of calculating it in text
             
             YOUR RESPONSIBILITIES:
             - Calculate net profit after tax from raw financial data
@@ -150,12 +182,14 @@ class FinancialAnalysisCrew:
             
             verbose=True,
             allow_delegation=False,
+            # Tools are memoized per data version by the toolkit; crewai's cache would outlive a rebind
+            cache=False,
             max_iter=3,
             
-            tools=[],
+            tools=agent_tools(self.toolkit, 'visualization_analyst'),
             
             memory=True,
-            max_rpm=10,
+            **self.llm_options('visualization_analyst'),
             
             prompt_template="""You are a Financial Visualization and NPV Analyst specializing in present value calculations and data visualization.
             
@@ -166,6 +200,7 @@ class FinancialAnalysisCrew:
             4. Use industry-standard financial modeling techniques
             5. Provide sensitivity analysis for key assumptions
             6. Document all visualization choices and their rationale
+            7. Take every figure from your tools (exact values computed from the ledger) instead of calculating it in text
             
             YOUR RESPONSIBILITIES:
             - Calculate present value using 6% discount rate
@@ -215,12 +250,14 @@ class FinancialAnalysisCrew:
             
             verbose=True,
             allow_delegation=False,
+            # Tools are memoized per data version by the toolkit; crewai's cache would outlive a rebind
+            cache=False,
             max_iter=3,
             
-            tools=[],
+            tools=agent_tools(self.toolkit, 'forecasting_analyst'),
             
             memory=True,
-            max_rpm=10,
+            **self.llm_options('forecasting_analyst'),
             
             prompt_template="""You are a Financial Forecasting Specialist creating 5-year profit projections.
             
@@ -231,6 +268,7 @@ class FinancialAnalysisCrew:
             4. Use multiple forecasting methodologies for validation
             5. Include seasonal adjustments and trend analysis
             6. Provide conservative, moderate, and optimistic scenarios
+            7. Take every figure from your tools (exact values computed from the ledger) instead of calculating it in text
             
             YOUR RESPONSIBILITIES:
             - Analyze historical profit trends and seasonality
@@ -281,12 +319,14 @@ class FinancialAnalysisCrew:
             
             verbose=True,
             allow_delegation=False,
+            # Tools are memoized per data version by the toolkit; crewai's cache would outlive a rebind
+            cache=False,
             max_iter=3,
             
-            tools=[],
+            tools=agent_tools(self.toolkit, 'validation_analyst'),
             
             memory=True,
-            max_rpm=10,
+            **self.llm_options('validation_analyst'),
             
             prompt_template="""You are a Financial Validation Specialist responsible for quality assurance and strategic recommendations.
             
@@ -297,6 +337,7 @@ class FinancialAnalysisCrew:
             4. Use industry benchmarks for reasonableness checks
             5. Provide specific, actionable recommendations
             6. Document all validation procedures and findings
+            7. Take every figure from your tools (exact values computed from the ledger) instead of calculating it in text
             
             YOUR RESPONSIBILITIES:
             - Validate all mathematical calculations and formulas
@@ -340,6 +381,10 @@ class FinancialAnalysisCrew:
     
     def create_tasks(self, financial_data):
         """Create tasks for each agent with comprehensive instructions"""
+        from crewai import Task
+        
+        # The agents' tools answer from this data
+        self.toolkit.bind(financial_data)
         
         # Task 1: Math Analysis - חישוב רווח לאחר מס ופילוח הכנסות
         self.tasks['math_analysis'] = Task(
@@ -501,33 +546,146 @@ class FinancialAnalysisCrew:
             - confidence_levels: assessment confidence"""
         )
         
+        self.descriptions = {name: task.description for name, task in self.tasks.items()}
         print("✅ All tasks created successfully")
         print(f"📋 Tasks created: {list(self.tasks.keys())}")
     
-    def run_analysis(self, financial_data):
-        """Execute the complete financial analysis workflow"""
+    def build_crew(self, memory=True, stages=None):
+        """Assemble the Crew from the configured agents and the created tasks (or the given stages)"""
+        from crewai import Crew
+        return Crew(
+            agents=list(self.agents.values()),
+            tasks=[self.tasks[stage] for stage in (stages or self.tasks)],
+            verbose=True,
+            memory=memory,
+            cache=False,
+            max_rpm=None if self.scheduled else 20,
+            task_callback=self.task_spans
+        )
+    
+    def prepare(self, financial_data):
+        """
+        Bind the data of one run, building the tasks and the crew on the first run only
+        
+        Neither the tasks nor the agents embed the ledger (the agents read it
+        through their tools), so later runs just rebind the toolkit. With
+        gating, the validation gates pick the stages to run, and each set of
+        stages keeps its own Crew.
+        
+        Returns:
+            Crew: The crew to kick off
+        """
+        if self.tasks:
+            self.toolkit.bind(financial_data)
+        else:
+            self.create_tasks(financial_data)
+        self.stages = list(self.tasks)
+        if self.gating:
+            self.gate_report = self.toolkit.gate_report()
+            self.stages = self.gate_report['stages']
+            for stage, reason in self.gate_report['skipped'].items():
+                logger.info(f"⏭️ Skipping {stage}: {reason}")
+        key = tuple(self.stages)
+        if key not in self.crews:
+            self.crews[key] = self.build_crew(stages=self.stages)
+        self.crew = self.crews[key]
+        return self.crew
+    
+    def reset(self):
+        """Forget the previous run: results, task outputs and the crew's short-term and entity memory"""
+        self.results = {}
+        self.iteration_count = 0
+        self.gate_report = None
+        self.stages = []
+        self.delta_updates = {}
+        for name, task in self.tasks.items():
+            task.output = None
+            task.description = self.descriptions[name]
+        if self.crew is not None and self.crew.memory:
+            reset_memories = getattr(self.crew, 'reset_memories', None)
+            if reset_memories is None:
+                # crewai releases without reset_memories: the next run builds a crew with fresh memory
+                self.crews = {key: crew for key, crew in self.crews.items() if crew is not self.crew}
+                self.crew = None
+            else:
+                for memory_type in ('short', 'entity'):
+                    reset_memories(command_type=memory_type)
+    
+    def apply_semantic_cache(self, entity=None):
+        """
+        Turn the stages that match an earlier run into delta updates of its answers
+        
+        Args:
+            entity (str, optional): Only reuse this entity's earlier runs
+        
+        Returns:
+            dict: stage -> similarity and changed months of the reused answer
+        """
+        from semantic_cache import delta_prompt, delta_size, ledger_rows
+        rows = ledger_rows(self.toolkit.frame.data)
+        for stage in self.stages:
+            description = self.descriptions[stage]
+            match = self.semantic_cache.lookup(stage, description, rows, self.model_name, PROMPT_VERSION, entity)
+            if match is None:
+                continue
+            self.tasks[stage].description = delta_prompt(description, match['output'], match['delta'])
+            self.delta_updates[stage] = {'similarity': round(match['similarity'], 4),
+                                         'changed_months': delta_size(match['delta'])}
+            logger.info(f"♻️ {stage}: delta update of an earlier answer "
+                        f"({delta_size(match['delta'])} changed months, similarity {match['similarity']:.3f})")
+        return self.delta_updates
+    
+    def store_semantic_cache(self, entity=None):
+        """Record this run's answers for the next run of a near-identical ledger"""
+        from semantic_cache import ledger_rows
+        from speculative import task_output_text
+        rows = ledger_rows(self.toolkit.frame.data)
+        for stage in self.stages:
+            output = task_output_text(self.tasks[stage])
+            if output:
+                self.semantic_cache.store(stage, self.descriptions[stage], rows, self.model_name,
+                                          PROMPT_VERSION, output, entity)
+    
+    def run_analysis(self, financial_data, entity=None, on_task=None):
+        """
+        Execute the complete financial analysis workflow
+        
+        Args:
+            financial_data (list): Ledger records
+            entity (str, optional): Entity of the ledger; with a semantic cache,
+                only this entity's earlier runs are reused
+            on_task (callable, optional): Called as on_task(stage, output) when a
+                task finishes, before the tasks after it start; changes to
+                output.raw reach the later tasks' context
+        """
         
         try:
             logger.info("🚀 Starting financial analysis workflow...")
             
-            # Create tasks
-            self.create_tasks(financial_data)
-            
-            # Create crew
-            crew = Crew(
-                agents=list(self.agents.values()),
-                tasks=list(self.tasks.values()),
-                verbose=True,
-                memory=True,
-                max_rpm=20
-            )
+            # Tasks and crew are built on the first run; later runs rebind the data
+            self.reset()
+            crew = self.prepare(financial_data)
+            if self.semantic_cache is not None:
+                self.apply_semantic_cache(entity)
             
             # Execute analysis
             logger.info("⚡ Executing crew analysis...")
-            result = crew.kickoff()
+            for stage in self.stages:
+                self.tasks[stage].callback = None if on_task is None else functools.partial(on_task, stage)
+            self.task_spans.start()
+            try:
+                with span('crew_kickoff', 'crew_task', tasks=len(self.stages)):
+                    result = crew.kickoff()
+            finally:
+                # The tasks are reused by later runs, which may not want the callback
+                for stage in self.stages:
+                    self.tasks[stage].callback = None
             
             # Store results
             self.results = result
+            self.runs += 1
+            if self.semantic_cache is not None:
+                self.store_semantic_cache(entity)
             
             logger.info("✅ Analysis completed successfully!")
             return result
@@ -544,14 +702,24 @@ class FinancialAnalysisCrew:
         summary = {
             'analysis_status': 'Completed',
             'agents_executed': list(self.agents.keys()),
-            'tasks_completed': list(self.tasks.keys()),
-            'results_available': bool(self.results)
+            'tasks_completed': list(self.stages),
+            'tasks_skipped': self.gate_report['skipped'] if self.gate_report else {},
+            'delta_updates': dict(self.delta_updates),
+            'results_available': bool(self.results),
+            'llm_requests': self.scheduler.summary(),
+            'http_connections': self.client_pool.summary()
         }
         
         return summary
     
     def create_visualizations(self, df):
         """Create comprehensive financial visualizations"""
+        import matplotlib.pyplot as plt
+        from financial_cube import cube_for
+        from financial_metrics import FinancialFrame
+        
+        frame = FinancialFrame(df, discount_basis='quarter')
+        quarterly = cube_for(frame).quarterly(['revenue', 'net_profit_after_tax'])
         
         # Set style for professional charts
         plt.style.use('seaborn-v0_8')
@@ -572,7 +740,7 @@ class FinancialAnalysisCrew:
         
         # 2. Quarterly Revenue Breakdown
         ax2 = axes[0, 1]
-        quarterly_revenue = df.groupby('quarter_label')['revenue'].sum()
+        quarterly_revenue = quarterly['revenue']
         quarterly_revenue.plot(kind='bar', ax=ax2, color='skyblue')
         ax2.set_title('Quarterly Revenue Breakdown\\nפילוח הכנסות לפי רבעונים')
         ax2.set_xlabel('Quarter - רבעון')
@@ -581,7 +749,7 @@ class FinancialAnalysisCrew:
         
         # 3. Net Profit After Tax by Quarter
         ax3 = axes[1, 0]
-        quarterly_profit = df.groupby('quarter_label')['net_profit_after_tax'].sum()
+        quarterly_profit = quarterly['net_profit_after_tax']
         quarterly_profit.plot(kind='bar', ax=ax3, color='lightgreen')
         ax3.set_title('Net Profit After Tax by Quarter\\nרווח נקי לאחר מס לפי רבעון')
         ax3.set_xlabel('Quarter - רבעון')
@@ -590,8 +758,7 @@ class FinancialAnalysisCrew:
         
         # 4. Profit Margin Analysis
         ax4 = axes[1, 1]
-        df['profit_margin'] = (df['net_profit_after_tax'] / df['revenue']) * 100
-        ax4.plot(df['date'], df['profit_margin'], 'r-', linewidth=2)
+        ax4.plot(df['date'], frame['profit_margin'], 'r-', linewidth=2)
         ax4.set_title('Profit Margin Trend\\nמגמת שולי רווח')
         ax4.set_xlabel('Date - תאריך')
         ax4.set_ylabel('Profit Margin (%) - שולי רווח (%)')
@@ -603,10 +770,8 @@ class FinancialAnalysisCrew:
         # Calculate NPV with 6% discount rate
         print("\\n📊 NPV Analysis with 6% Discount Rate:")
         
-        # Calculate quarterly discount factors
-        df['quarter_number'] = (df['date'].dt.year - df['date'].dt.year.min()) * 4 + df['date'].dt.quarter
-        df['discount_factor'] = 1 / ((1 + 0.06) ** (df['quarter_number'] / 4))
-        df['npv_net_profit'] = df['net_profit_after_tax'] * df['discount_factor']
+        # Quarterly discount factors
+        df = frame.materialize(['profit_margin', 'quarter_number', 'discount_factor', 'npv_net_profit'])
         
         total_npv = df['npv_net_profit'].sum()
         print(f"Total NPV of Net Profit: ${total_npv:,.2f}")
@@ -614,8 +779,106 @@ class FinancialAnalysisCrew:
         
         return df
 
+class CrewPool:
+    """
+    Reusable FinancialAnalysisCrew instances, each serving one run at a time
+    
+    A crew's agents, tasks, Crew and memory are built once per pooled
+    instance; every run only rebinds the ledger. Instances are reset when
+    they return to the pool, so no results or short-term memory carry over
+    from one ledger to the next. Runs in parallel threads get separate
+    instances, up to size.
+    
+    Usage:
+        pool = CrewPool(size=4)
+        result, summary = pool.run(df.to_dict('records'))
+    """
+    
+    def __init__(self, model_name=DEFAULT_MODEL, size=1, gating=True, semantic_cache=None):
+        """
+        Args:
+            model_name (str): Model of every crew in the pool
+            size (int): Maximum number of crew instances
+            gating (bool): Let the validation gates skip unnecessary stages
+            semantic_cache (SemanticCache, optional): Cache shared by the crews
+        """
+        self.model_name = model_name
+        self.size = size
+        self.gating = gating
+        self.semantic_cache = semantic_cache
+        self.created = 0
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+    
+    def _discard(self):
+        with self._lock:
+            self.created -= 1
+    
+    @contextlib.contextmanager
+    def acquire(self):
+        """Borrow an idle crew, building one while the pool is below size"""
+        try:
+            crew = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                build = self.created < self.size
+                if build:
+                    self.created += 1
+            if build:
+                try:
+                    crew = FinancialAnalysisCrew(model_name=self.model_name, gating=self.gating,
+                                                 semantic_cache=self.semantic_cache)
+                except BaseException:
+                    self._discard()
+                    raise
+            else:
+                crew = self._idle.get()
+        try:
+            yield crew
+        finally:
+            try:
+                crew.reset()
+            except Exception as e:
+                logger.warning(f"⚠️ Dropping a crew that could not be reset: {e}")
+                self._discard()
+            else:
+                self._idle.put(crew)
+    
+    def run(self, financial_data, entity=None):
+        """
+        Run the analysis on a pooled crew
+        
+        Returns:
+            tuple: (crew result, results summary)
+        """
+        with self.acquire() as crew:
+            result = crew.run_analysis(financial_data, entity)
+            return result, crew.get_results_summary()
+
+
+_crew_pools = {}
+_crew_pools_lock = threading.Lock()
+
+
+def shared_crew_pool(model_name=DEFAULT_MODEL, size=1, gating=True, semantic_cache=None):
+    """The process-wide crew pool of a model, gating setting and cache (size applies when it is created)"""
+    key = (model_name, gating, semantic_cache)
+    with _crew_pools_lock:
+        if key not in _crew_pools:
+            _crew_pools[key] = CrewPool(model_name, size, gating, semantic_cache)
+        return _crew_pools[key]
+
+
+def main(argv=None):
+    """Console entry point (financial-analysis); the subcommands live in cli.py"""
+    from cli import main as cli_main
+    return cli_main(argv)
+
 # Main execution
 if __name__ == "__main__":
+    # Configure logging
+    logging.basicConfig(level=logging.INFO)
+    
     # Load the financial data
     financial_df = load_financial_data('agent_test.csv')
     print("\\n📈 Sample data:")
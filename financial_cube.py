@@ -0,0 +1,209 @@
+# Financial Rollup Cube
+# קוביית סיכומים לפי ישות, שנה, רבעון, חודש וסעיף
+
+import numpy as np
+import pandas as pd
+
+from financial_metrics import COST_COLUMNS, as_frame
+from money import MONEY_SCALE, check_sum_bound, to_units
+from tracing import span
+
+# Line items held in the cube; all of them are additive
+CUBE_MEASURES = ['revenue'] + COST_COLUMNS + ['net_profit_after_tax', 'npv_net_profit']
+# Summed as fixed-point money, so their totals are exact; NPV is a discounted float
+MONEY_MEASURES = ['revenue'] + COST_COLUMNS + ['net_profit_after_tax']
+LEVELS = ['month', 'quarter', 'year', 'total']
+
+
+class FinancialCube:
+    """
+    Pre-aggregated totals of one entity by year, quarter and month
+
+    The postings are summed once per month when the cube is built and the
+    quarters and years are rolled up from the months, so consumers slice
+    finished tables instead of re-running groupby('quarter_label') or
+    pivot_table on the raw frame. Money line items are summed as int64
+    fixed-point units (see money.py), so every level's totals are exact.
+
+    Use cube_for() to get the cube memoized on a FinancialFrame for its
+    current data version.
+    """
+
+    def __init__(self, df, entity='default', **params):
+        """
+        Args:
+            df: DataFrame or FinancialFrame with the ledger data
+            entity (str): Entity name, the outermost dimension when cubes are combined
+            **params: Metric parameters (e.g. discount_basis) when df is a DataFrame
+        """
+        frame = as_frame(df, **params)
+        self.entity = entity
+
+        def column(name):
+            # Metrics already materialized in the data are used as they are
+            return frame.data[name] if name in frame.data.columns else frame[name]
+
+        with span('build_cube', 'metrics', entity=entity):
+            # Months since 1970 as the month key; one factorization serves every measure
+            months = frame.data['date'].to_numpy().astype('datetime64[M]').astype(np.int64)
+            codes, month_keys = pd.factorize(months, sort=True)
+
+            amounts = [column(measure).to_numpy(dtype=np.float64) for measure in MONEY_MEASURES]
+            try:
+                money = [to_units(amount) for amount in amounts]
+                for units in money:
+                    check_sum_bound(units)
+                exact = True
+            except (ValueError, OverflowError):
+                # Ledgers with missing amounts, or amounts or totals beyond the
+                # fixed-point range, fall back to float sums (NaN counts as 0, as in groupby)
+                money, exact = [np.nan_to_num(amount) for amount in amounts], False
+            monthly = np.zeros((len(MONEY_MEASURES), len(month_keys)), dtype=money[0].dtype)
+            for row, values in zip(monthly, money):
+                np.add.at(row, codes, values)
+            npv = np.nan_to_num(column('npv_net_profit').to_numpy(dtype=np.float64))
+            monthly_npv = np.bincount(codes, weights=npv, minlength=len(month_keys))
+
+            self.postings = len(codes)
+            # Postings with an amount, per line item (means skip missing amounts, as pandas does)
+            self.counts = pd.Series([np.count_nonzero(~np.isnan(amount)) for amount in amounts],
+                                    index=MONEY_MEASURES)
+            self.tables = {'month': _table(month_keys, 'month', monthly, monthly_npv, exact)}
+            for level in ('quarter', 'year'):
+                # Months are sorted, so each quarter / year is a contiguous run.
+                # Integer sums are associative: rolling up the months is exact.
+                level_keys = _roll_key(month_keys, level)
+                starts = np.flatnonzero(np.r_[True, level_keys[1:] != level_keys[:-1]])
+                self.tables[level] = _table(level_keys[starts], level, np.add.reduceat(monthly, starts, axis=1),
+                                            np.add.reduceat(monthly_npv, starts), exact)
+            totals = monthly.sum(axis=1)
+            self.totals = pd.Series(totals / MONEY_SCALE if exact else totals, index=MONEY_MEASURES)
+            self.totals['npv_net_profit'] = npv.sum()
+            # Quarter labels sort as text ('Q1-2025', 'Q1-2026', 'Q2-2025', ...),
+            # the order of every existing groupby('quarter_label') report
+            quarters = self.tables['quarter']
+            labels = [f"Q{q}-{y}" for y, q in quarters.index]
+            self._by_label = quarters.set_axis(pd.Index(labels, name='quarter_label')).sort_index()
+            self._by_period = quarters.set_axis(pd.Index(labels, name='quarter_label'))
+
+    def rollup(self, level='quarter', measures=None):
+        """
+        Totals at one level, in chronological order
+
+        Args:
+            level (str): 'month' (year, quarter, month), 'quarter' (year, quarter), 'year' or 'total'
+            measures (list, optional): Line items to return (default: all)
+
+        Returns:
+            pd.DataFrame or pd.Series: The rollup table ('total' returns a Series)
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Unknown level '{level}', expected one of {LEVELS}")
+        table = self.totals if level == 'total' else self.tables[level]
+        return table if measures is None else table[measures]
+
+    def quarterly(self, measures=None, order='label'):
+        """
+        Quarterly totals indexed by quarter label
+
+        Args:
+            measures (list, optional): Line items to return (default: all)
+            order (str): 'label' sorts like groupby('quarter_label'); 'time' is chronological
+
+        Returns:
+            pd.DataFrame: One row per quarter
+        """
+        table = self._by_label if order == 'label' else self._by_period
+        return table if measures is None else table[measures]
+
+    def value(self, measure, year, quarter=None, month=None):
+        """
+        One total by index lookup, e.g. value('revenue', 2025, quarter=3)
+
+        Returns:
+            float or None: The total, or None if there are no postings in the period
+        """
+        try:
+            if month is not None:
+                return self.tables['month'].at[(year, (month - 1) // 3 + 1, month), measure]
+            if quarter is not None:
+                return self.tables['quarter'].at[(year, quarter), measure]
+            return self.tables['year'].at[year, measure]
+        except KeyError:
+            return None
+
+    def heatmap(self, measure='revenue'):
+        """Year x month table of one line item (the monthly heatmap)"""
+        return self.tables['month'][measure].droplevel('quarter').unstack('month')
+
+    def cost_structure(self):
+        """
+        Cost line items with their totals, average per posting with an amount and share of all costs
+
+        Returns:
+            pd.DataFrame: Indexed by cost column, with 'total', 'mean' and 'share' (%)
+        """
+        totals = self.totals[COST_COLUMNS]
+        return pd.DataFrame({
+            'total': totals,
+            'mean': totals / self.counts[COST_COLUMNS],
+            'share': totals / totals.sum() * 100,
+        })
+
+
+def _roll_key(month_keys, level):
+    """Quarter (year * 4 + quarter index) or year keys of month keys (months since 1970)"""
+    return month_keys // 3 if level == 'quarter' else month_keys // 12
+
+
+def _level_index(keys, level):
+    """Year / quarter / month index of the integer keys of a level"""
+    if level == 'month':
+        year, month = keys // 12 + 1970, keys % 12 + 1
+        return pd.MultiIndex.from_arrays([year, (month - 1) // 3 + 1, month], names=['year', 'quarter', 'month'])
+    if level == 'quarter':
+        return pd.MultiIndex.from_arrays([keys // 4 + 1970, keys % 4 + 1], names=['year', 'quarter'])
+    return pd.Index(keys + 1970, name='year')
+
+
+def _table(keys, level, money, npv, exact):
+    """Rollup table of one level from (measure, period) money sums and NPV sums"""
+    columns = dict(zip(MONEY_MEASURES, money / MONEY_SCALE if exact else money))
+    columns['npv_net_profit'] = npv
+    return pd.DataFrame(columns, index=_level_index(keys, level))
+
+
+def cube_for(df, **params):
+    """
+    The cube of a ledger, built once per data version
+
+    A FinancialFrame keeps its cube until its data changes, so every chart,
+    summary and report sharing the frame reuses one set of rollups. A plain
+    DataFrame is wrapped in a new frame, so its cube is built on each call.
+
+    Args:
+        df: DataFrame or FinancialFrame
+        **params: Metric parameters when df is a DataFrame
+
+    Returns:
+        FinancialCube
+    """
+    frame = as_frame(df, **params)
+    return frame.memo('cube', FinancialCube)
+
+
+def combine_cubes(cubes, level='quarter', measures=None):
+    """
+    Stack one rollup level of several entity cubes under an 'entity' index level
+
+    Args:
+        cubes (list): FinancialCube objects
+        level (str): Rollup level (see FinancialCube.rollup)
+        measures (list, optional): Line items to return
+
+    Returns:
+        pd.DataFrame: Rollups of all entities; .groupby(level=...) sums across entities
+    """
+    if level == 'total':
+        return pd.DataFrame({cube.entity: cube.rollup('total', measures) for cube in cubes}).T.rename_axis('entity')
+    return pd.concat({cube.entity: cube.rollup(level, measures) for cube in cubes}, names=['entity'])
@@ -0,0 +1,304 @@
+# Financial Metrics Registry
+# רישום מדדים פיננסיים נגזרים
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from money import from_units, subtract, to_units
+from tracing import span, traced
+
+# Raw ledger columns as they appear in the source CSV
+BASE_COLUMNS = ['monthes', 'revenue', 'opex', 'tax', 'fianance cost', 'sg@a']
+COST_COLUMNS = ['opex', 'tax', 'fianance cost', 'sg@a']
+
+# Default parameters shared by all derived metrics
+DEFAULT_PARAMS = {
+    'discount_rate': 0.06,
+    # 'month': t = 1..n per month (matches calculate_correct_npv)
+    # 'quarter': annual rate applied per quarter since the first year
+    'discount_basis': 'month',
+}
+
+
+@traced('load_ledger', 'ingestion')
+def load_ledger(csv_file_path, store=None):
+    """
+    Load the raw ledger CSV with cleaned column names and parsed dates
+
+    Args:
+        csv_file_path (str): Path to the ledger CSV file
+        store (str or LedgerStore, optional): Read through this ledger store,
+            re-ingesting only when the file changed. Defaults to the
+            FINANCIAL_LEDGER_STORE environment variable; False reads the CSV directly.
+
+    Returns:
+        pd.DataFrame: Raw postings with a 'date' column and no derived metrics
+    """
+    if store is None:
+        store = os.environ.get('FINANCIAL_LEDGER_STORE')
+    if store:
+        from ledger_store import LedgerStore
+        if isinstance(store, LedgerStore):
+            return store.load(csv_file_path)
+        with LedgerStore(store) as ledger_store:
+            return ledger_store.load(csv_file_path)
+
+    df = pd.read_csv(csv_file_path)
+    df.columns = df.columns.str.strip()
+    df = df.dropna(subset=['revenue'])
+    df['date'] = pd.to_datetime(df['monthes'], format='%b-%y')
+    return df
+
+
+class MetricRegistry:
+    """Declarative registry of derived metrics and the inputs they depend on"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, name, inputs=(), params=()):
+        """
+        Decorator registering a metric function
+
+        Args:
+            name (str): Column name of the derived metric
+            inputs (tuple): Columns or other metrics passed positionally
+            params (tuple): Frame parameters passed as keyword arguments
+        """
+        def decorator(func):
+            self._metrics[name] = {
+                'func': func,
+                'inputs': tuple(inputs),
+                'params': tuple(params),
+            }
+            return func
+        return decorator
+
+    def __contains__(self, name):
+        return name in self._metrics
+
+    def names(self):
+        """Return the names of all registered metrics"""
+        return list(self._metrics.keys())
+
+    def spec(self, name):
+        """Return the registration record of a metric"""
+        if name not in self._metrics:
+            raise KeyError(f"Unknown metric: '{name}'")
+        return self._metrics[name]
+
+    def dependencies(self, name):
+        """Return every metric and column a metric depends on, transitively"""
+        seen = []
+        stack = list(self.spec(name)['inputs'])
+        while stack:
+            dep = stack.pop()
+            if dep in seen:
+                continue
+            seen.append(dep)
+            if dep in self._metrics:
+                stack.extend(self._metrics[dep]['inputs'])
+        return seen
+
+
+METRICS = MetricRegistry()
+
+
+@METRICS.register('net_profit_after_tax', inputs=('revenue', 'opex', 'tax', 'fianance cost', 'sg@a'))
+def _net_profit_after_tax(revenue, opex, tax, finance_cost, sga):
+    # Fixed-point subtraction: the exact decimal difference, with no float drift
+    try:
+        units = to_units(np.vstack([revenue, opex, tax, finance_cost, sga]))
+    except (ValueError, OverflowError):
+        # Missing amounts have no fixed-point form (keep NaN semantics), and
+        # amounts beyond the fixed-point range stay in float
+        return revenue - opex - tax - finance_cost - sga
+    return pd.Series(from_units(subtract(units[0], *units[1:])), index=revenue.index)
+
+
+@METRICS.register('quarter', inputs=('date',))
+def _quarter(date):
+    return date.dt.quarter
+
+
+@METRICS.register('year', inputs=('date',))
+def _year(date):
+    return date.dt.year
+
+
+@METRICS.register('quarter_label', inputs=('quarter', 'year'))
+def _quarter_label(quarter, year):
+    return 'Q' + quarter.astype(str) + '-' + year.astype(str)
+
+
+@METRICS.register('profit_margin', inputs=('net_profit_after_tax', 'revenue'))
+def _profit_margin(net_profit_after_tax, revenue):
+    return (net_profit_after_tax / revenue) * 100
+
+
+@METRICS.register('time_period', inputs=('date',))
+def _time_period(date):
+    # t = 1, 2, 3, ... in chronological order
+    return date.rank(method='first').astype(int)
+
+
+@METRICS.register('quarter_number', inputs=('date',))
+def _quarter_number(date):
+    return (date.dt.year - date.dt.year.min()) * 4 + date.dt.quarter
+
+
+@METRICS.register('discount_factor', inputs=('time_period', 'quarter_number'),
+                  params=('discount_rate', 'discount_basis'))
+def _discount_factor(time_period, quarter_number, discount_rate, discount_basis):
+    if discount_basis == 'quarter':
+        return 1 / ((1 + discount_rate) ** (quarter_number / 4))
+    return 1 / ((1 + discount_rate) ** time_period)
+
+
+@METRICS.register('npv_net_profit', inputs=('net_profit_after_tax', 'discount_factor'))
+def _npv_net_profit(net_profit_after_tax, discount_factor):
+    return net_profit_after_tax * discount_factor
+
+
+@METRICS.register('revenue_growth', inputs=('revenue',))
+def _revenue_growth(revenue):
+    return revenue.pct_change() * 100
+
+
+@METRICS.register('profit_growth', inputs=('net_profit_after_tax',))
+def _profit_growth(net_profit_after_tax):
+    return net_profit_after_tax.pct_change() * 100
+
+
+class FinancialFrame:
+    """
+    Lazy view over a ledger DataFrame
+
+    Derived metrics are computed on first access and memoized for the current
+    data version. Replacing the data with update() starts a new version.
+    """
+
+    def __init__(self, data, registry=None, **params):
+        self.registry = registry or METRICS
+        self.params = dict(DEFAULT_PARAMS)
+        self.params.update(params)
+        self.version = 0
+        self._data = data
+        self._cache = {}
+
+    @property
+    def data(self):
+        """The underlying DataFrame (raw postings, never mutated)"""
+        return self._data
+
+    def update(self, data):
+        """Replace the underlying data and drop all memoized metrics"""
+        self._data = data
+        self.version += 1
+        self._cache.clear()
+
+    def invalidate(self):
+        """Drop memoized metrics after the underlying data was edited in place"""
+        self.version += 1
+        self._cache.clear()
+
+    def computed(self):
+        """Return the names of metrics already memoized for this version"""
+        return [name for (name, version) in self._cache if version == self.version]
+
+    def __contains__(self, name):
+        return name in self._data.columns or name in self.registry
+
+    def __getitem__(self, name):
+        if name in self.registry:
+            return self._compute(name)
+        return self._data[name]
+
+    def _compute(self, name):
+        key = (name, self.version)
+        if key not in self._cache:
+            spec = self.registry.spec(name)
+            with span(name, 'metrics'):
+                args = [self[dep] for dep in spec['inputs']]
+                kwargs = {param: self.params[param] for param in spec['params']}
+                result = spec['func'](*args, **kwargs)
+            if isinstance(result, pd.Series):
+                result = result.rename(name)
+            self._cache[key] = result
+        return self._cache[key]
+
+    def memo(self, name, build):
+        """
+        Memoize an object derived from the whole frame (e.g. a rollup cube) for the current version
+
+        Args:
+            name (str): Cache name
+            build (callable): Called with this frame on the first access per version
+        """
+        key = (name, self.version)
+        if key not in self._cache:
+            self._cache[key] = build(self)
+        return self._cache[key]
+
+    def materialize(self, names):
+        """
+        Return a copy of the data with the requested metrics added as columns
+
+        Args:
+            names (list): Metric names to include
+
+        Returns:
+            pd.DataFrame: Data plus the requested metric columns
+        """
+        df = self._data.copy()
+        for name in names:
+            df[name] = self[name]
+        return df
+
+
+def as_frame(df, **params):
+    """Wrap a DataFrame in a FinancialFrame, passing existing frames through"""
+    if isinstance(df, FinancialFrame):
+        return df
+    return FinancialFrame(df, **params)
+
+
+def compute_financial_summary(df, **params):
+    """
+    Compute the key metrics reported by print_financial_summary
+
+    Args:
+        df: DataFrame or FinancialFrame with the ledger data
+        **params: Metric parameters (e.g. discount_basis) when df is a DataFrame
+
+    Returns:
+        dict: Totals, average margin, quarterly table, growth and best/worst months
+    """
+    from financial_cube import cube_for
+    frame = as_frame(df, **params)
+    data = frame.data
+    revenue = data['revenue']
+    profit = frame['net_profit_after_tax']
+    cube = cube_for(frame)
+    totals = cube.rollup('total')
+    
+    quarterly = cube.quarterly(['revenue', 'net_profit_after_tax', 'npv_net_profit']).round(2)
+    
+    def _month(series, idx):
+        return {'month': data.loc[idx, 'monthes'], 'value': float(series.loc[idx])}
+    
+    return {
+        'total_revenue': float(totals['revenue']),
+        'total_profit': float(totals['net_profit_after_tax']),
+        'total_npv': float(totals['npv_net_profit']),
+        'avg_profit_margin': float(frame['profit_margin'].mean()),
+        'quarterly': quarterly,
+        'revenue_growth': float((revenue.iloc[-1] - revenue.iloc[0]) / revenue.iloc[0] * 100),
+        'profit_growth': float((profit.iloc[-1] - profit.iloc[0]) / profit.iloc[0] * 100),
+        'best_revenue_month': _month(revenue, revenue.idxmax()),
+        'worst_revenue_month': _month(revenue, revenue.idxmin()),
+        'best_profit_month': _month(profit, profit.idxmax()),
+        'worst_profit_month': _month(profit, profit.idxmin()),
+    }
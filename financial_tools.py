@@ -0,0 +1,288 @@
+# Financial Analysis Tools for the Crew Agents
+# כלים אנליטיים מקומיים לסוכני הצוות
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from financial_cube import cube_for
+from financial_metrics import COST_COLUMNS, METRICS, FinancialFrame
+from tracing import span
+
+# Decimals kept in tool outputs; amounts are money, rates are percentages
+OUTPUT_DECIMALS = 2
+GROWTH_LEVELS = ('month', 'quarter', 'year')
+
+# Tools handed to each agent by FinancialAnalysisCrew.setup_agents
+AGENT_TOOLS = {
+    'math_analyst': ['quarterly_segmentation', 'growth_rates', 'cost_structure'],
+    'visualization_analyst': ['npv', 'quarterly_segmentation'],
+    'forecasting_analyst': ['scenario_forecast', 'growth_rates'],
+    'validation_analyst': ['data_checks', 'quarterly_segmentation', 'npv', 'growth_rates', 'scenario_forecast',
+                           'cost_structure'],
+}
+
+
+def _compact(value):
+    """Round floats and replace NaN/inf with None, recursively"""
+    if isinstance(value, dict):
+        return {str(key): _compact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_compact(item) for item in value]
+    if isinstance(value, (float, np.floating)):
+        return round(float(value), OUTPUT_DECIMALS) if np.isfinite(value) else None
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def to_json(value):
+    """Compact JSON (no spaces, 2 decimals) to keep tool outputs short in the prompt"""
+    return json.dumps(_compact(value), separators=(',', ':'), ensure_ascii=False)
+
+
+def _period_label(key, level):
+    """Readable label of a rollup index entry: 2025, Q3-2025 or 2025-07"""
+    if level == 'year':
+        return str(key)
+    if level == 'quarter':
+        return f"Q{key[1]}-{key[0]}"
+    return f"{key[0]}-{key[2]:02d}"
+
+
+class FinancialToolkit:
+    """
+    Exact financial figures for the agents, computed locally
+
+    Each tool answers from the rollup cube and metric registry of one bound
+    ledger and returns compact JSON, so an agent gets the numbers from a
+    single tool call instead of reconstructing them in text. Results are
+    memoized on the FinancialFrame for its data version: repeated calls
+    (by the same or another agent) are dictionary lookups, and bind() with
+    new data invalidates them.
+
+    Usage:
+        toolkit = FinancialToolkit(df)
+        toolkit.npv(0.08)                  # '{"discount_rate":0.08,...}'
+        agent_tools = toolkit.tools(['npv', 'growth_rates'])   # CrewAI tools
+    """
+
+    def __init__(self, data=None, discount_basis='quarter'):
+        """
+        Args:
+            data: DataFrame, FinancialFrame or list of records (see bind)
+            discount_basis (str): Default basis of the NPV tool ('quarter' like the crew reports)
+        """
+        self.discount_basis = discount_basis
+        self.frame = None
+        if data is not None:
+            self.bind(data)
+
+    def bind(self, data):
+        """
+        Point the tools at a ledger
+
+        Args:
+            data: FinancialFrame (shared, including its cube), DataFrame, or the
+                list of records passed to FinancialAnalysisCrew.run_analysis
+        """
+        if isinstance(data, FinancialFrame):
+            self.frame = data
+            return self
+        df = data if isinstance(data, pd.DataFrame) else pd.DataFrame.from_records(data)
+        # Derived columns carried in the records are recomputed from the raw line items
+        df = df.drop(columns=[column for column in df.columns if column in METRICS])
+        if 'date' not in df.columns:
+            df['date'] = pd.to_datetime(df['monthes'], format='%b-%y')
+        if self.frame is None:
+            self.frame = FinancialFrame(df, discount_basis=self.discount_basis)
+        else:
+            # A new data version drops the cube and every memoized tool result
+            self.frame.update(df)
+        return self
+
+    def _cached(self, key, compute):
+        """JSON result of one tool call, memoized for the current data version"""
+        if self.frame is None:
+            raise ValueError("No financial data bound to the toolkit; call bind() first")
+
+        def build(frame):
+            with span(key[0], 'tool'):
+                return to_json(compute(frame))
+        return self.frame.memo(('tool',) + key, build)
+
+    def quarterly_segmentation(self):
+        """Revenue, costs, net profit and margin per quarter, in chronological order"""
+        def compute(frame):
+            quarters = cube_for(frame).quarterly(order='time')
+            revenue = quarters['revenue']
+            profit = quarters['net_profit_after_tax']
+            margin = (profit / revenue.where(revenue != 0) * 100)
+            return {
+                'quarters': [
+                    {'quarter': label, 'revenue': row['revenue'],
+                     **{column: row[column] for column in COST_COLUMNS},
+                     'net_profit_after_tax': row['net_profit_after_tax'], 'margin_pct': margin[label]}
+                    for label, row in quarters.iterrows()
+                ],
+                'totals': {'revenue': revenue.sum(), 'net_profit_after_tax': profit.sum(),
+                           'margin_pct': profit.sum() / revenue.sum() * 100 if revenue.sum() else None},
+            }
+        return self._cached(('quarterly_segmentation',), compute)
+
+    def npv(self, discount_rate=0.06, basis=None):
+        """
+        Net present value of net profit at a given annual discount rate
+
+        Args:
+            discount_rate (float): Annual rate, e.g. 0.06
+            basis (str, optional): 'quarter' or 'month' (see financial_metrics.DEFAULT_PARAMS)
+        """
+        discount_rate = float(discount_rate)
+        basis = basis or self.discount_basis
+
+        def compute(frame):
+            if frame.params['discount_rate'] == discount_rate and frame.params['discount_basis'] == basis:
+                discounted = frame['npv_net_profit']
+            else:
+                # Same data and registry, other parameters: only the discounting is recomputed
+                discounted = FinancialFrame(frame.data, discount_rate=discount_rate,
+                                            discount_basis=basis)['npv_net_profit']
+            profit = frame['net_profit_after_tax']
+            years = frame.data['date'].dt.year
+            return {
+                'discount_rate': discount_rate,
+                'basis': basis,
+                'npv': discounted.sum(),
+                'undiscounted_profit': profit.sum(),
+                'npv_by_year': discounted.groupby(years).sum().to_dict(),
+            }
+        return self._cached(('npv', discount_rate, basis), compute)
+
+    def growth_rates(self, measure='revenue', level='quarter'):
+        """
+        Period-over-period growth (%) of one line item
+
+        Args:
+            measure (str): 'revenue', 'net_profit_after_tax' or a cost column
+            level (str): 'month', 'quarter' or 'year'
+        """
+        if level not in GROWTH_LEVELS:
+            raise ValueError(f"Unknown level '{level}', expected one of {list(GROWTH_LEVELS)}")
+
+        def compute(frame):
+            cube = cube_for(frame)
+            series = cube.rollup(level, [measure])[measure]
+            growth = series.pct_change() * 100
+            monthly = cube.rollup('month', [measure])[measure]
+            # Same compound monthly rate that forecast_scenarios extrapolates
+            compound_rate = ((monthly.iloc[-1] / monthly.iloc[0]) ** (1 / len(monthly)) - 1) * 100 \
+                if len(monthly) and monthly.iloc[0] else None
+            return {
+                'measure': measure,
+                'level': level,
+                'periods': [{'period': _period_label(key, level), 'value': value, 'growth_pct': rate}
+                            for key, value, rate in zip(series.index, series.values, growth.values)],
+                'compound_monthly_growth_pct': compound_rate,
+            }
+        return self._cached(('growth_rates', measure, level), compute)
+
+    def scenario_forecast(self, months_ahead=60):
+        """
+        Conservative / moderate / optimistic forecast totals with yearly subtotals
+
+        Args:
+            months_ahead (int): Forecast horizon in months
+        """
+        months_ahead = int(months_ahead)
+
+        def compute(frame):
+            from detailed_results import SCENARIO_MULTIPLIERS, forecast_scenarios
+            monthly = cube_for(frame).rollup('month')
+            forecasts = forecast_scenarios(frame.data, months_ahead, monthly_data=monthly)
+            result = {'months_ahead': months_ahead, 'growth_multipliers': SCENARIO_MULTIPLIERS, 'scenarios': {}}
+            for name, forecast in forecasts.items():
+                revenue = np.asarray(forecast['Revenue'])
+                profit = np.asarray(forecast['Net_Profit'])
+                starts = range(0, months_ahead, 12)
+                result['scenarios'][name] = {
+                    'total_revenue': forecast['Total_Revenue'],
+                    'total_net_profit': forecast['Total_Profit'],
+                    'avg_monthly_profit': forecast['Avg_Monthly_Profit'],
+                    'yearly': [{'year': i + 1, 'revenue': revenue[start:start + 12].sum(),
+                                'net_profit': profit[start:start + 12].sum()}
+                               for i, start in enumerate(starts)],
+                }
+            return result
+        return self._cached(('scenario_forecast', months_ahead), compute)
+
+    def cost_structure(self):
+        """Cost line items with totals, average per posting and share of all costs"""
+        def compute(frame):
+            costs = cube_for(frame).cost_structure()
+            return {'costs': costs.to_dict(orient='index'), 'total_costs': costs['total'].sum()}
+        return self._cached(('cost_structure',), compute)
+
+    def gate_report(self):
+        """Validation gate checks and stage decisions (see validation_gates.evaluate_gates), memoized"""
+        if self.frame is None:
+            raise ValueError("No financial data bound to the toolkit; call bind() first")
+        from validation_gates import evaluate_gates
+        return self.frame.memo('gate_report', evaluate_gates)
+
+    def data_checks(self):
+        """Results of the deterministic data checks: completeness, missing amounts, losses, report NPV agreement"""
+        return self._cached(('data_checks',), lambda frame: self.gate_report())
+
+    def tools(self, names=None):
+        """
+        CrewAI tools calling this toolkit
+
+        Args:
+            names (list, optional): Tool names (default: all, see AGENT_TOOLS)
+
+        Returns:
+            list: Tool objects for Agent(tools=...)
+        """
+        try:
+            from crewai.tools import tool
+        except ImportError:
+            # crewai < 0.60 takes LangChain tools
+            from langchain.tools import tool
+
+        # The wrappers' annotations and docstrings are the argument schema
+        # and description the LLM sees
+        def quarterly_segmentation() -> str:
+            """Exact quarterly revenue, cost line items, net profit after tax and margin (%) as JSON, oldest quarter first."""
+            return self.quarterly_segmentation()
+
+        def npv(discount_rate: float = 0.06, basis: str = self.discount_basis) -> str:
+            """Exact net present value of net profit after tax as JSON. discount_rate is annual (0.06 = 6%); basis is 'quarter' or 'month'. Call with several rates for a sensitivity analysis."""
+            return self.npv(discount_rate, basis)
+
+        def growth_rates(measure: str = 'revenue', level: str = 'quarter') -> str:
+            """Period-over-period growth (%) as JSON. measure: revenue, net_profit_after_tax, opex, tax, 'fianance cost' or 'sg@a'; level: month, quarter or year."""
+            return self.growth_rates(measure, level)
+
+        def scenario_forecast(months_ahead: int = 60) -> str:
+            """Conservative, moderate and optimistic net profit forecast as JSON: totals and yearly subtotals over months_ahead months."""
+            return self.scenario_forecast(months_ahead)
+
+        def data_checks() -> str:
+            """Deterministic data checks as JSON: month completeness, rows with missing amounts, loss-making rows, and whether the report's two NPV figures agree (they do not when postings are out of date order). Start the review from the failed checks."""
+            return self.data_checks()
+
+        def cost_structure() -> str:
+            """Cost breakdown as JSON: total, average per posting and share (%) of opex, tax, finance cost and SG&A."""
+            return self.cost_structure()
+
+        functions = {func.__name__: func for func in
+                     (quarterly_segmentation, npv, growth_rates, scenario_forecast, cost_structure, data_checks)}
+        names = list(functions) if names is None else names
+        return [tool(name)(functions[name]) for name in names]
+
+
+def agent_tools(toolkit, agent_name):
+    """The CrewAI tools configured for one agent in AGENT_TOOLS"""
+    return toolkit.tools(AGENT_TOOLS.get(agent_name, []))
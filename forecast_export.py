@@ -0,0 +1,404 @@
+# Bulk Forecast Export
+# ייצוא תחזיות בכמויות גדולות
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from tracing import span, traced
+
+# Optional fast writers
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+# Manifest lock: flock on POSIX, msvcrt byte-range lock on Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+MONTHLY_COLUMNS = ['Month', 'Revenue', 'OPEX', 'Tax', 'Finance_Cost', 'SG&A', 'Net_Profit', 'Profit_Margin_%']
+SUMMARY_METRICS = ['Total_Revenue', 'Total_Profit', 'Avg_Monthly_Revenue', 'Avg_Monthly_Profit']
+
+
+MANIFEST_NAME = 'forecast_manifest.json'
+
+
+def _new_hasher(formats, excel, months_ahead):
+    hasher = hashlib.sha256()
+    params = {'formats': sorted(formats), 'excel': bool(excel), 'months_ahead': months_ahead}
+    hasher.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+    return hasher
+
+
+def _hash_forecast(hasher, all_forecast_data, entity):
+    """Feed one entity's forecast into the export hash"""
+    hasher.update(str(entity).encode('utf-8'))
+    for scenario_name, data in all_forecast_data.items():
+        hasher.update(scenario_name.encode('utf-8'))
+        hasher.update('\n'.join(data['Month']).encode('utf-8'))
+        for column in MONTHLY_COLUMNS[1:]:
+            hasher.update(np.asarray(data[column], dtype=float).tobytes())
+        hasher.update(repr([float(data[metric]) for metric in SUMMARY_METRICS]).encode('utf-8'))
+
+
+def forecast_key(forecasts, formats=('csv',), excel=False, months_ahead=None):
+    """
+    Content hash of an export: forecast values plus export parameters
+
+    Args:
+        forecasts (dict): Entity name -> output of create_monthly_forecast_table
+        formats (tuple): Export formats
+        excel (bool): Whether the Excel workbook is included
+        months_ahead (int, optional): Forecast horizon
+
+    Returns:
+        str: Hex SHA-256 digest, identical to ForecastExporter.key for the same inputs
+    """
+    hasher = _new_hasher(formats, excel, months_ahead)
+    for entity, all_forecast_data in forecasts.items():
+        _hash_forecast(hasher, all_forecast_data, entity)
+    return hasher.hexdigest()
+
+
+class ExportManifest:
+    """
+    Index of content-addressed exports in an output directory
+
+    Maps each export key to the files written for it, so repeated runs with
+    identical inputs can reuse the existing artifacts instead of writing new ones.
+    Changes are made in transaction(), which holds a lock file and reloads
+    the manifest, so workers exporting into the same directory never drop
+    each other's entries.
+    """
+
+    def __init__(self, output_dir='.', name=MANIFEST_NAME):
+        self.path = os.path.join(output_dir, name)
+        self.entries = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Lock the manifest, reload it, and save the entries changed in the block"""
+        with open(self.path + '.lock', 'a+b') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                self.entries = self._load()
+                yield self
+                self.save()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+                else:
+                    lock.seek(0)
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def lookup(self, key):
+        """Return the files of an export if it exists and all of its files are present"""
+        entry = self.entries.get(key)
+        if entry and all(os.path.exists(path) for path in entry['files']):
+            return entry['files']
+        return None
+
+    def add(self, key, files, params=None):
+        """Add an export (files stored as absolute paths); call inside transaction()"""
+        self.entries[key] = {
+            'files': [os.path.abspath(path) for path in files],
+            'params': params or {},
+            'created': datetime.now().isoformat(timespec='seconds'),
+        }
+
+    def record(self, key, files, params=None):
+        """Add an export and save the manifest"""
+        with self.transaction():
+            self.add(key, files, params)
+
+    def prune(self):
+        """Drop entries whose files were deleted; returns the number removed"""
+        with self.transaction():
+            stale = [key for key in self.entries if self.lookup(key) is None]
+            for key in stale:
+                del self.entries[key]
+        return len(stale)
+
+    def save(self):
+        """Write the manifest atomically (use transaction() to merge with other writers)"""
+        directory = os.path.dirname(self.path) or '.'
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', suffix='.json', dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+            json.dump(self.entries, fh, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class _ExcelStream:
+    """Row-streaming Excel writer: xlsxwriter in constant-memory mode, else openpyxl write-only"""
+
+    def __init__(self, path):
+        self.path = path
+        self.sheets = {}
+        if xlsxwriter is not None:
+            self.workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        else:
+            from openpyxl import Workbook
+            self.workbook = Workbook(write_only=True)
+
+    def append(self, sheet_name, header, rows):
+        if sheet_name not in self.sheets:
+            if xlsxwriter is not None:
+                sheet = self.workbook.add_worksheet(sheet_name)
+            else:
+                sheet = self.workbook.create_sheet(sheet_name)
+            self.sheets[sheet_name] = [sheet, 0]
+            self._write_row(sheet_name, header)
+        for row in rows:
+            self._write_row(sheet_name, row)
+
+    def _write_row(self, sheet_name, row):
+        sheet, row_number = self.sheets[sheet_name]
+        if xlsxwriter is not None:
+            sheet.write_row(row_number, 0, row)
+        else:
+            sheet.append(list(row))
+        self.sheets[sheet_name][1] = row_number + 1
+
+    @traced('ForecastExporter.close', 'export')
+    def close(self):
+        if xlsxwriter is not None:
+            self.workbook.close()
+        else:
+            self.workbook.save(self.path)
+
+
+class ForecastExporter:
+    """
+    Streams forecasts of many entities into one columnar file per scenario
+
+    add() hashes an entity's forecast and appends its rows to the open
+    writers right away: rows of many entities are gathered as plain column
+    lists and turned into one DataFrame per batch of batch_rows, which is
+    appended to open CSV/Parquet writers. Only the writers, the batch
+    buffers and the running hash are kept, so memory does not grow with the
+    number of entities. Thousands of entities produce one file per scenario
+    instead of thousands of timestamped files. Excel output is written only
+    on request.
+
+    File names carry a hash of the exported values and parameters instead of
+    a timestamp, known once the last entity is added. Files are written
+    under temporary names; close() checks the export manifest before
+    publishing anything, deletes the temporary files if an identical export
+    exists, and otherwise renames them and records the export. If the with
+    block or a write fails, the temporary files are deleted and nothing is
+    published or recorded. Callers holding every forecast up front can check
+    forecast_key against the manifest before streaming at all.
+
+    Usage:
+        with ForecastExporter('forecast_exports', formats=('csv', 'parquet')) as exporter:
+            for entity, forecast in forecasts.items():
+                exporter.add(forecast, entity=entity)
+    """
+
+    def __init__(self, output_dir='.', formats=('csv',), excel=False, months_ahead=None,
+                 batch_rows=100_000):
+        """
+        Args:
+            output_dir (str): Directory for the exported files
+            formats (tuple): Any of 'csv' and 'parquet'
+            excel (bool): Also write a comprehensive Excel workbook
+            months_ahead (int, optional): Forecast horizon used in file names
+            batch_rows (int): Rows buffered per file before a write (one Parquet row group)
+        """
+        if 'parquet' in formats and pq is None:
+            raise ImportError("Parquet export requires pyarrow: pip install pyarrow")
+        self.output_dir = output_dir
+        self.formats = tuple(formats)
+        self.excel = excel
+        self.months_ahead = months_ahead
+        self.batch_rows = batch_rows
+        self.key = None
+        self.reused = False
+        self._hasher = _new_hasher(formats, excel, months_ahead)
+        self._outputs = []
+        self.entities = 0
+        self.paths = []
+        # (file stem, Excel sheet) -> buffered columns and their row count
+        self._pending = {}
+        self._pending_rows = {}
+        self._csv = {}
+        self._parquet = {}
+        self._excel = None
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _file_name(self, stem, ext):
+        """Temporary path of an output; the final name is assigned in close()"""
+        path = os.path.join(self.output_dir, f".{stem}.{os.getpid()}.partial.{ext}")
+        self._outputs.append((path, stem, ext))
+        return path
+
+    def _final_name(self, stem, ext):
+        horizon = f"_{self.months_ahead}months" if self.months_ahead else ""
+        return os.path.join(self.output_dir, f"{stem}{horizon}_{self.key[:12]}.{ext}")
+
+    def add(self, all_forecast_data, entity='default'):
+        """Hash the forecast of one entity and append it to the open writers"""
+        _hash_forecast(self._hasher, all_forecast_data, entity)
+        self.entities += 1
+        try:
+            for scenario_name, data in all_forecast_data.items():
+                rows = len(data['Month'])
+                monthly = {'Entity': [entity] * rows}
+                monthly.update({column: data[column] for column in MONTHLY_COLUMNS})
+                self._append(f"forecast_{scenario_name.lower()}", f'{scenario_name}_Monthly', monthly, rows)
+
+                summary = {'Entity': [entity], 'Scenario': [scenario_name]}
+                summary.update({metric: [data[metric]] for metric in SUMMARY_METRICS})
+                self._append('forecast_summary', 'Scenario_Comparison', summary, 1)
+        except BaseException:
+            self.abort()
+            raise
+
+    def _append(self, stem, sheet, columns, rows):
+        """Buffer rows of one output file, writing a batch once batch_rows are buffered"""
+        stream = (stem, sheet)
+        pending = self._pending.setdefault(stream, {column: [] for column in columns})
+        for column, values in columns.items():
+            pending[column].extend(values)
+        self._pending_rows[stream] = self._pending_rows.get(stream, 0) + rows
+        if self._pending_rows[stream] >= self.batch_rows:
+            self._flush(stream)
+
+    @traced('ForecastExporter.flush', 'export')
+    def _flush(self, stream):
+        """Write the buffered rows of one output file as a single batch"""
+        columns = self._pending.pop(stream, None)
+        self._pending_rows.pop(stream, None)
+        if not columns or not any(columns.values()):
+            return
+        stem, sheet = stream
+        df = pd.DataFrame(columns)
+        if 'csv' in self.formats:
+            self._append_csv(stem, df)
+        if 'parquet' in self.formats:
+            self._append_parquet(stem, df)
+        if self.excel:
+            self._excel_stream().append(sheet, df.columns, df.itertuples(index=False))
+
+    def _append_csv(self, stem, df):
+        if stem not in self._csv:
+            path = self._file_name(stem, 'csv')
+            self._csv[stem] = open(path, 'w', newline='', encoding='utf-8')
+            df.to_csv(self._csv[stem], index=False)
+        else:
+            df.to_csv(self._csv[stem], index=False, header=False)
+
+    def _append_parquet(self, stem, df):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if stem not in self._parquet:
+            path = self._file_name(stem, 'parquet')
+            self._parquet[stem] = pq.ParquetWriter(path, table.schema)
+        self._parquet[stem].write_table(table)
+
+    def _excel_stream(self):
+        if self._excel is None:
+            path = self._file_name('comprehensive_forecast', 'xlsx')
+            self._excel = _ExcelStream(path)
+        return self._excel
+
+    def close(self):
+        """Publish the export, or reuse an identical one; returns the file paths"""
+        try:
+            self._finish_writes()
+        except BaseException:
+            self.abort()
+            raise
+
+        self.key = self._hasher.hexdigest()
+        with ExportManifest(self.output_dir).transaction() as manifest:
+            existing = manifest.lookup(self.key)
+            if existing:
+                self.abort()
+                self.paths = existing
+                self.reused = True
+                print(f"♻️ Identical export already exists ({self.key[:12]}), reusing {len(existing)} files")
+                return self.paths
+
+            self.paths = []
+            for path, stem, ext in self._outputs:
+                final_path = os.path.abspath(self._final_name(stem, ext))
+                os.replace(path, final_path)
+                self.paths.append(final_path)
+            self._outputs = []
+            manifest.add(self.key, self.paths, {
+                'formats': list(self.formats),
+                'excel': self.excel,
+                'months_ahead': self.months_ahead,
+                'entities': self.entities,
+            })
+
+        for path in self.paths:
+            print(f"✅ Exported: {path}")
+        return self.paths
+
+    def _finish_writes(self):
+        """Write the remaining batches (summaries last) and close the writers"""
+        streams = sorted(self._pending, key=lambda stream: stream[0] == 'forecast_summary')
+        for stream in streams:
+            self._flush(stream)
+        for fh in self._csv.values():
+            fh.close()
+        for writer in self._parquet.values():
+            writer.close()
+        self._csv.clear()
+        self._parquet.clear()
+        if self._excel is not None:
+            self._excel.close()
+            self._excel = None
+
+    def abort(self):
+        """Close the writers and delete the temporary files; nothing is published"""
+        for fh in self._csv.values():
+            fh.close()
+        for writer in self._parquet.values():
+            writer.close()
+        self._csv.clear()
+        self._parquet.clear()
+        self._excel = None
+        self._pending.clear()
+        self._pending_rows.clear()
+        for path, _, _ in self._outputs:
+            if os.path.exists(path):
+                os.remove(path)
+        self._outputs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
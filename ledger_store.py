@@ -0,0 +1,363 @@
+# Embedded Ledger Store
+# מאגר ספרי חשבונות מאונדקס לפי ישות ותקופה
+
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from money import MONEY_SCALE, check_sum_bound, to_units
+
+# Setting FINANCIAL_LEDGER_STORE=<ledger.db> makes financial_metrics.load_ledger
+# read through the store instead of parsing the CSV on every call
+STORE_ENV = 'FINANCIAL_LEDGER_STORE'
+DEFAULT_STORE = 'ledger_store.db'
+
+# Ledger column -> SQL column (the CSV names are not valid identifiers)
+VALUE_COLUMNS = {
+    'revenue': 'revenue',
+    'opex': 'opex',
+    'tax': 'tax',
+    'fianance cost': 'finance_cost',
+    'sg@a': 'sga',
+}
+NET_PROFIT_SQL = "revenue - opex - tax - finance_cost - sga"
+METRICS = list(VALUE_COLUMNS.values()) + ['net_profit']
+# Amounts are stored as INTEGER fixed-point units (see money.py), so SQL sums are exact.
+# A missing amount is NULL: SUM skips it, as pandas skips NaN.
+# Bump STORE_VERSION when the schema changes; older stores are rebuilt on open.
+STORE_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    entity TEXT PRIMARY KEY,
+    path TEXT,
+    digest TEXT,
+    rows INTEGER,
+    loaded REAL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    entity TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    period TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    quarter INTEGER NOT NULL,
+    monthes TEXT,
+    revenue INTEGER, opex INTEGER, tax INTEGER, finance_cost INTEGER, sga INTEGER,
+    PRIMARY KEY (entity, seq)
+);
+CREATE INDEX IF NOT EXISTS postings_period ON postings (entity, period);
+CREATE TABLE IF NOT EXISTS monthly (
+    entity TEXT NOT NULL,
+    period TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    quarter INTEGER NOT NULL,
+    revenue INTEGER, opex INTEGER, tax INTEGER, finance_cost INTEGER, sga INTEGER, net_profit INTEGER,
+    postings INTEGER,
+    PRIMARY KEY (entity, period)
+);
+CREATE TABLE IF NOT EXISTS quarterly (
+    entity TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    quarter INTEGER NOT NULL,
+    quarter_label TEXT,
+    revenue INTEGER, opex INTEGER, tax INTEGER, finance_cost INTEGER, sga INTEGER, net_profit INTEGER,
+    months INTEGER,
+    PRIMARY KEY (entity, year, quarter)
+);
+"""
+
+
+def _period_clause(start=None, end=None):
+    """SQL condition and arguments for an inclusive 'YYYY-MM' period range"""
+    clause, args = '', []
+    if start:
+        clause += " AND period >= ?"
+        args.append(start)
+    if end:
+        clause += " AND period <= ?"
+        args.append(end)
+    return clause, args
+
+
+def _units_or_null(values):
+    """Fixed-point units of a column, and the same as a list with None (SQL NULL) for missing amounts"""
+    missing = np.isnan(values)
+    units = to_units(np.where(missing, 0.0, values))
+    return units, [None if gap else unit for unit, gap in zip(units.tolist(), missing.tolist())]
+
+
+def _posting_units(entity, df):
+    """
+    Fixed-point unit columns of a ledger, checked against the store's range
+
+    Raises:
+        OverflowError: If an amount cannot be stored exactly, or the monthly,
+            quarterly or net-profit sums could exceed the INTEGER range
+    """
+    columns, units = [], []
+    for column in VALUE_COLUMNS:
+        try:
+            column_units, column_values = _units_or_null(df[column].to_numpy(dtype='float64'))
+        except OverflowError as e:
+            raise OverflowError(f"Ledger '{entity}': column '{column}' has an amount the store cannot "
+                                f"hold exactly ({e}); split or rescale the ledger") from None
+        columns.append(column_values)
+        units.append(column_units)
+    try:
+        # Every aggregate is a sum of at most all the ledger's amounts
+        check_sum_bound(np.concatenate(units))
+    except OverflowError as e:
+        raise OverflowError(f"Ledger '{entity}': {e}; split or rescale the ledger") from None
+    return columns
+
+
+def _default_entity(path):
+    """Default entity name of a ledger file: its file name without extension"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _amounts(df, columns):
+    """Convert fixed-point unit columns read from SQL to float amounts (NULL becomes NaN)"""
+    return df.assign(**{column: df[column].astype('float64') / MONEY_SCALE for column in columns})
+
+
+class LedgerStore:
+    """
+    SQLite store of raw postings plus monthly and quarterly aggregates
+
+    Every table is keyed by entity and period, so a question such as
+    "Q3 revenue for entity X" is an index lookup instead of a CSV scan.
+    A ledger file is re-ingested only when its content hash changes.
+
+    Usage:
+        with LedgerStore('ledger.db') as store:
+            store.ingest('ledgers/acme.csv')
+            store.value('acme', 'revenue', year=2025, quarter=3)
+    """
+
+    def __init__(self, path=DEFAULT_STORE, timeout=30):
+        """
+        Args:
+            path (str): SQLite database file (':memory:' for a temporary store)
+            timeout (float): Seconds to wait for a lock held by another process
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=timeout)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != STORE_VERSION:
+            # Older layout (e.g. REAL amounts): drop it, ledgers are re-ingested on next load
+            with self.conn:
+                for table in ('sources', 'postings', 'monthly', 'quarterly'):
+                    self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+                self.conn.execute(f"PRAGMA user_version = {STORE_VERSION}")
+        self.conn.executescript(SCHEMA)
+
+    # -- Ingestion --------------------------------------------------------
+
+    def ingest(self, csv_file_path, entity=None, force=False):
+        """
+        Load a ledger CSV and rebuild its aggregates, unless it is unchanged
+
+        Args:
+            csv_file_path (str): Ledger CSV
+            entity (str, optional): Entity name (default: the file name without extension)
+            force (bool): Re-ingest even if the file hash matches the stored one
+
+        Returns:
+            tuple: (entity, rows, ingested) - ingested is False when the stored copy was current
+
+        Raises:
+            ValueError: If no entity is given and the default name was ingested from another file
+        """
+        from financial_metrics import load_ledger
+        from run_manifest import file_digest
+
+        path = os.path.abspath(csv_file_path)
+        explicit = entity is not None
+        entity = entity or _default_entity(path)
+        digest = file_digest(csv_file_path)
+        row = self.conn.execute("SELECT digest, rows, path FROM sources WHERE entity = ?", (entity,)).fetchone()
+        if not explicit and row and row[2] and os.path.realpath(row[2]) != os.path.realpath(path):
+            # a/ledger.csv and b/ledger.csv would otherwise silently replace each other
+            raise ValueError(f"Entity '{entity}' is already ingested from {row[2]}; "
+                             f"pass an explicit entity for {path}")
+        if row and row[0] == digest and not force:
+            return entity, row[1], False
+
+        df = load_ledger(csv_file_path, store=False)
+        self.ingest_frame(entity, df, path=path, digest=digest)
+        return entity, len(df), True
+
+    def ingest_frame(self, entity, df, path=None, digest=None):
+        """
+        Replace an entity's postings with a ledger DataFrame (as returned by load_ledger)
+
+        Args:
+            entity (str): Entity name
+            df (pd.DataFrame): Raw postings with a 'date' column
+            path (str, optional): Source file recorded in the sources table
+            digest (str, optional): Source content hash
+
+        Raises:
+            OverflowError: If the amounts are beyond the exact fixed-point range
+                (the entity's stored postings are left unchanged)
+        """
+        dates = df['date']
+        records = zip(
+            range(len(df)),
+            dates.dt.strftime('%Y-%m'),
+            dates.dt.year.astype(int).tolist(),
+            dates.dt.quarter.astype(int).tolist(),
+            df['monthes'].astype(str),
+            *_posting_units(entity, df),
+        )
+        with self.conn:
+            for table in ('postings', 'monthly', 'quarterly'):
+                self.conn.execute(f"DELETE FROM {table} WHERE entity = ?", (entity,))
+            self.conn.executemany(
+                "INSERT INTO postings (entity, seq, period, year, quarter, monthes, "
+                "revenue, opex, tax, finance_cost, sga) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((entity,) + record for record in records))
+            self._build_aggregates(entity)
+            self.conn.execute("INSERT OR REPLACE INTO sources (entity, path, digest, rows, loaded) "
+                              "VALUES (?, ?, ?, ?, ?)", (entity, path, digest, len(df), time.time()))
+
+    def _build_aggregates(self, entity):
+        sums = ", ".join(f"SUM({column})" for column in VALUE_COLUMNS.values())
+        self.conn.execute(
+            f"INSERT INTO monthly SELECT entity, period, MIN(year), MIN(quarter), {sums}, "
+            f"SUM({NET_PROFIT_SQL}), COUNT(*) FROM postings WHERE entity = ? GROUP BY period", (entity,))
+        sums = ", ".join(f"SUM({column})" for column in METRICS)
+        self.conn.execute(
+            f"INSERT INTO quarterly SELECT entity, year, quarter, 'Q' || quarter || '-' || year, {sums}, COUNT(*) "
+            f"FROM monthly WHERE entity = ? GROUP BY year, quarter", (entity,))
+
+    def drop(self, entity):
+        """Remove an entity from every table"""
+        with self.conn:
+            for table in ('postings', 'monthly', 'quarterly', 'sources'):
+                self.conn.execute(f"DELETE FROM {table} WHERE entity = ?", (entity,))
+
+    # -- Queries ----------------------------------------------------------
+
+    def entities(self):
+        """Ingested entities with their source path, row count and load time"""
+        rows = self.conn.execute("SELECT entity, path, rows, loaded FROM sources ORDER BY entity").fetchall()
+        return [{'entity': entity, 'path': path, 'rows': count, 'loaded': loaded}
+                for entity, path, count, loaded in rows]
+
+    def postings(self, entity, start=None, end=None):
+        """
+        Raw postings of one entity in ledger order, shaped like load_ledger's output
+
+        Args:
+            entity (str): Entity name
+            start (str, optional): First period 'YYYY-MM'
+            end (str, optional): Last period 'YYYY-MM'
+
+        Returns:
+            pd.DataFrame: 'monthes', the value columns and 'date'
+        """
+        import pandas as pd
+        clause, args = _period_clause(start, end)
+        columns = ", ".join(VALUE_COLUMNS.values())
+        df = pd.read_sql_query(f"SELECT monthes, {columns} FROM postings WHERE entity = ?{clause} ORDER BY seq",
+                               self.conn, params=[entity] + args)
+        df = _amounts(df, VALUE_COLUMNS.values()).rename(columns={sql: name for name, sql in VALUE_COLUMNS.items()})
+        df['date'] = pd.to_datetime(df['monthes'], format='%b-%y')
+        return df
+
+    def monthly(self, entity, start=None, end=None):
+        """
+        Monthly totals of one entity
+
+        Returns:
+            pd.DataFrame: Indexed by monthly pd.Period, with the ledger value
+                columns and 'net_profit_after_tax' (the columns forecast_scenarios uses)
+        """
+        import pandas as pd
+        clause, args = _period_clause(start, end)
+        df = pd.read_sql_query(f"SELECT period, {', '.join(METRICS)} FROM monthly WHERE entity = ?{clause} "
+                               "ORDER BY period", self.conn, params=[entity] + args)
+        df.index = pd.PeriodIndex(df.pop('period'), freq='M', name='date')
+        df = _amounts(df, METRICS)
+        names = {sql: name for name, sql in VALUE_COLUMNS.items()}
+        names['net_profit'] = 'net_profit_after_tax'
+        return df.rename(columns=names)
+
+    def quarterly(self, entity, year=None, quarter=None):
+        """
+        Quarterly totals of one entity, in chronological order
+
+        Returns:
+            pd.DataFrame: Indexed by quarter label ('Q1-2025'), with the value
+                columns, 'net_profit_after_tax' and the number of months
+        """
+        import pandas as pd
+        clause, args = '', [entity]
+        if year is not None:
+            clause += " AND year = ?"
+            args.append(year)
+        if quarter is not None:
+            clause += " AND quarter = ?"
+            args.append(quarter)
+        df = pd.read_sql_query(f"SELECT quarter_label, {', '.join(METRICS)}, months FROM quarterly "
+                               f"WHERE entity = ?{clause} ORDER BY year, quarter", self.conn, params=args)
+        names = {sql: name for name, sql in VALUE_COLUMNS.items()}
+        names['net_profit'] = 'net_profit_after_tax'
+        return _amounts(df, METRICS).set_index('quarter_label').rename(columns=names)
+
+    def value(self, entity, metric, year, quarter=None, month=None):
+        """
+        One aggregate value by index lookup, e.g. value('acme', 'revenue', 2025, quarter=3)
+
+        Args:
+            entity (str): Entity name
+            metric (str): 'revenue', 'opex', 'tax', 'finance_cost', 'sga' or 'net_profit'
+                (ledger names such as 'fianance cost' are accepted too)
+            year (int): Calendar year
+            quarter (int, optional): Quarter 1-4
+            month (int, optional): Month 1-12 (takes precedence over quarter)
+
+        Returns:
+            float or None: The total, or None if the entity has no data for the period
+        """
+        column = VALUE_COLUMNS.get(metric, metric)
+        if column not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {METRICS}")
+        if month is not None:
+            row = self.conn.execute(f"SELECT {column} FROM monthly WHERE entity = ? AND period = ?",
+                                    (entity, f"{year:04d}-{month:02d}")).fetchone()
+        elif quarter is not None:
+            row = self.conn.execute(f"SELECT {column} FROM quarterly WHERE entity = ? AND year = ? AND quarter = ?",
+                                    (entity, year, quarter)).fetchone()
+        else:
+            row = self.conn.execute(f"SELECT SUM({column}) FROM quarterly WHERE entity = ? AND year = ?",
+                                    (entity, year)).fetchone()
+        return row[0] / MONEY_SCALE if row and row[0] is not None else None
+
+    def load(self, csv_file_path, entity=None):
+        """Ingest a ledger if it changed, then return its postings (load_ledger through the store)"""
+        entity, _, _ = self.ingest(csv_file_path, entity)
+        return self.postings(entity)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def print_quarterly(store, entity, year=None, quarter=None):
+    """Print an entity's quarterly totals from the store"""
+    table = store.quarterly(entity, year=year, quarter=quarter)
+    print(f"\n📊 {entity}: quarterly totals ({len(table)} quarters)")
+    print(table.round(2).to_string())
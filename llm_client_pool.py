@@ -0,0 +1,150 @@
+# Shared LLM HTTP Client Pool
+# מאגר חיבורי HTTP משותף לכל הסוכנים והצוותים
+
+import atexit
+import importlib.util
+import threading
+
+# Connection limits of the process-wide pool
+MAX_CONNECTIONS = 32
+MAX_KEEPALIVE_CONNECTIONS = 16
+# Seconds an idle connection is kept open for the next request
+KEEPALIVE_EXPIRY = 120.0
+# Completions can take a while; connecting should not
+TIMEOUT = 120.0
+CONNECT_TIMEOUT = 10.0
+
+
+class PoolMetrics:
+    """Requests, new connections and TLS handshakes, counted from httpcore trace events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {'requests': 0, 'connections': 0, 'tls_handshakes': 0, 'http2_requests': 0}
+
+    def trace(self, event_name, info):
+        if event_name == 'connection.connect_tcp.complete':
+            key = 'connections'
+        elif event_name == 'connection.start_tls.complete':
+            key = 'tls_handshakes'
+        elif event_name.endswith('send_request_headers.started'):
+            key = 'requests'
+            if event_name.startswith('http2.'):
+                with self._lock:
+                    self.counts['http2_requests'] += 1
+        else:
+            return
+        with self._lock:
+            self.counts[key] += 1
+
+    def on_request(self, request):
+        """httpx request hook: attach the trace callback"""
+        request.extensions['trace'] = self.trace
+
+    def summary(self):
+        """Counts plus how many requests went over an already open connection"""
+        with self._lock:
+            counts = dict(self.counts)
+        counts['reused'] = max(counts['requests'] - counts['connections'], 0)
+        counts['reuse_ratio'] = counts['reused'] / counts['requests'] if counts['requests'] else 0.0
+        return counts
+
+
+class LLMClientPool:
+    """
+    One keep-alive HTTP client for every LLM request in the process
+
+    Agents and crews come and go (a batch builds a crew per ledger), but the
+    connections stay open in this pool, so only the first request to the
+    API pays for TCP and TLS setup. HTTP/2 is used when the h2 package is
+    installed, multiplexing concurrent requests over one connection.
+
+    Usage:
+        pool = shared_pool()
+        pool.install()                      # LiteLLM (crewai's LLM) uses the pool
+        client = pool.openai_client()       # or an OpenAI client on the pool
+        print(pool.summary())
+    """
+
+    def __init__(self, max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                 keepalive_expiry=KEEPALIVE_EXPIRY, http2=None):
+        """
+        Args:
+            max_connections (int): Upper bound of open connections
+            max_keepalive_connections (int): Idle connections kept open
+            keepalive_expiry (float): Seconds before an idle connection is closed
+            http2 (bool, optional): Use HTTP/2 (default: when h2 is installed)
+        """
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = importlib.util.find_spec('h2') is not None if http2 is None else http2
+        self.metrics = PoolMetrics()
+        self._client = None
+        self._openai_clients = {}
+        self._lock = threading.RLock()
+
+    @property
+    def client(self):
+        """The shared httpx.Client, created on first use"""
+        with self._lock:
+            if self._client is None:
+                import httpx
+                limits = httpx.Limits(max_connections=self.max_connections,
+                                      max_keepalive_connections=self.max_keepalive_connections,
+                                      keepalive_expiry=self.keepalive_expiry)
+                # retries=1 reconnects once when a kept-alive connection was closed by the server
+                transport = httpx.HTTPTransport(http2=self.http2, limits=limits, retries=1)
+                self._client = httpx.Client(transport=transport,
+                                            timeout=httpx.Timeout(TIMEOUT, connect=CONNECT_TIMEOUT),
+                                            event_hooks={'request': [self.metrics.on_request]})
+            return self._client
+
+    def openai_client(self, api_key=None, base_url=None):
+        """An openai.OpenAI client on the pool, one per API key and base URL"""
+        key = (api_key, base_url)
+        with self._lock:
+            if key not in self._openai_clients:
+                from openai import OpenAI
+                self._openai_clients[key] = OpenAI(api_key=api_key, base_url=base_url, http_client=self.client)
+            return self._openai_clients[key]
+
+    def install(self):
+        """
+        Make LiteLLM, which crewai's LLM calls through, send its requests on the pool
+
+        Returns:
+            bool: False if LiteLLM is not installed (older crewai releases)
+        """
+        try:
+            import litellm
+        except ImportError:
+            return False
+        if litellm.client_session is not self.client:
+            litellm.client_session = self.client
+        return True
+
+    def summary(self):
+        """Connection reuse counters, see PoolMetrics.summary"""
+        return dict(self.metrics.summary(), http2=self.http2)
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+            self._openai_clients.clear()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool():
+    """The process-wide pool, created on first use and closed at exit"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = LLMClientPool()
+            atexit.register(_shared.close)
+        return _shared
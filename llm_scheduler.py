@@ -0,0 +1,356 @@
+# LLM Request Scheduler
+# מתזמן בקשות למודל השפה לפי מגבלות קצב
+
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+
+# Account limits shared by every crew in the process. The defaults suit a low
+# usage tier; set the environment variables to your API key's limits.
+RPM_ENV = 'FINANCIAL_LLM_RPM'
+TPM_ENV = 'FINANCIAL_LLM_TPM'
+# Number of processes sharing the key (set by `cli.py crew --workers`); each gets an equal share
+WORKERS_ENV = 'FINANCIAL_LLM_WORKERS'
+DEFAULT_RPM = 500
+DEFAULT_TPM = 200_000
+
+# Buckets hold this many seconds of quota, so a cold start does not burst a whole minute
+BURST_SECONDS = 10
+# Completion tokens assumed per request when the LLM has no max_tokens
+DEFAULT_COMPLETION_TOKENS = 500
+# HTTP statuses worth retrying; 429 also pauses every caller
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Lower runs first. Validation only reviews the other agents' output, so it yields to them.
+PRIORITY_CLASSES = {'interactive': 0, 'analysis': 1, 'forecast': 2, 'validation': 3}
+AGENT_PRIORITY = {
+    'math_analyst': PRIORITY_CLASSES['analysis'],
+    'visualization_analyst': PRIORITY_CLASSES['analysis'],
+    'forecasting_analyst': PRIORITY_CLASSES['forecast'],
+    'validation_analyst': PRIORITY_CLASSES['validation'],
+}
+
+
+class TokenBucket:
+    """Refills at per_minute / 60 per second up to BURST_SECONDS of quota (not thread-safe; the scheduler locks)"""
+
+    def __init__(self, per_minute, burst_seconds=BURST_SECONDS):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount, now):
+        """Seconds until amount is available (requests larger than the bucket wait for a full one)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= amount
+
+    def drain(self):
+        """Empty the bucket, e.g. after the provider reported the limit exceeded"""
+        self.level = min(self.level, 0.0)
+
+
+class _Pending:
+    """Result slot of an in-flight request that identical requests wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def get(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def status_code(exc):
+    """HTTP status of an OpenAI / LiteLLM / httpx error, if it carries one"""
+    status = getattr(exc, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    return status
+
+
+def is_rate_limit(exc):
+    return status_code(exc) == 429 or 'RateLimit' in type(exc).__name__
+
+
+def is_retryable(exc):
+    name = type(exc).__name__
+    return is_rate_limit(exc) or status_code(exc) in RETRY_STATUSES or 'Timeout' in name or 'Connection' in name
+
+
+def retry_after(exc):
+    """Seconds the provider asked to wait (Retry-After / retry-after-ms headers), or None"""
+    headers = getattr(getattr(exc, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class LLMScheduler:
+    """
+    Central gate for LLM calls: rate limits, priorities, retries and coalescing
+
+    Every call waits in one priority queue (FIFO within a priority) until
+    the request and token buckets allow it, so the quota is spent evenly
+    instead of in bursts that end in 429s. A rate-limited call pauses the
+    whole scheduler for the provider's Retry-After (or a jittered
+    exponential backoff) and drains the request bucket, so concurrent
+    callers back off together rather than retrying into the same wall.
+    Identical prompts already in flight share one request.
+
+    Usage:
+        scheduler = shared_scheduler()
+        answer = scheduler.submit(lambda: llm.call(messages), key=prompt_key(model, messages),
+                                  priority=PRIORITY_CLASSES['validation'], tokens=1200)
+    """
+
+    def __init__(self, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, max_concurrency=16, max_retries=5,
+                 base_delay=1.0, max_delay=60.0, seed=None):
+        """
+        Args:
+            rpm (float): Requests per minute
+            tpm (float): Tokens (prompt + completion) per minute
+            max_concurrency (int): Requests in flight at once
+            max_retries (int): Retries per request after a retryable error
+            base_delay (float): First backoff delay in seconds, doubled per retry
+            max_delay (float): Upper bound of a backoff delay
+            seed (int, optional): Seed of the backoff jitter
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.paused_until = 0.0
+        self.stats = {'requests': 0, 'coalesced': 0, 'retries': 0, 'rate_limited': 0, 'wait_seconds': 0.0}
+        self._random = random.Random(seed)
+        self._cond = threading.Condition()
+        self._queue = []
+        self._tickets = itertools.count()
+        self._running = 0
+        self._inflight = {}
+
+    def submit(self, call, key=None, priority=PRIORITY_CLASSES['analysis'], tokens=1):
+        """
+        Run call() once the limits allow it; blocks the calling thread
+
+        Args:
+            call (callable): Performs the LLM request and returns its result
+            key (str, optional): Identity of the request (see prompt_key); an
+                identical request in flight is joined instead of sent again
+            priority (int): Lower values run first (see PRIORITY_CLASSES)
+            tokens (int): Estimated prompt + completion tokens
+
+        Returns:
+            The result of call()
+        """
+        if key is not None:
+            with self._cond:
+                pending = self._inflight.get(key)
+                leader = pending is None
+                if leader:
+                    pending = self._inflight[key] = _Pending()
+                else:
+                    self.stats['coalesced'] += 1
+            if not leader:
+                return pending.get()
+
+        try:
+            result = self._run(call, priority, tokens)
+        except BaseException as exc:
+            if key is not None:
+                pending.error = exc
+            raise
+        else:
+            if key is not None:
+                pending.result = result
+            return result
+        finally:
+            if key is not None:
+                with self._cond:
+                    self._inflight.pop(key, None)
+                pending.done.set()
+
+    def _run(self, call, priority, tokens):
+        # One ticket for all attempts: a retried request keeps its place in line
+        ticket = (priority, next(self._tickets))
+        for attempt in range(self.max_retries + 1):
+            self._acquire(ticket, tokens)
+            try:
+                return call()
+            except Exception as exc:
+                if attempt == self.max_retries or not is_retryable(exc):
+                    raise
+                error = exc
+            finally:
+                self._release()
+            self._backoff(error, attempt)
+
+    def _acquire(self, ticket, tokens):
+        start = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if self._queue[0] == ticket and self._running < self.max_concurrency:
+                        wait = max(self.paused_until - now, self.requests.delay(1, now),
+                                   self.tokens.delay(tokens, now))
+                        if wait <= 0:
+                            break
+                    self._cond.wait(wait)
+            except BaseException:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._queue)
+            self.requests.take(1, now)
+            self.tokens.take(tokens, now)
+            self._running += 1
+            self.stats['requests'] += 1
+            self.stats['wait_seconds'] += now - start
+            # The next ticket in line re-checks the limits
+            self._cond.notify_all()
+
+    def _release(self):
+        with self._cond:
+            self._running -= 1
+            self._cond.notify_all()
+
+    def _backoff(self, exc, attempt):
+        """Delay the retry; a 429 pauses every caller, not just this one"""
+        cap = min(self.max_delay, self.base_delay * 2 ** attempt)
+        # Equal jitter: at least half the exponential delay, so retries never come back at once
+        delay = retry_after(exc) or cap / 2 + self._random.uniform(0, cap / 2)
+        with self._cond:
+            self.stats['retries'] += 1
+            if is_rate_limit(exc):
+                self.stats['rate_limited'] += 1
+                self.paused_until = max(self.paused_until, time.monotonic() + delay)
+                self.requests.drain()
+                self._cond.notify_all()
+                return
+        time.sleep(delay)
+
+    def summary(self):
+        """Counters since the scheduler was created"""
+        with self._cond:
+            return dict(self.stats, rpm=self.rpm, tpm=self.tpm, queued=len(self._queue), running=self._running)
+
+
+def prompt_key(model, messages, **options):
+    """Identity of an LLM request: model, messages and options that change the answer"""
+    payload = json.dumps([model, messages, options], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def estimate_tokens(messages, completion_tokens=DEFAULT_COMPLETION_TOKENS):
+    """Prompt tokens at ~4 characters per token (as model_config.estimate_cost) plus the completion budget"""
+    if isinstance(messages, str):
+        text_length = len(messages)
+    else:
+        text_length = sum(len(str(message.get('content') or '')) for message in messages)
+    return text_length // 4 + completion_tokens
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_scheduler():
+    """
+    The process-wide scheduler, created on first use
+
+    Limits come from FINANCIAL_LLM_RPM / FINANCIAL_LLM_TPM and are divided by
+    FINANCIAL_LLM_WORKERS when several processes share the API key.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            workers = max(1, int(os.environ.get(WORKERS_ENV, 1)))
+            _shared = LLMScheduler(rpm=float(os.environ.get(RPM_ENV, DEFAULT_RPM)) / workers,
+                                   tpm=float(os.environ.get(TPM_ENV, DEFAULT_TPM)) / workers)
+        return _shared
+
+
+def schedule_llm(llm, scheduler, priority):
+    """
+    Route an LLM object's call() through the scheduler
+
+    Args:
+        llm: crewai LLM (anything with call(messages, ...) and a model attribute)
+        scheduler (LLMScheduler): Scheduler shared by the crews
+        priority (int): Priority of this agent's requests
+
+    Returns:
+        The same LLM object
+    """
+    call = llm.call
+    completion_tokens = getattr(llm, 'max_tokens', None) or DEFAULT_COMPLETION_TOKENS
+
+    def scheduled_call(messages, *args, **kwargs):
+        tools = kwargs.get('tools')
+        key = prompt_key(getattr(llm, 'model', None), messages, temperature=getattr(llm, 'temperature', None),
+                         tools=tools)
+        return scheduler.submit(lambda: call(messages, *args, **kwargs), key=key, priority=priority,
+                                tokens=estimate_tokens(messages, completion_tokens))
+
+    llm.call = scheduled_call
+    return llm
+
+
+def scheduled_llm(scheduler, priority, model=None, **options):
+    """
+    A crewai LLM for the configured model whose calls go through the scheduler
+
+    Args:
+        scheduler (LLMScheduler): Scheduler shared by the crews
+        priority (int): Priority of the LLM's requests
+        model (str, optional): Model name (default: OPENAI_MODEL_NAME)
+        **options: Further LLM arguments, e.g. max_tokens
+
+    Returns:
+        crewai.LLM, or None with crewai releases that have no LLM class
+        (agents then keep their default model and static max_rpm)
+    """
+    try:
+        from crewai import LLM
+    except ImportError:
+        return None
+    from model_config import DEFAULT_MODEL
+    model = model or os.environ.get('OPENAI_MODEL_NAME', DEFAULT_MODEL)
+    base_url = os.environ.get('OPENAI_API_BASE') or os.environ.get('OPENAI_BASE_URL')
+    if base_url:
+        options['base_url'] = base_url
+    llm = LLM(model=model, **options)
+    return schedule_llm(llm, scheduler, priority)
@@ -0,0 +1,131 @@
+# Fixed-Point Money Arithmetic
+# חשבון כספי בנקודה קבועה
+
+import numpy as np
+
+# Amounts are held as int64 multiples of 1/MONEY_SCALE. Four decimals cover
+# every amount in the ledgers (e.g. 1454.775). Single amounts convert up to
+# about 9e11 (to_units and round_units raise OverflowError beyond, before any
+# cast can wrap); int64 totals reach about 9e14, and numpy sums wrap around
+# silently past that, so check_sum_bound has to pass before summing.
+MONEY_SCALE = 10_000
+MONEY_DECIMALS = 4
+MONEY_DTYPE = np.int64
+
+# Largest magnitude whose scaled value still converts from float64 exactly
+_EXACT_LIMIT = 2 ** 53 / MONEY_SCALE
+_MAX_UNITS = np.iinfo(MONEY_DTYPE).max
+
+
+def to_units(values):
+    """
+    Convert amounts to scaled integers, rounding half to even at the fourth decimal
+
+    Args:
+        values: Scalar, list, np.ndarray or pd.Series of amounts
+
+    Returns:
+        np.ndarray or np.int64: Amounts in units of 1/MONEY_SCALE
+    """
+    amounts = np.asarray(values, dtype=np.float64)
+    scaled = np.multiply(amounts, MONEY_SCALE, out=np.empty_like(amounts))
+    return _whole_units(scaled)
+
+
+def _whole_units(scaled):
+    """Round float unit values in place and cast them to int64 once they are known to fit"""
+    np.rint(scaled, out=scaled)
+    if scaled.size:
+        # min/max propagate NaN, so two reductions check both conditions
+        low, high = scaled.min(), scaled.max()
+        if np.isnan(low) or np.isnan(high):
+            raise ValueError("Cannot convert missing amounts (NaN) to fixed-point money")
+        if max(-low, high) >= 2 ** 53:
+            raise OverflowError(f"Amount too large for fixed-point money (limit {_EXACT_LIMIT:,.0f})")
+    units = scaled.astype(MONEY_DTYPE)
+    return units if units.ndim else MONEY_DTYPE(units)
+
+
+def check_sum_bound(units):
+    """
+    Raise OverflowError unless any sum of the given units fits in int64
+
+    The bound is the number of amounts times the largest magnitude, so every
+    partial total (per month, quarter or year) is covered as well.
+
+    Args:
+        units: Unit array or scalar
+    """
+    units = np.asarray(units, dtype=MONEY_DTYPE)
+    # Python ints: np.abs of the int64 minimum is still negative
+    if units.size and max(int(units.max()), -int(units.min())) * units.size > _MAX_UNITS:
+        raise OverflowError(f"Total of {units.size} amounts may exceed the fixed-point range "
+                            f"(about {_MAX_UNITS / MONEY_SCALE:,.0f})")
+
+
+def from_units(units):
+    """Convert scaled integers back to float amounts (the nearest float to the exact value)"""
+    return np.asarray(units, dtype=np.float64) / MONEY_SCALE
+
+
+def round_units(values):
+    """Round float unit values (e.g. after multiplying by a rate) to whole units, half to even"""
+    return _whole_units(np.array(values, dtype=np.float64))
+
+
+def add(*operands):
+    """Exact sum of unit arrays or scalars, element-wise"""
+    result = np.asarray(operands[0], dtype=MONEY_DTYPE)
+    for operand in operands[1:]:
+        result = result + np.asarray(operand, dtype=MONEY_DTYPE)
+    return result
+
+
+def subtract(minuend, *subtrahends):
+    """Exact minuend - subtrahend - ..., element-wise on unit arrays"""
+    result = np.asarray(minuend, dtype=MONEY_DTYPE)
+    for operand in subtrahends:
+        result = result - np.asarray(operand, dtype=MONEY_DTYPE)
+    return result
+
+
+def multiply(units, factor):
+    """
+    Scale amounts by a rate or factor and round to whole units
+
+    Args:
+        units: Unit array or scalar
+        factor: Float factor or array of factors (broadcast against units)
+
+    Returns:
+        np.ndarray: Rounded units
+    """
+    return round_units(np.asarray(units, dtype=np.float64) * factor)
+
+
+def total(units):
+    """Exact total of a unit array, as a float amount (OverflowError if it could exceed int64)"""
+    check_sum_bound(units)
+    return float(np.asarray(units, dtype=MONEY_DTYPE).sum()) / MONEY_SCALE
+
+
+def compound(base_units, rate, periods):
+    """
+    Amounts growing at a constant rate per period, each rounded to whole units
+
+    Period i (1-based) is base * (1 + rate) ** i. Growth factors stay in
+    float64 and each amount is rounded from base once, so rounding never
+    compounds from one period to the next. Growth past the fixed-point
+    range raises OverflowError.
+
+    Args:
+        base_units: Starting amount in units
+        rate (float): Growth rate per period
+        periods (int): Number of periods
+
+    Returns:
+        np.ndarray: Units for periods 1..periods
+    """
+    factors = np.cumprod(np.full(periods, 1 + rate, dtype=np.float64))
+    return multiply(base_units, factors)
+
@@ -0,0 +1,308 @@
+# Result Renderers
+# הצגת תוצאות הניתוח בפורמטים שונים
+
+import json
+
+import numpy as np
+import pandas as pd
+
+MONTHLY_HEADER = (f"{'Month':<12} {'Revenue':<12} {'OPEX':<12} {'Tax':<12} {'Finance':<12} "
+                  f"{'SG&A':<12} {'Net Profit':<12} {'Margin':<10}")
+SCENARIOS = ['Conservative', 'Moderate', 'Optimistic']
+
+
+def render_forecast_console(all_forecast_data):
+    """
+    Print the monthly forecast tables of all scenarios
+
+    Args:
+        all_forecast_data (dict): Output of forecast_scenarios
+    """
+    lines = ["\n📅 MONTHLY FORECAST TABLE - טבלת תחזית חודשית", "=" * 80]
+
+    for scenario_name, data in all_forecast_data.items():
+        months_ahead = len(data['Month'])
+        lines.append(f"\n🎯 {scenario_name.upper()} SCENARIO - תרחיש {scenario_name}")
+        lines.append("-" * 80)
+        lines.append(MONTHLY_HEADER)
+        lines.append("-" * 100)
+        for month, revenue, opex, tax, finance, sga, profit, margin in zip(
+                data['Month'], data['Revenue'], data['OPEX'], data['Tax'], data['Finance_Cost'],
+                data['SG&A'], data['Net_Profit'], data['Profit_Margin_%']):
+            lines.append(f"{month:<12} ${revenue:<11,.0f} ${opex:<11,.0f} ${tax:<11,.0f} "
+                         f"${finance:<11,.0f} ${sga:<11,.0f} ${profit:<11,.0f} {margin:<9.1f}%")
+        lines.append("-" * 100)
+        lines.append(f"📊 {scenario_name} Scenario Summary:")
+        lines.append(f"   Total Forecast Revenue: ${data['Total_Revenue']:,.2f}")
+        lines.append(f"   Total Forecast Profit: ${data['Total_Profit']:,.2f}")
+        lines.append(f"   Average Monthly Revenue: ${data['Total_Revenue']/months_ahead:,.2f}")
+        lines.append(f"   Average Monthly Profit: ${data['Total_Profit']/months_ahead:,.2f}")
+
+    print("\n".join(lines))
+
+
+def render_console(results, include_forecast=True):
+    """
+    Print the detailed results in the console layout of display_detailed_results
+
+    Args:
+        results (dict): Output of compute_detailed_results
+        include_forecast (bool): Also print the monthly forecast tables
+    """
+    metrics = results['metrics']
+    lines = ["=" * 80, "FINANCIAL ANALYSIS RESULTS - תוצאות ניתוח פיננסי", "=" * 80]
+
+    # 1. Key Metrics
+    start, end = results['date_range']
+    lines += ["\n📊 KEY FINANCIAL METRICS:", "-" * 50,
+              f"Total Revenue:                    ${metrics['total_revenue']:>15,.2f}",
+              f"Total Net Profit After Tax:       ${metrics['total_profit']:>15,.2f}",
+              f"Total NPV (6% discount):          ${metrics['total_npv']:>15,.2f}",
+              f"Average Profit Margin:            {metrics['avg_profit_margin']:>15.2f}%",
+              f"Number of Records:                {results['records']:>15}",
+              f"Date Range:                       {start.strftime('%Y-%m'):>15} to {end.strftime('%Y-%m'):>15}"]
+
+    # 2. Quarterly Analysis
+    quarterly = results['quarterly']
+    lines += ["\n📈 QUARTERLY PERFORMANCE ANALYSIS:", "-" * 50,
+              f"{'Quarter':<12} {'Revenue':<15} {'Net Profit':<15} {'NPV':<15}", "-" * 60]
+    for quarter, revenue, profit, npv in zip(quarterly.index, quarterly['revenue'],
+                                            quarterly['net_profit_after_tax'], quarterly['npv_net_profit']):
+        lines.append(f"{quarter:<12} ${revenue:<14,.0f} ${profit:<14,.0f} ${npv:<14,.0f}")
+
+    # 3. Monthly Detailed Analysis
+    monthly = results['monthly']
+    lines += ["\n📅 MONTHLY DETAILED ANALYSIS:", "-" * 50, MONTHLY_HEADER, "-" * 100]
+    for month, revenue, opex, tax, finance, sga, profit, margin in zip(
+            monthly['monthes'], monthly['revenue'], monthly['opex'], monthly['tax'], monthly['fianance cost'],
+            monthly['sg@a'], monthly['net_profit_after_tax'], monthly['profit_margin']):
+        lines.append(f"{month:<12} ${revenue:<11,.0f} ${opex:<11,.0f} ${tax:<11,.0f} ${finance:<11,.0f} "
+                     f"${sga:<11,.0f} ${profit:<11,.0f} {margin:<9.1f}%")
+
+    # 4. NPV Analysis
+    npv = results['npv']
+    lines += ["\n💰 NPV ANALYSIS (6% Discount Rate) - CORRECTED FORMULA:", "-" * 50,
+              f"Total NPV (corrected formula):    ${npv['corrected']:>15,.2f}",
+              f"Previous NPV calculation:         ${npv['previous']:>15,.2f}",
+              f"Difference:                       ${npv['difference']:>15,.2f}",
+              f"NPV as % of total profit:         {npv['pct_of_profit']:>15.1f}%",
+              f"Discount rate applied:            {npv['discount_rate'] * 100:>15.0f}%",
+              "Formula used: NPV = Σ(CF_t / (1 + r)^t)"]
+
+    # 5. Performance Highlights
+    highlights = results['highlights']
+    lines += ["\n🏆 PERFORMANCE HIGHLIGHTS:", "-" * 50]
+    for label, key in [('Best Revenue Month:', 'best_revenue_month'), ('Worst Revenue Month:', 'worst_revenue_month'),
+                       ('Best Profit Month:', 'best_profit_month'), ('Worst Profit Month:', 'worst_profit_month')]:
+        lines.append(f"{label:<34}{highlights[key]['month']:<15} (${highlights[key]['value']:,.2f})")
+
+    # 6. Growth Analysis
+    growth = results['growth']
+    lines += ["\n📊 GROWTH ANALYSIS:", "-" * 50,
+              f"Revenue Growth (start to end):    {growth['revenue_growth']:>15.2f}%",
+              f"Profit Growth (start to end):     {growth['profit_growth']:>15.2f}%",
+              f"Average Monthly Revenue:          ${growth['avg_monthly_revenue']:>15,.2f}",
+              f"Average Monthly Profit:           ${growth['avg_monthly_profit']:>15,.2f}"]
+
+    # 7. Cost Structure Analysis
+    costs = results['costs']
+    revenue = metrics['total_revenue']
+    lines += ["\n💼 COST STRUCTURE ANALYSIS:", "-" * 50,
+              f"Total Operating Expenses:         ${costs['opex']:>15,.2f} ({costs['opex']/revenue*100:.1f}%)",
+              f"Total Tax:                        ${costs['tax']:>15,.2f} ({costs['tax']/revenue*100:.1f}%)",
+              f"Total Finance Cost:               ${costs['finance']:>15,.2f} ({costs['finance']/revenue*100:.1f}%)",
+              f"Total SG&A:                       ${costs['sga']:>15,.2f} ({costs['sga']/revenue*100:.1f}%)",
+              f"Total Costs:                      ${costs['total']:>15,.2f}",
+              f"Net Profit:                       ${metrics['total_profit']:>15,.2f} "
+              f"({metrics['total_profit']/revenue*100:.1f}%)"]
+
+    # 8. Statistical Summary
+    lines += ["\n📈 STATISTICAL SUMMARY:", "-" * 50]
+    for title, key in [("Revenue Statistics:", 'revenue'), ("\nProfit Statistics:", 'profit')]:
+        stats = results['statistics'][key]
+        lines += [title,
+                  f"  Mean:                           ${stats['mean']:>15,.2f}",
+                  f"  Median:                         ${stats['median']:>15,.2f}",
+                  f"  Standard Deviation:             ${stats['std']:>15,.2f}",
+                  f"  Minimum:                        ${stats['min']:>15,.2f}",
+                  f"  Maximum:                        ${stats['max']:>15,.2f}"]
+
+    # 9. Forecast Analysis
+    projections = results['projections']
+    lines += ["\n🔮 FORECAST ANALYSIS:", "-" * 50,
+              f"Revenue Growth Rate per Quarter:  {projections['revenue_growth_rate']*100:>15.2f}%",
+              f"Profit Growth Rate per Quarter:   {projections['profit_growth_rate']*100:>15.2f}%"]
+    for title, key in [("\n5-Year Revenue Projections:", 'revenue'), ("\n5-Year Profit Projections:", 'profit')]:
+        lines.append(title)
+        for scenario in SCENARIOS:
+            lines.append(f"  {scenario + ':':<32}${projections[key][scenario]:>15,.2f}")
+
+    print("\n".join(lines))
+
+    # 10. Monthly Forecast Table
+    if include_forecast:
+        render_forecast_console(results['forecast'])
+
+
+def render_summary_console(summary):
+    """
+    Print the financial summary in the layout of print_financial_summary
+
+    Args:
+        summary (dict): Output of financial_metrics.compute_financial_summary
+    """
+    print("\n" + "="*80)
+    print("📊 COMPREHENSIVE FINANCIAL ANALYSIS - ניתוח פיננסי מקיף")
+    print("="*80)
+
+    # Key Metrics
+    print(f"\n💰 KEY METRICS - מדדים מרכזיים:")
+    print(f"   Total Revenue: ${summary['total_revenue']:,.2f}")
+    print(f"   Total Net Profit After Tax: ${summary['total_profit']:,.2f}")
+    print(f"   Total NPV (6% discount): ${summary['total_npv']:,.2f}")
+    print(f"   Average Profit Margin: {summary['avg_profit_margin']:.2f}%")
+
+    # Quarterly Analysis
+    print(f"\n📈 QUARTERLY ANALYSIS - ניתוח רבעוני:")
+    print(summary['quarterly'].to_string())
+
+    # Growth Analysis
+    print(f"\n📊 GROWTH ANALYSIS - ניתוח צמיחה:")
+    print(f"   Revenue Growth: {summary['revenue_growth']:.2f}%")
+    print(f"   Profit Growth: {summary['profit_growth']:.2f}%")
+
+    # Best and Worst Performers
+    print(f"\n🏆 PERFORMANCE HIGHLIGHTS - נקודות ציון ביצועים:")
+    best_revenue = summary['best_revenue_month']
+    worst_revenue = summary['worst_revenue_month']
+    best_profit = summary['best_profit_month']
+    worst_profit = summary['worst_profit_month']
+
+    print(f"   Best Revenue Month: {best_revenue['month']} (${best_revenue['value']:,.2f})")
+    print(f"   Worst Revenue Month: {worst_revenue['month']} (${worst_revenue['value']:,.2f})")
+    print(f"   Best Profit Month: {best_profit['month']} (${best_profit['value']:,.2f})")
+    print(f"   Worst Profit Month: {worst_profit['month']} (${worst_profit['value']:,.2f})")
+
+    print("\n" + "="*80)
+
+
+def _jsonable(value):
+    """Convert result values (DataFrames, numpy scalars, timestamps) to JSON types"""
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, pd.DataFrame):
+        return _jsonable(value.reset_index().to_dict('records'))
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    return value
+
+
+def render_json(results, indent=2):
+    """
+    Serialize the detailed results as JSON
+
+    Args:
+        results (dict): Output of compute_detailed_results
+        indent (int, optional): JSON indentation (None for compact output)
+
+    Returns:
+        str: JSON document
+    """
+    return json.dumps(_jsonable(results), indent=indent, ensure_ascii=False)
+
+
+def render_markdown(results, include_monthly_forecast=False):
+    """
+    Render the detailed results as a Markdown report in the layout of financial_report.md
+
+    Args:
+        results (dict): Output of compute_detailed_results
+        include_monthly_forecast (bool): Add the month-by-month forecast table of every scenario
+
+    Returns:
+        str: Markdown document
+    """
+    metrics = results['metrics']
+    growth = results['growth']
+    revenue = metrics['total_revenue']
+
+    lines = ["# Financial Analysis Report", "# דוח ניתוח פיננסי", "",
+             "## 📊 Key Financial Metrics", "",
+             "| Metric | Value |", "|--------|-------|",
+             f"| **Total Revenue** | ${revenue:,.2f} |",
+             f"| **Total Net Profit After Tax** | ${metrics['total_profit']:,.2f} |",
+             f"| **Total NPV ({results['npv']['discount_rate']:.0%} discount rate)** | ${metrics['total_npv']:,.2f} |",
+             f"| **Average Profit Margin** | {metrics['avg_profit_margin']:.2f}% |",
+             f"| **Revenue Growth Rate** | {growth['revenue_growth']:.2f}% |",
+             f"| **Profit Growth Rate** | {growth['profit_growth']:.2f}% |",
+             "", "---", "",
+             "## 📈 Quarterly Performance Analysis", "",
+             "| Quarter | Revenue | Net Profit | NPV |", "|---------|---------|------------|-----|"]
+    quarterly = results['quarterly']
+    for quarter, q_revenue, profit, npv in zip(quarterly.index, quarterly['revenue'],
+                                              quarterly['net_profit_after_tax'], quarterly['npv_net_profit']):
+        lines.append(f"| {quarter} | ${q_revenue:,.2f} | ${profit:,.2f} | ${npv:,.2f} |")
+
+    highlights = results['highlights']
+    lines += ["", "---", "", "## 🏆 Performance Highlights", ""]
+    for label, key in [('Best Revenue Month', 'best_revenue_month'), ('Worst Revenue Month', 'worst_revenue_month'),
+                       ('Best Profit Month', 'best_profit_month'), ('Worst Profit Month', 'worst_profit_month')]:
+        lines.append(f"- **{label}**: {highlights[key]['month']} (${highlights[key]['value']:,.2f})")
+
+    npv = results['npv']
+    lines += ["", "---", "", f"## 💰 NPV Analysis ({npv['discount_rate']:.0%} Discount Rate)", "",
+              "**Formula**: NPV = Σ(CF_t / (1 + r)^t)", "",
+              f"- **Total NPV**: ${npv['corrected']:,.2f}",
+              f"- **NPV as percentage of total profit**: {npv['pct_of_profit']:.1f}%"]
+
+    costs = results['costs']
+    lines += ["", "---", "", "## 📊 Cost Structure Analysis", "",
+              "| Cost Component | Total Amount | Percentage of Revenue |",
+              "|----------------|--------------|----------------------|"]
+    for label, key in [('Operating Expenses (OPEX)', 'opex'), ('Tax', 'tax'),
+                       ('Finance Cost', 'finance'), ('SG&A', 'sga')]:
+        lines.append(f"| {label} | ${costs[key]:,.2f} | {costs[key]/revenue*100:.1f}% |")
+    lines.append(f"| **Net Profit** | **${metrics['total_profit']:,.2f}** | "
+                 f"**{metrics['total_profit']/revenue*100:.1f}%** |")
+
+    projections = results['projections']
+    lines += ["", "---", "", "## 🔮 5-Year Forecast Analysis", "",
+              f"- **Revenue Growth Rate per Quarter**: {projections['revenue_growth_rate']*100:.2f}%",
+              f"- **Profit Growth Rate per Quarter**: {projections['profit_growth_rate']*100:.2f}%", "",
+              "| Scenario | 5-Year Revenue Projection | 5-Year Profit Projection |",
+              "|----------|---------------------------|--------------------------|"]
+    for scenario in SCENARIOS:
+        lines.append(f"| {scenario} | ${projections['revenue'][scenario]:,.2f} | "
+                     f"${projections['profit'][scenario]:,.2f} |")
+
+    forecast = results['forecast']
+    lines += ["", f"### Monthly Forecast ({results['months_ahead']} months)", "",
+              "| Scenario | Total Revenue | Total Profit | Avg Monthly Revenue | Avg Monthly Profit |",
+              "|----------|---------------|--------------|---------------------|--------------------|"]
+    for scenario_name, data in forecast.items():
+        lines.append(f"| {scenario_name} | ${data['Total_Revenue']:,.2f} | ${data['Total_Profit']:,.2f} | "
+                     f"${data['Avg_Monthly_Revenue']:,.2f} | ${data['Avg_Monthly_Profit']:,.2f} |")
+
+    if include_monthly_forecast:
+        for scenario_name, data in forecast.items():
+            lines += ["", f"#### {scenario_name} Scenario", "",
+                      "| Month | Revenue | Net Profit | Margin |", "|-------|---------|------------|--------|"]
+            for month, f_revenue, profit, margin in zip(data['Month'], data['Revenue'],
+                                                        data['Net_Profit'], data['Profit_Margin_%']):
+                lines.append(f"| {month} | ${f_revenue:,.0f} | ${profit:,.0f} | {margin:.1f}% |")
+
+    return "\n".join(lines) + "\n"
+
+
+# Output format -> renderer
+RENDERERS = {
+    'console': render_console,
+    'json': render_json,
+    'markdown': render_markdown,
+}
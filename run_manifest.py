@@ -0,0 +1,213 @@
+# Run Manifest Store
+# מאגר רישום ריצות לשימוש חוזר בתוצאות
+
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import time
+
+DEFAULT_MANIFEST = 'run_manifest.db'
+# A 'running' claim older than this is considered abandoned (crashed node)
+CLAIM_TIMEOUT = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    kind TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT,
+    artifacts TEXT,
+    host TEXT,
+    pid INTEGER,
+    started REAL,
+    finished REAL,
+    PRIMARY KEY (kind, fingerprint)
+)
+"""
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's bytes, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def frame_digest(df):
+    """SHA-256 of a DataFrame's column names and values (index ignored)"""
+    import pandas as pd
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(column) for column in df.columns]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def run_fingerprint(kind, inputs, **params):
+    """
+    Fingerprint of a run: its kind, input digests and every parameter that affects the output
+
+    Args:
+        kind (str): Run type, e.g. 'detailed_results' or 'crew'
+        inputs (dict): Input name -> content digest
+        **params: Model, discount rate, horizon, scenario multipliers, code version, ...
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    payload = json.dumps({'kind': kind, 'inputs': inputs, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RunManifest:
+    """
+    SQLite record of completed runs, keyed by (kind, fingerprint)
+
+    The database is a single file, so several machines can share it through a
+    common path. A node claims a fingerprint before running it; other nodes
+    that see the claim wait for its result instead of duplicating the work.
+
+    Usage:
+        with RunManifest('shared/run_manifest.db') as manifest:
+            artifacts, reused = manifest.run_once('detailed_results', fp, params, produce)
+    """
+
+    def __init__(self, path=DEFAULT_MANIFEST, timeout=30, claim_timeout=CLAIM_TIMEOUT):
+        """
+        Args:
+            path (str): SQLite database file
+            timeout (float): Seconds to wait for a lock held by another process
+            claim_timeout (float): Age after which a 'running' claim may be taken over
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.claim_timeout = claim_timeout
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.conn.execute(SCHEMA)
+        self.owner = (socket.gethostname(), os.getpid())
+
+    def _row(self, kind, fingerprint):
+        row = self.conn.execute(
+            "SELECT status, params, artifacts, host, pid, started, finished FROM runs "
+            "WHERE kind = ? AND fingerprint = ?", (kind, fingerprint)).fetchone()
+        if row is None:
+            return None
+        status, params, artifacts, host, pid, started, finished = row
+        return {
+            'kind': kind,
+            'fingerprint': fingerprint,
+            'status': status,
+            'params': json.loads(params) if params else {},
+            'artifacts': json.loads(artifacts) if artifacts else [],
+            'host': host,
+            'pid': pid,
+            'started': started,
+            'finished': finished,
+        }
+
+    def lookup(self, kind, fingerprint):
+        """Return the completed run if all of its artifacts still exist, else None"""
+        run = self._row(kind, fingerprint)
+        if run and run['status'] == 'done' and all(os.path.exists(path) for path in run['artifacts']):
+            return run
+        return None
+
+    def claim(self, kind, fingerprint, params=None):
+        """
+        Mark a fingerprint as running on this process
+
+        Returns:
+            bool: False if the run is already done or actively running elsewhere
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            run = self._row(kind, fingerprint)
+            if run is not None:
+                if run['status'] == 'done' and all(os.path.exists(path) for path in run['artifacts']):
+                    self.conn.execute("ROLLBACK")
+                    return False
+                fresh = run['started'] and time.time() - run['started'] < self.claim_timeout
+                if run['status'] == 'running' and fresh and (run['host'], run['pid']) != self.owner:
+                    self.conn.execute("ROLLBACK")
+                    return False
+            self.conn.execute(
+                "INSERT OR REPLACE INTO runs (kind, fingerprint, status, params, artifacts, host, pid, started, finished) "
+                "VALUES (?, ?, 'running', ?, NULL, ?, ?, ?, NULL)",
+                (kind, fingerprint, json.dumps(params or {}, default=str), self.owner[0], self.owner[1], time.time()))
+            self.conn.execute("COMMIT")
+            return True
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def record(self, kind, fingerprint, params, artifacts):
+        """Store a completed run and its artifact paths"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO runs (kind, fingerprint, status, params, artifacts, host, pid, started, finished) "
+            "VALUES (?, ?, 'done', ?, ?, ?, ?, COALESCE((SELECT started FROM runs WHERE kind = ? AND fingerprint = ?), ?), ?)",
+            (kind, fingerprint, json.dumps(params or {}, default=str),
+             json.dumps([os.path.abspath(path) for path in artifacts]), self.owner[0], self.owner[1],
+             kind, fingerprint, time.time(), time.time()))
+
+    def release(self, kind, fingerprint):
+        """Drop this process's claim after a failed run"""
+        self.conn.execute("DELETE FROM runs WHERE kind = ? AND fingerprint = ? AND status = 'running' "
+                          "AND host = ? AND pid = ?", (kind, fingerprint) + self.owner)
+
+    def run_once(self, kind, fingerprint, params, produce, poll=2.0):
+        """
+        Return a matching earlier result, or run produce() and record its artifacts
+
+        If another node holds a fresh claim, wait for it to finish rather
+        than computing the same result twice.
+
+        Args:
+            kind (str): Run type
+            fingerprint (str): Output of run_fingerprint
+            params (dict): Parameters stored with the run
+            produce (callable): Runs the work and returns the list of artifact paths
+            poll (float): Seconds between checks while another node is running
+
+        Returns:
+            tuple: (artifact paths, reused)
+        """
+        while True:
+            run = self.lookup(kind, fingerprint)
+            if run:
+                return run['artifacts'], True
+            if self.claim(kind, fingerprint, params):
+                break
+            time.sleep(poll)
+
+        try:
+            artifacts = produce()
+        except BaseException:
+            self.release(kind, fingerprint)
+            raise
+        self.record(kind, fingerprint, params, artifacts)
+        return [os.path.abspath(path) for path in artifacts], False
+
+    def history(self, kind=None, limit=20):
+        """Most recent runs, newest first"""
+        query = "SELECT kind, fingerprint FROM runs"
+        args = ()
+        if kind:
+            query += " WHERE kind = ?"
+            args = (kind,)
+        query += " ORDER BY COALESCE(finished, started) DESC LIMIT ?"
+        return [self._row(*row) for row in self.conn.execute(query, args + (limit,)).fetchall()]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
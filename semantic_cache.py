@@ -0,0 +1,300 @@
+# Semantic Prompt Cache for Recurring Crew Runs
+# מטמון סמנטי לבקשות חוזרות: עדכון דלתא במקום ניתוח מלא
+
+import importlib.util
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+DEFAULT_CACHE = 'semantic_cache.db'
+# Minimum cosine similarity between a task's prompt and a cached one
+SIMILARITY_THRESHOLD = 0.9
+# More changed ledger months than this and the task is analysed from scratch
+MAX_DELTA_ROWS = 3
+# Cached analyses kept per task, entity and model
+MAX_ENTRIES = 24
+# Local embedding model used when sentence-transformers is installed
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+# Hashed character n-grams of the built-in embedder
+HASH_DIMENSIONS = 4096
+NGRAM = 4
+# Ledger values compared by the delta (rounded to the money scale)
+LEDGER_COLUMNS = ['revenue', 'opex', 'tax', 'fianance cost', 'sg@a']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task TEXT NOT NULL,
+    entity TEXT,
+    model TEXT NOT NULL,
+    prompt_version INTEGER NOT NULL,
+    embedder TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    ledger TEXT NOT NULL,
+    output TEXT NOT NULL,
+    created REAL
+);
+CREATE INDEX IF NOT EXISTS entries_task ON entries (task, model, prompt_version, embedder, entity);
+"""
+
+DELTA_PROMPT = """Update your previous analysis for this task. The ledger has changed only as listed below;
+everything else is the same data the previous analysis was based on.
+
+PREVIOUS ANALYSIS:
+{previous}
+
+LEDGER CHANGES SINCE THE PREVIOUS ANALYSIS:
+{changes}
+
+Use your tools for every figure the changed months affect, keep the parts they do not affect,
+and answer in the same format as before.
+
+ORIGINAL TASK (for reference):
+{description}"""
+
+
+class HashingEmbedder:
+    """Hashed character n-gram counts, L2-normalised; needs nothing beyond numpy"""
+
+    def __init__(self, dimensions=HASH_DIMENSIONS, ngram=NGRAM):
+        self.dimensions = dimensions
+        self.ngram = ngram
+        self.name = f'hashing-{ngram}gram-{dimensions}'
+
+    def embed(self, text):
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        data = ' '.join(text.split()).encode('utf-8')
+        for start in range(max(len(data) - self.ngram + 1, 1)):
+            vector[zlib.crc32(data[start:start + self.ngram]) % self.dimensions] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SentenceEmbedder:
+    """A sentence-transformers model, loaded on first use"""
+
+    def __init__(self, model_name=EMBEDDING_MODEL):
+        self.model_name = model_name
+        self.name = f'sentence-transformers/{model_name}'
+        self._model = None
+
+    def embed(self, text):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name)
+        return np.asarray(self._model.encode(text, normalize_embeddings=True), dtype=np.float32)
+
+
+def local_embedder(model_name=None):
+    """The sentence-transformers embedder when the package is installed, else HashingEmbedder"""
+    if importlib.util.find_spec('sentence_transformers') is None:
+        return HashingEmbedder()
+    return SentenceEmbedder(model_name or EMBEDDING_MODEL)
+
+
+def ledger_rows(df):
+    """
+    Month -> line-item totals of a ledger, the part of a run that changes between months
+
+    Several postings in one month are summed, so a change to any of them
+    changes the month. A month's total is None when all of its amounts are
+    missing, and carries the number of missing amounts otherwise.
+
+    Args:
+        df: Ledger DataFrame with a 'date' column (e.g. FinancialToolkit.frame.data)
+
+    Returns:
+        dict: 'YYYY-MM' -> {column: total, 'postings': count, 'missing': count}
+    """
+    columns = [column for column in LEDGER_COLUMNS if column in df.columns]
+    groups = df[columns].groupby(df['date'].dt.strftime('%Y-%m').to_numpy(), sort=True)
+    totals = groups.sum(min_count=1)
+    postings = groups.size()
+    missing = groups.agg(lambda values: int(values.isna().sum())).sum(axis=1)
+    rows = {}
+    for month, values in zip(totals.index, totals.itertuples(index=False)):
+        rows[month] = {column: (None if value != value else round(float(value), 4))
+                       for column, value in zip(columns, values)}
+        rows[month]['postings'] = int(postings[month])
+        rows[month]['missing'] = int(missing[month])
+    return rows
+
+
+def ledger_text(rows):
+    """Compact CSV rendering of ledger_rows, embedded together with the task prompt"""
+    columns = next(iter(rows.values()), {}).keys()
+    lines = [','.join(['month', *columns])]
+    lines += [','.join([month, *(str(value) for value in values.values())]) for month, values in rows.items()]
+    return '\n'.join(lines)
+
+
+def ledger_delta(old_rows, new_rows):
+    """
+    Months added, changed or removed between two ledgers
+
+    Returns:
+        dict: 'added' / 'changed' (month -> amounts) and 'removed' (months)
+    """
+    return {
+        'added': {month: values for month, values in new_rows.items() if month not in old_rows},
+        'changed': {month: values for month, values in new_rows.items()
+                    if month in old_rows and old_rows[month] != values},
+        'removed': [month for month in old_rows if month not in new_rows],
+    }
+
+
+def delta_size(delta):
+    return len(delta['added']) + len(delta['changed']) + len(delta['removed'])
+
+
+def delta_prompt(description, previous, delta):
+    """Task description asking only for an update of the previous analysis"""
+    changes = []
+    for kind in ('added', 'changed'):
+        for month, values in delta[kind].items():
+            changes.append(f"{kind} {month}: {json.dumps(values)}")
+    changes += [f"removed {month}" for month in delta['removed']]
+    return DELTA_PROMPT.format(previous=previous, changes='\n'.join(changes) or "none (same ledger)",
+                               description=description)
+
+
+class SemanticCache:
+    """
+    Near-duplicate lookup of earlier crew task answers, stored in SQLite
+
+    A monthly re-run of the same entity sends the same task prompts over a
+    ledger with one more month, so an exact prompt cache never hits. Each
+    task prompt is embedded together with the ledger by a local model, and
+    the most similar earlier answer for the task is reused when the ledgers
+    differ in at most max_delta_rows months: the agent is then only asked
+    to update that answer for the changed months. Identical ledgers are
+    better served by the run manifest (`crew --manifest`), which skips the
+    crew altogether.
+
+    Usage:
+        with SemanticCache('semantic_cache.db') as cache:
+            analysis = FinancialAnalysisCrew(semantic_cache=cache)
+            analysis.run_analysis(df.to_dict('records'), entity='acme')
+    """
+
+    def __init__(self, path=DEFAULT_CACHE, embedder=None, threshold=SIMILARITY_THRESHOLD,
+                 max_delta_rows=MAX_DELTA_ROWS, max_entries=MAX_ENTRIES, timeout=30):
+        """
+        Args:
+            path (str): SQLite database file
+            embedder: Object with name and embed(text) (default: local_embedder())
+            threshold (float): Minimum cosine similarity of a reusable entry
+            max_delta_rows (int): Most ledger months an update may cover
+            max_entries (int): Entries kept per task, entity and model
+            timeout (float): Seconds to wait for a lock held by another process
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.embedder = embedder or local_embedder()
+        self.threshold = threshold
+        self.max_delta_rows = max_delta_rows
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'stored': 0}
+        # Pooled crews in several threads share the connection
+        self._lock = threading.Lock()
+
+    def embed(self, description, rows):
+        return self.embedder.embed(f"{description}\n\nLEDGER:\n{ledger_text(rows)}")
+
+    def lookup(self, task, description, rows, model, prompt_version, entity=None):
+        """
+        The closest earlier answer of the task that a delta update can bring up to date
+
+        Args:
+            task (str): Task name (e.g. 'math_analysis')
+            description (str): The task's original description
+            rows (dict): ledger_rows of the current run
+            model (str): Model name; answers of other models are not reused
+            prompt_version (int): PROMPT_VERSION of the crew
+            entity (str, optional): Restrict the lookup to this entity's runs
+
+        Returns:
+            dict or None: 'id', 'similarity', 'delta', 'output' and 'embedding' of the match
+        """
+        query = ("SELECT id, embedding, ledger, output FROM entries "
+                 "WHERE task = ? AND model = ? AND prompt_version = ? AND embedder = ?")
+        params = [task, model, prompt_version, self.embedder.name]
+        if entity is not None:
+            query += " AND entity = ?"
+            params.append(entity)
+        embedding = self.embed(description, rows)
+        with self._lock:
+            self.stats['lookups'] += 1
+            candidates = self.conn.execute(query, params).fetchall()
+        match = None
+        if candidates:
+            matrix = np.stack([np.frombuffer(candidate[1], dtype=np.float32) for candidate in candidates])
+            similarities = matrix @ embedding
+            for index in np.argsort(-similarities, kind='stable'):
+                if similarities[index] < self.threshold:
+                    break
+                entry_id, _, ledger, output = candidates[index]
+                delta = ledger_delta(json.loads(ledger), rows)
+                if delta_size(delta) <= self.max_delta_rows:
+                    match = {'id': entry_id, 'similarity': float(similarities[index]), 'delta': delta,
+                             'output': output, 'embedding': embedding}
+                    break
+        with self._lock:
+            self.stats['hits' if match else 'misses'] += 1
+        return match
+
+    def store(self, task, description, rows, model, prompt_version, output, entity=None, embedding=None):
+        """Record a task's answer, keeping the newest max_entries per task, entity and model"""
+        if embedding is None:
+            embedding = self.embed(description, rows)
+        with self._lock:
+            self._insert(task, rows, model, prompt_version, output, entity, embedding)
+            self.stats['stored'] += 1
+
+    def _insert(self, task, rows, model, prompt_version, output, entity, embedding):
+        self.conn.execute(
+            "INSERT INTO entries (task, entity, model, prompt_version, embedder, embedding, ledger, output, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (task, entity, model, prompt_version, self.embedder.name,
+             np.asarray(embedding, dtype=np.float32).tobytes(), json.dumps(rows), output, time.time()))
+        self.conn.execute(
+            "DELETE FROM entries WHERE task = ? AND entity IS ? AND model = ? AND id NOT IN "
+            "(SELECT id FROM entries WHERE task = ? AND entity IS ? AND model = ? ORDER BY id DESC LIMIT ?)",
+            (task, entity, model, task, entity, model, self.max_entries))
+
+    def summary(self):
+        """Lookup counters since the cache was opened"""
+        with self._lock:
+            return dict(self.stats, embedder=self.embedder.name, path=self.path)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_cache(path=DEFAULT_CACHE):
+    """The process-wide cache of a database file, opened on first use"""
+    with _shared_lock:
+        if path not in _shared:
+            _shared[path] = SemanticCache(path)
+        return _shared[path]
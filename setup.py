@@ -16,6 +16,14 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/yourusername/financial-analysis-crewai",
     packages=find_packages(),
+    py_modules=[
+        "benchmark_suite", "change_model", "chart_cache", "chart_pipeline", "chart_templates",
+        "cli", "create_visualizations", "crew_benchmark", "dashboard_server", "detailed_results",
+        "financial_analysis_crew", "financial_cube", "financial_metrics", "financial_tools",
+        "forecast_export", "ledger_store", "llm_client_pool", "llm_scheduler", "model_config", "money",
+        "result_renderers", "run_manifest", "semantic_cache", "speculative", "tracing",
+        "validation_gates",
+    ],
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Financial and Insurance Industry",
@@ -0,0 +1,393 @@
+# Speculative Crew Execution: Cheap Draft, Verified Escalation
+# טיוטה במודל זול ואימות עם הסלמה למודל היקר רק לשדות שנכשלו
+
+import contextlib
+import json
+import re
+import threading
+import time
+
+from model_config import MODEL_CONFIGS
+
+# The draft model answers every task; the verify model checks and repairs failing fields
+DRAFT_MODEL = 'gpt-3.5-turbo'
+VERIFY_MODEL = 'gpt-4'
+# A reported figure matches a reference value within this relative difference
+REL_TOLERANCE = 0.005
+# Completion budget of the verification and escalation calls
+VERIFY_MAX_TOKENS = 1500
+
+_NUMBER = re.compile(r'-?\d[\d,]*(?:\.\d+)?')
+_FIELD = re.compile(r'^\s*-\s*(\w+):', re.MULTILINE)
+
+VERIFY_PROMPT = ("You verify a junior analyst's draft against exact reference figures computed from the ledger. "
+                 "Reply only with a JSON object mapping each draft field name to true (correct and complete) "
+                 "or false (wrong, missing, or not supported by the figures).")
+ESCALATE_PROMPT = ("You are a senior financial analyst correcting a draft. Use the exact reference figures. "
+                   "Reply only with a JSON object containing exactly the requested fields.")
+
+
+def expected_fields(task):
+    """Field names listed in a task's expected_output ('- name: description' lines)"""
+    return _FIELD.findall(task.expected_output or '')
+
+
+def parse_json(text):
+    """The JSON object in an LLM answer (plain, fenced or embedded in prose), or None"""
+    if not text:
+        return None
+    start, end = text.find('{'), text.rfind('}')
+    if start < 0 or end <= start:
+        return None
+    try:
+        value = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def numbers_in(value):
+    """Every number in a JSON value, including numbers written in strings ('$1,234.50')"""
+    if isinstance(value, bool):
+        return []
+    if isinstance(value, (int, float)):
+        return [float(value)]
+    if isinstance(value, dict):
+        return [number for item in value.values() for number in numbers_in(item)]
+    if isinstance(value, list):
+        return [number for item in value for number in numbers_in(item)]
+    if isinstance(value, str):
+        return [float(match.replace(',', '')) for match in _NUMBER.findall(value)]
+    return []
+
+
+def reports_all(value, references, tolerance=REL_TOLERANCE):
+    """True if every reference figure appears in value within the relative tolerance"""
+    numbers = numbers_in(value)
+    return all(any(abs(number - reference) <= tolerance * max(abs(reference), 1.0) for number in numbers)
+               for reference in references)
+
+
+def reference_figures(toolkit):
+    """
+    Exact figures a correct draft has to report, per (task, field)
+
+    Each entry lists alternatives; a field passes when all figures of one
+    alternative are found in it (NPV may be reported on either basis).
+    """
+    quarterly = json.loads(toolkit.quarterly_segmentation())
+    forecast = json.loads(toolkit.scenario_forecast())
+    return {
+        ('math_analysis', 'net_profit_after_tax'): [[quarterly['totals']['net_profit_after_tax']]],
+        ('math_analysis', 'quarterly_revenues'): [[quarter['revenue'] for quarter in quarterly['quarters']]],
+        ('npv_visualization', 'npv_calculations'): [[json.loads(toolkit.npv(0.06, basis))['npv']]
+                                                    for basis in ('quarter', 'month')],
+        ('forecasting', 'scenario_analysis'): [[scenario['total_net_profit']
+                                                for scenario in forecast['scenarios'].values()]],
+    }
+
+
+def output_text(output):
+    """Raw text of a crewai task output across crewai releases"""
+    if output is None:
+        return ''
+    for attribute in ('raw', 'raw_output', 'exported_output'):
+        text = getattr(output, attribute, None)
+        if isinstance(text, str) and text:
+            return text
+    return str(output)
+
+
+def task_output_text(task):
+    """Raw text of a finished crewai task across crewai releases"""
+    return output_text(getattr(task, 'output', None))
+
+
+def set_output_text(output, text):
+    """Replace a task output's text, so the tasks after it read the repaired answer"""
+    for attribute in ('raw', 'raw_output', 'exported_output'):
+        if hasattr(output, attribute):
+            setattr(output, attribute, text)
+
+
+class UsageMeter:
+    """
+    Calls and estimated tokens of the LLM calls made through metered LLMs
+
+    Every call is counted the same way (prompt and answer characters / 4,
+    see llm_scheduler.estimate_tokens), whether an agent of the draft crew
+    or the verifier makes it, so draft, verification and baseline costs
+    are comparable.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, messages, answer):
+        from llm_scheduler import estimate_tokens
+        tokens = estimate_tokens(messages, 0) + len(str(answer or '')) // 4
+        with self._lock:
+            self.calls += 1
+            self.tokens += tokens
+
+    @contextlib.contextmanager
+    def metering(self, llms):
+        """Count every call() of the given LLM objects while the block runs"""
+        originals = []
+        for llm in llms:
+            if llm is None or not callable(getattr(llm, 'call', None)) or any(llm is seen for seen, _ in originals):
+                continue
+            originals.append((llm, llm.call))
+            llm.call = self._metered(llm.call)
+        try:
+            yield self
+        finally:
+            for llm, call in originals:
+                llm.call = call
+
+    def _metered(self, call):
+        def metered_call(messages, *args, **kwargs):
+            answer = call(messages, *args, **kwargs)
+            self.record(messages, answer)
+            return answer
+        return metered_call
+
+
+def agent_llms(crew):
+    """The LLM objects of a FinancialAnalysisCrew's agents"""
+    return [getattr(agent, 'llm', None) for agent in crew.agents.values()]
+
+
+def model_cost(tokens, model_name):
+    """Estimated USD cost of a token count at the model's price (see model_config)"""
+    if tokens is None or model_name not in MODEL_CONFIGS:
+        return None
+    return tokens / 1000 * MODEL_CONFIGS[model_name]['cost_per_1k_tokens']
+
+
+class SpeculativeRun:
+    """
+    Draft every task on the cheap model, verifying and repairing each answer with the expensive one
+
+    Every task is drafted by DRAFT_MODEL and verified as soon as it
+    finishes, before the tasks that build on it start: fields with known
+    exact figures (net profit, quarterly revenues, NPV, scenario totals)
+    are checked deterministically against the toolkit, the other fields by
+    one short true/false call to VERIFY_MODEL per task. Only the failing
+    fields are regenerated by VERIFY_MODEL and merged into the task's
+    answer, which the later tasks then receive as their context.
+
+    Usage:
+        run = SpeculativeRun()
+        result = run.run(df.to_dict('records'))
+        print_speculative_report(result, run_baseline(df.to_dict('records')))
+    """
+
+    def __init__(self, draft_model=DRAFT_MODEL, verify_model=VERIFY_MODEL, llm_verify=True, gating=True):
+        """
+        Args:
+            draft_model (str): Model of the drafting crew
+            verify_model (str): Model of the verification and escalation calls
+            llm_verify (bool): Verify fields without exact figures with the LLM
+                (False accepts any non-empty value for them)
+            gating (bool): Let the validation gates skip crew stages
+        """
+        self.draft_model = draft_model
+        self.verify_model = verify_model
+        self.llm_verify = llm_verify
+        self.gating = gating
+        self._verifier = None
+
+    def _verifier_llm(self, scheduler):
+        if self._verifier is None:
+            from llm_scheduler import PRIORITY_CLASSES, scheduled_llm
+            self._verifier = scheduled_llm(scheduler, PRIORITY_CLASSES['validation'], model=self.verify_model,
+                                           max_tokens=VERIFY_MAX_TOKENS)
+            if self._verifier is None:
+                raise RuntimeError("Speculative execution needs crewai's LLM class (crewai >= 0.60)")
+        return self._verifier
+
+    def _call(self, llm, system, user, meter):
+        messages = [{'role': 'system', 'content': system}, {'role': 'user', 'content': user}]
+        answer = llm.call(messages)
+        meter.record(messages, answer)
+        return answer
+
+    def _verify_with_llm(self, llm, task, fields, references, meter):
+        """Field -> accepted, from one verification call for the task's remaining fields"""
+        user = (f"TASK:\n{task.description}\n\nREFERENCE FIGURES:\n{references}\n\n"
+                f"DRAFT FIELDS:\n{json.dumps(fields, default=str)}")
+        verdict = parse_json(self._call(llm, VERIFY_PROMPT, user, meter)) or {}
+        # Fields the verifier did not answer for are escalated
+        return {field: verdict.get(field) is True for field in fields}
+
+    def _escalate(self, llm, task, draft, failing, references, meter):
+        """Regenerate the failing fields with the verify model"""
+        accepted = {field: value for field, value in draft.items() if field not in failing}
+        user = (f"TASK:\n{task.description}\n\nEXPECTED OUTPUT:\n{task.expected_output}\n\n"
+                f"REFERENCE FIGURES:\n{references}\n\nACCEPTED FIELDS:\n{json.dumps(accepted, default=str)}\n\n"
+                f"Return JSON with only these fields: {', '.join(failing)}")
+        repaired = parse_json(self._call(llm, ESCALATE_PROMPT, user, meter)) or {}
+        return {field: repaired.get(field) for field in failing}
+
+    def check_task(self, crew, stage, text, checks, references, meter):
+        """
+        Verify one drafted task and escalate its failing fields
+
+        Args:
+            crew: FinancialAnalysisCrew that drafted the task
+            stage (str): Task name
+            text (str): The task's drafted answer
+            checks (dict): reference_figures of the ledger
+            references (str): Reference figures shown to the verify model
+            meter (UsageMeter): Counts the verification and escalation calls
+
+        Returns:
+            tuple: (final fields, task report)
+        """
+        task = crew.tasks[stage]
+        fields = expected_fields(task)
+        draft = parse_json(text) or {}
+        verdicts, methods = {}, {}
+        unchecked = {}
+        for field in fields:
+            value = draft.get(field)
+            if value in (None, '', [], {}):
+                verdicts[field], methods[field] = False, 'missing'
+            elif (stage, field) in checks:
+                verdicts[field] = any(reports_all(value, alternative) for alternative in checks[(stage, field)])
+                methods[field] = 'deterministic'
+            elif self.llm_verify:
+                unchecked[field] = value
+            else:
+                verdicts[field], methods[field] = True, 'present'
+
+        verifier = self._verifier_llm(crew.scheduler) if unchecked or not all(verdicts.values()) else None
+        if unchecked:
+            verdicts.update(self._verify_with_llm(verifier, task, unchecked, references, meter))
+            methods.update(dict.fromkeys(unchecked, 'llm'))
+
+        failing = [field for field in fields if not verdicts[field]]
+        final = {field: draft.get(field) for field in fields}
+        if failing:
+            final.update(self._escalate(verifier, task, final, failing, references, meter))
+        return final, {
+            'fields': len(fields),
+            'accepted': [field for field in fields if verdicts[field]],
+            'escalated': failing,
+            'methods': methods,
+        }
+
+    def run(self, financial_data):
+        """
+        Draft with the cheap crew, verifying and escalating each task before the next one starts
+
+        Draft and verification costs are both estimated by UsageMeter from
+        the characters of every LLM call.
+
+        Returns:
+            dict: 'outputs' (stage -> fields), 'tasks' (stage -> report), acceptance,
+                timings (seconds) and estimated cost (USD)
+        """
+        from financial_analysis_crew import shared_crew_pool
+
+        draft_meter, verify_meter = UsageMeter(), UsageMeter()
+        outputs, tasks = {}, {}
+        verify_seconds = 0.0
+        ledger = {}
+
+        def verify(stage, output):
+            nonlocal verify_seconds
+            start = time.perf_counter()
+            if not ledger:
+                # The crew binds the run's ledger before its first task
+                ledger['checks'] = reference_figures(crew.toolkit)
+                ledger['references'] = crew.toolkit.quarterly_segmentation()
+            outputs[stage], tasks[stage] = self.check_task(crew, stage, output_text(output), ledger['checks'],
+                                                           ledger['references'], verify_meter)
+            if tasks[stage]['escalated']:
+                # The tasks after this one read the repaired answer as their context
+                set_output_text(output, json.dumps(outputs[stage], default=str))
+            verify_seconds += time.perf_counter() - start
+
+        with shared_crew_pool(self.draft_model, gating=self.gating).acquire() as crew:
+            start = time.perf_counter()
+            with draft_meter.metering(agent_llms(crew)):
+                crew.run_analysis(financial_data, on_task=verify)
+            total_seconds = time.perf_counter() - start
+
+        total_fields = sum(report['fields'] for report in tasks.values())
+        accepted_fields = sum(len(report['accepted']) for report in tasks.values())
+        draft_cost = model_cost(draft_meter.tokens, self.draft_model)
+        verify_cost = model_cost(verify_meter.tokens, self.verify_model)
+        return {
+            'outputs': outputs,
+            'tasks': tasks,
+            'draft_model': self.draft_model,
+            'verify_model': self.verify_model,
+            'acceptance_rate': accepted_fields / total_fields if total_fields else 1.0,
+            'tasks_accepted': sum(1 for report in tasks.values() if not report['escalated']),
+            'verify_calls': verify_meter.calls,
+            'tokens': {'draft': draft_meter.tokens, 'verify': verify_meter.tokens},
+            'seconds': {'draft': total_seconds - verify_seconds, 'verify': verify_seconds, 'total': total_seconds},
+            'cost': {'draft': draft_cost, 'verify': verify_cost,
+                     'total': None if draft_cost is None or verify_cost is None else draft_cost + verify_cost},
+        }
+
+
+def run_baseline(financial_data, model_name=VERIFY_MODEL, gating=True):
+    """
+    The single-model baseline: run_analysis with the expensive model on every task
+
+    Tokens are estimated by UsageMeter, as for the speculative run.
+
+    Returns:
+        dict: 'model', 'seconds', 'tokens' and estimated 'cost' (USD)
+    """
+    from financial_analysis_crew import shared_crew_pool
+    meter = UsageMeter()
+    with shared_crew_pool(model_name, gating=gating).acquire() as crew:
+        start = time.perf_counter()
+        with meter.metering(agent_llms(crew)):
+            crew.run_analysis(financial_data)
+        seconds = time.perf_counter() - start
+    return {'model': model_name, 'seconds': seconds, 'tokens': meter.tokens,
+            'cost': model_cost(meter.tokens, model_name)}
+
+
+def _usd(value):
+    return 'n/a' if value is None else f"${value:.4f}"
+
+
+def print_speculative_report(result, baseline=None):
+    """Print acceptance per task and latency / cost against the single-model baseline"""
+    print(f"\n🧪 SPECULATIVE RUN ({result['draft_model']} draft, {result['verify_model']} verify)")
+    print(f"{'Task':<20} {'Fields':>7} {'Accepted':>9} {'Escalated':<40}")
+    print("-" * 78)
+    for stage, report in result['tasks'].items():
+        print(f"{stage:<20} {report['fields']:>7} {len(report['accepted']):>9} "
+              f"{', '.join(report['escalated']) or '-':<40}")
+    print(f"\n✅ Field acceptance rate: {result['acceptance_rate'] * 100:.1f}% "
+          f"({result['tasks_accepted']} of {len(result['tasks'])} tasks accepted as drafted)")
+    print(f"🤖 Verification / escalation calls: {result['verify_calls']}")
+
+    seconds, cost = result['seconds'], result['cost']
+    print(f"\n{'':<12} {'Latency (s)':>12} {'Cost':>10}")
+    print(f"{'Speculative':<12} {seconds['total']:>12.2f} {_usd(cost['total']):>10}")
+    if baseline:
+        print(f"{'Baseline':<12} {baseline['seconds']:>12.2f} {_usd(baseline['cost']):>10}  ({baseline['model']} only)")
+        if baseline['cost'] and cost['total'] is not None:
+            print(f"💰 Cost vs baseline: {cost['total'] / baseline['cost'] * 100:.0f}%; "
+                  f"latency vs baseline: {seconds['total'] / baseline['seconds'] * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    import logging
+    logging.basicConfig(level=logging.INFO)
+
+    from financial_analysis_crew import load_financial_data
+    records = load_financial_data('agent_test.csv').to_dict('records')
+    speculative_result = SpeculativeRun().run(records)
+    print_speculative_report(speculative_result, run_baseline(records))
@@ -0,0 +1,11 @@
+# Test configuration: the project modules live in the repository root
+# הגדרות בדיקה: המודולים נמצאים בתיקיית השורש
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SAMPLE_LEDGER = os.path.join(ROOT, 'agent_test.csv')
@@ -0,0 +1,27 @@
+import pytest
+
+import benchmark_suite as bench
+
+
+def test_contexts_of_several_entities_keep_their_own_files(tmp_path):
+    first = bench.build_context(str(tmp_path), months=12, seed=0, entity='entity_0000')
+    second = bench.build_context(str(tmp_path), months=12, seed=1, entity='entity_0001')
+    try:
+        assert first['csv_path'] != second['csv_path']
+        revenue = [ctx['store'].quarterly(ctx['entity'])['revenue'].sum() for ctx in (first, second)]
+        assert revenue[0] == pytest.approx(first['analyzed']['revenue'].sum())
+        assert revenue[1] == pytest.approx(second['analyzed']['revenue'].sum())
+        assert revenue[0] != revenue[1]
+    finally:
+        first['store'].close()
+        second['store'].close()
+
+
+def test_pool_reports_overall_throughput():
+    fast = {'p50_ms': 1.0, 'p90_ms': 1.0, 'p99_ms': 1.0, 'mean_ms': 1.0, 'repeats': 10,
+            'rows_per_s': 1000.0, 'process_peak_rss_mb': 100.0}
+    slow = dict(fast, mean_ms=9.0, rows_per_s=1000 / 9)
+    pooled = bench._pool([fast, slow])
+    # 20 calls of one row each in 0.1 s: 200 rows/s, not the mean of the two rates
+    assert pooled['rows_per_s'] == pytest.approx(200.0)
+    assert pooled['repeats'] == 20
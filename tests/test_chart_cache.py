@@ -0,0 +1,47 @@
+import os
+
+import chart_cache
+from chart_cache import ChartCache
+
+
+def artifact(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(b'x' * size)
+    return str(path)
+
+
+def test_store_scans_the_directory_only_when_over_the_limit(tmp_path, monkeypatch):
+    cache = ChartCache(str(tmp_path / 'cache'), max_bytes=1000)
+    walks = []
+    real_walk = os.walk
+    monkeypatch.setattr(chart_cache.os, 'walk', lambda top: walks.append(top) or real_walk(top))
+
+    for index in range(9):
+        cache.store(f'{index:064x}', artifact(tmp_path, f'{index}.png', 100))
+    assert len(walks) == 1 and cache.size() == 900
+
+    cache.store(f'{10:064x}', artifact(tmp_path, '10.png', 200))
+    assert len(walks) == 2
+    assert cache.size() == sum(size for _, _, size in cache._entries()) <= 900
+
+
+def test_eviction_removes_the_least_recently_used_entries(tmp_path):
+    cache = ChartCache(str(tmp_path / 'cache'), max_bytes=250)
+    keys = [f'{index:064x}' for index in range(3)]
+    for index, key in enumerate(keys[:2]):
+        cache.store(key, artifact(tmp_path, f'{index}.png', 100))
+        os.utime(cache._entry_path(key, '.png'), (index, index))
+        cache._touch(cache._entry_path(key, '.png'))
+    assert cache.fetch(keys[0], str(tmp_path / 'hit.png'))
+
+    cache.store(keys[2], artifact(tmp_path, '2.png', 100))
+    assert not cache.fetch(keys[1], str(tmp_path / 'miss.png'))
+    assert cache.fetch(keys[0], str(tmp_path / 'hit.png'))
+    assert cache.size() == 200
+
+
+def test_a_new_instance_sees_entries_from_an_earlier_run(tmp_path):
+    ChartCache(str(tmp_path / 'cache')).store('ab' * 32, artifact(tmp_path, 'chart.svg', 64))
+    cache = ChartCache(str(tmp_path / 'cache'))
+    assert cache.size() == 64
+    assert cache.fetch('ab' * 32, str(tmp_path / 'copy.svg')) and cache.hits == 1
@@ -0,0 +1,27 @@
+import os
+
+from chart_pipeline import render_chart_packs
+from conftest import SAMPLE_LEDGER
+from create_visualizations import load_and_prepare_data
+
+CHARTS = ['01_revenue_vs_profit', '03_quarterly_revenue']
+
+
+def test_entities_render_into_subdirectories_and_rerun_from_cache(tmp_path):
+    scaled = load_and_prepare_data(SAMPLE_LEDGER)
+    scaled['revenue'] = scaled['revenue'] * 2
+    sources = {'acme': SAMPLE_LEDGER, 'globex': scaled}
+    options = dict(output_root=str(tmp_path / 'charts'), charts=CHARTS, workers=2,
+                   cache_dir=str(tmp_path / 'cache'), profile='thumbnail')
+
+    first = render_chart_packs(sources, **options)
+    assert [(record['entity'], record['chart']) for record in first] == [
+        (entity, chart) for entity in sources for chart in CHARTS]
+    for record in first:
+        assert os.path.dirname(record['path']) == str(tmp_path / 'charts' / record['entity'])
+        assert os.path.getsize(record['path']) == record['bytes'] > 0
+    assert not any(record['cached'] for record in first)
+
+    second = render_chart_packs(sources, **options)
+    assert all(record['cached'] for record in second)
+    assert [record['path'] for record in second] == [record['path'] for record in first]
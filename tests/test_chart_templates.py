@@ -0,0 +1,41 @@
+import matplotlib.image as mpimg
+import pytest
+
+from chart_cache import ChartCache
+from chart_templates import TemplateRenderer
+from conftest import SAMPLE_LEDGER
+from create_visualizations import load_and_prepare_data, render_chart
+
+
+@pytest.fixture(scope='module')
+def ledgers():
+    base = load_and_prepare_data(SAMPLE_LEDGER)
+    scaled = base.copy()
+    for column in ['revenue', 'opex', 'tax', 'fianance cost', 'sg@a']:
+        scaled[column] = scaled[column] * 3
+    return base, scaled
+
+
+def test_reused_figure_matches_a_chart_built_from_scratch(ledgers, tmp_path):
+    renderer = TemplateRenderer(profile='thumbnail')
+    try:
+        for index, df in enumerate(ledgers):
+            renderer.render(df, '03_quarterly_revenue', str(tmp_path / f'template_{index}'))
+    finally:
+        renderer.close()
+    fresh = render_chart(ledgers[1], '03_quarterly_revenue', output_dir=str(tmp_path / 'fresh'), profile='thumbnail')
+    reused = tmp_path / 'template_1' / '03_quarterly_revenue_thumb.png'
+    # Same tight bbox on both paths, so the images have the same size
+    assert mpimg.imread(str(reused)).shape == mpimg.imread(fresh).shape
+
+
+def test_template_render_uses_the_chart_cache(ledgers, tmp_path):
+    cache = ChartCache(str(tmp_path / 'cache'))
+    renderer = TemplateRenderer(profile='thumbnail')
+    try:
+        renderer.render(ledgers[0], '01_revenue_vs_profit', str(tmp_path / 'a'), cache=cache)
+        renderer.render(ledgers[0], '01_revenue_vs_profit', str(tmp_path / 'b'), cache=cache)
+    finally:
+        renderer.close()
+    assert cache.hits == 1
+    assert (tmp_path / 'b' / '01_revenue_vs_profit_thumb.png').exists()
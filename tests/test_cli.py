@@ -0,0 +1,56 @@
+import os
+import shutil
+
+import pytest
+
+import cli
+from conftest import SAMPLE_LEDGER
+
+
+@pytest.fixture
+def ledgers(tmp_path):
+    directory = tmp_path / 'ledgers'
+    directory.mkdir()
+    for name in ('acme', 'globex', 'initech'):
+        shutil.copy(SAMPLE_LEDGER, directory / f'{name}.csv')
+    return directory
+
+
+def test_expand_inputs_globs_shards_and_rejects_missing_files(ledgers):
+    pattern = str(ledgers / '*.csv')
+    paths = cli.expand_inputs([pattern, str(ledgers / 'acme.csv')])
+    assert [cli.entity_name(path) for path in paths] == ['acme', 'globex', 'initech']
+    assert [cli.entity_name(path) for path in cli.expand_inputs([pattern], shard='1/2')] == ['globex']
+    with pytest.raises(SystemExit):
+        cli.expand_inputs([str(ledgers / 'missing.csv')])
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_per_file_results_keep_input_order_and_capture_errors(ledgers, workers):
+    paths = [str(ledgers / 'acme.csv'), str(ledgers / 'missing.csv'), str(ledgers / 'globex.csv')]
+    results = cli.run_per_file(os.path.getsize, paths, workers)
+    assert [path for path, _, _ in results] == paths
+    assert results[0][1] == os.path.getsize(SAMPLE_LEDGER) and results[0][2] is None
+    assert isinstance(results[1][2], FileNotFoundError)
+
+
+def test_forecast_exports_every_good_ledger_and_reports_the_bad_one(ledgers, tmp_path, capsys):
+    (ledgers / 'broken.csv').write_text('not,a,ledger\n1,2,3\n', encoding='utf-8')
+    output_dir = tmp_path / 'exports'
+    code = cli.main(['forecast', str(ledgers / '*.csv'), '--workers', '2', '--months-ahead', '6',
+                     '--output-dir', str(output_dir)])
+    captured = capsys.readouterr()
+    assert code == 1
+    assert 'broken.csv' in captured.err
+    assert '📊 3 entities' in captured.out
+    exported = sorted(name for name in os.listdir(output_dir) if name.endswith('.csv'))
+    assert [name.split('_')[1] for name in exported] == ['conservative', 'moderate', 'optimistic', 'summary']
+
+
+def test_store_then_query_a_single_value(ledgers, tmp_path, capsys):
+    store = str(tmp_path / 'ledger.db')
+    cli.main(['store', str(ledgers / 'acme.csv'), '--store', store])
+    assert cli.main(['query', 'acme', '--store', store, '--metric', 'revenue', '--year', '2025',
+                     '--month', '1']) == 0
+    assert capsys.readouterr().out.strip().splitlines()[-1] == '3000.00'
+    assert cli.main(['query', 'acme', '--store', store, '--metric', 'revenue', '--year', '1999']) == 1
@@ -0,0 +1,31 @@
+import subprocess
+import sys
+
+import pytest
+
+import cli
+from conftest import ROOT
+
+
+def test_importing_the_cli_loads_no_heavy_dependency():
+    code = ("import sys, cli; cli.build_parser(); "
+            "print(','.join(m for m in ('numpy', 'pandas', 'matplotlib', 'crewai') if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=ROOT)
+    assert result.stdout.strip() == ''
+
+
+def test_cost_estimate_does_not_import_pandas():
+    code = ("import sys, cli\ntry:\n    cli.main(['cost', '--chars', '1000'])\nfinally:\n"
+            "    print('pandas' in sys.modules)")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=ROOT)
+    assert result.stdout.strip().splitlines()[-1] == 'False'
+
+
+@pytest.mark.parametrize('elapsed_ms, code', [(50.0, 0), (5000.0, 1)])
+def test_startup_exits_non_zero_when_a_budget_is_exceeded(monkeypatch, capsys, elapsed_ms, code):
+    monkeypatch.setattr(cli, 'COMMANDS', {'startup': dict(cli.COMMANDS['startup'], budget_ms=100)})
+    monkeypatch.setattr(cli, 'measure_import_ms', lambda modules, repeats: elapsed_ms)
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(['startup', '--repeats', '1'])
+    assert exit_info.value.code == code
+    assert ('❌' in capsys.readouterr().out) == bool(code)
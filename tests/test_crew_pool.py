@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import pytest
+
+from financial_analysis_crew import CrewPool, FinancialAnalysisCrew
+
+
+@pytest.fixture(autouse=True)
+def no_agents(monkeypatch):
+    # Building agents needs crewai; the pool only needs the crew's run state
+    monkeypatch.setattr(FinancialAnalysisCrew, 'setup_agents', lambda self: None)
+
+
+def test_acquire_resets_the_crew_on_return():
+    pool = CrewPool('gpt-3.5-turbo')
+    with pool.acquire() as crew:
+        crew.descriptions = {'math': 'Analyse the ledger'}
+        crew.tasks = {'math': SimpleNamespace(output='Q1 revenue 3000', description='Update the answer')}
+        crew.results = {'math': 'Q1 revenue 3000'}
+        crew.stages = ['math']
+        crew.gate_report = {'checks': []}
+
+    with pool.acquire() as again:
+        assert again is crew and pool.created == 1
+        assert (again.results, again.stages, again.gate_report) == ({}, [], None)
+        assert again.tasks['math'].output is None
+        assert again.tasks['math'].description == 'Analyse the ledger'
+
+
+def test_nested_runs_get_separate_crews_up_to_size():
+    pool = CrewPool('gpt-3.5-turbo', size=2)
+    with pool.acquire() as first, pool.acquire() as second:
+        assert first is not second
+    assert pool.created == 2
+
+
+def test_a_crew_that_cannot_be_reset_is_dropped(monkeypatch):
+    def reset():
+        raise RuntimeError("memory store gone")
+
+    pool = CrewPool('gpt-3.5-turbo')
+    with pool.acquire() as broken:
+        monkeypatch.setattr(broken, 'reset', reset)
+    assert pool.created == 0
+    with pool.acquire() as crew:
+        assert crew is not broken
+
+
+def test_run_returns_the_result_and_summary_of_the_pooled_crew(monkeypatch):
+    monkeypatch.setattr(FinancialAnalysisCrew, 'run_analysis',
+                        lambda self, data, entity=None: self.results.update(entity=entity) or 'report')
+    monkeypatch.setattr(FinancialAnalysisCrew, 'get_results_summary', lambda self: dict(self.results))
+    pool = CrewPool('gpt-3.5-turbo')
+    assert pool.run([{'revenue': 1.0}], 'acme') == ('report', {'entity': 'acme'})
+    assert pool.run([{'revenue': 1.0}], 'globex') == ('report', {'entity': 'globex'})
+    assert pool.created == 1
@@ -0,0 +1,69 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import SAMPLE_LEDGER
+from dashboard_server import DashboardData, lttb, make_handler
+
+
+@pytest.fixture(scope='module')
+def server():
+    dates = pd.date_range('2020-01-01', periods=2000, freq='D')
+    revenue = 1000.0 + 100.0 * np.sin(np.arange(2000) / 20.0)
+    revenue[777] = 5000.0
+    daily = pd.DataFrame({'monthes': dates.strftime('%b-%y'), 'date': dates, 'revenue': revenue,
+                          'opex': 400.0, 'tax': 50.0, 'fianance cost': 10.0, 'sg@a': 40.0})
+    data = DashboardData({'daily': daily, 'agent_test': SAMPLE_LEDGER})
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(data))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield data, f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(url):
+    with urllib.request.urlopen(url) as response:
+        return json.loads(response.read())
+
+
+def test_series_is_downsampled_to_max_points(server):
+    data, base = server
+    series = get(f'{base}/api/series?entity=daily&metric=revenue&grain=raw&max_points=100')
+    assert series['total_points'] == 2000
+    assert len(series['points']) <= 100
+    # LTTB keeps the spike and both end points
+    assert max(value for _, value in series['points']) == 5000.0
+    x = [t for t, _ in series['points']]
+    assert x == sorted(x) and x[0] == pd.Timestamp('2020-01-01').value // 10**6
+
+    monthly = get(f'{base}/api/series?entity=daily&metric=revenue&grain=month&max_points=500')
+    assert monthly['total_points'] == len(monthly['points']) == 66
+
+
+def test_repeated_queries_are_served_from_the_cache(server):
+    data, base = server
+    query = f'{base}/api/series?entity=agent_test&metric=profit_margin&grain=quarter'
+    hits = data.hits
+    assert get(query) == get(query)
+    assert data.hits == hits + 1
+    assert get(f'{base}/api/entities') == ['agent_test', 'daily']
+
+
+def test_unknown_metric_is_a_bad_request(server):
+    _, base = server
+    with pytest.raises(urllib.error.HTTPError) as error:
+        get(f'{base}/api/series?entity=daily&metric=ebitda')
+    assert error.value.code == 400
+
+
+def test_lttb_returns_short_series_unchanged():
+    x, y = np.arange(5), np.arange(5.0)
+    assert lttb(x, y, 10)[0] is x
+    assert len(lttb(np.arange(1000), np.random.default_rng(0).random(1000), 50)[0]) == 50
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import SAMPLE_LEDGER
+from detailed_results import compute_detailed_results, forecast_scenarios, load_and_analyze_data
+
+
+@pytest.fixture(scope='module')
+def analyzed():
+    return load_and_analyze_data(SAMPLE_LEDGER, store=False)
+
+
+@pytest.mark.parametrize('discount_rate', [0.06, 0.1])
+def test_both_npvs_use_the_discount_rate(analyzed, discount_rate):
+    npv = compute_detailed_results(analyzed, discount_rate=discount_rate)['npv']
+    assert npv['discount_rate'] == discount_rate
+    # The analyzed ledger is in date order, so file order and date rank agree
+    assert npv['previous'] == pytest.approx(npv['corrected'])
+
+
+def test_higher_rate_lowers_the_reported_npv(analyzed):
+    low = compute_detailed_results(analyzed, discount_rate=0.06)['metrics']['total_npv']
+    high = compute_detailed_results(analyzed, discount_rate=0.1)['metrics']['total_npv']
+    assert high < low
+
+
+def test_high_growth_forecast_falls_back_to_float():
+    months = pd.date_range('2024-01-01', periods=12, freq='MS')
+    revenue = np.geomspace(100, 1e7, 12)
+    df = pd.DataFrame({'date': months, 'revenue': revenue, 'opex': revenue * 0.3, 'tax': revenue * 0.1,
+                       'fianance cost': revenue * 0.05, 'sg@a': revenue * 0.05})
+    df['net_profit_after_tax'] = df['revenue'] * 0.5
+
+    with np.errstate(invalid='raise'):
+        scenarios = forecast_scenarios(df, months_ahead=60)
+
+    optimistic = scenarios['Optimistic']
+    assert np.isfinite(optimistic['Total_Revenue']) and optimistic['Total_Revenue'] > 1e20
+    assert optimistic['Total_Revenue'] == pytest.approx(sum(optimistic['Revenue']))
+    assert optimistic['Total_Profit'] == pytest.approx(optimistic['Total_Revenue'] * 0.5)
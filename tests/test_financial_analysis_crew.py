@@ -0,0 +1,14 @@
+import os
+
+from financial_analysis_crew import FinancialAnalysisCrew
+
+
+def test_creating_a_crew_leaves_the_global_model_alone(monkeypatch, capsys):
+    monkeypatch.setattr(FinancialAnalysisCrew, 'setup_agents', lambda self: None)
+    monkeypatch.setenv('OPENAI_MODEL_NAME', 'gpt-3.5-turbo')
+
+    draft, verify = FinancialAnalysisCrew('gpt-3.5-turbo'), FinancialAnalysisCrew('gpt-4')
+
+    assert (draft.model_name, verify.model_name) == ('gpt-3.5-turbo', 'gpt-4')
+    assert os.environ['OPENAI_MODEL_NAME'] == 'gpt-3.5-turbo'
+    assert capsys.readouterr().out == ''
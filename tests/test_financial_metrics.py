@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import SAMPLE_LEDGER
+from financial_cube import FinancialCube, cube_for
+from financial_metrics import FinancialFrame, load_ledger
+
+
+@pytest.fixture
+def ledger():
+    return load_ledger(SAMPLE_LEDGER, store=False)
+
+
+def test_net_profit_is_exact_decimal_difference(ledger):
+    frame = FinancialFrame(ledger)
+    row = ledger.iloc[3]
+    expected = round(row['revenue'] - row['opex'] - row['tax'] - row['fianance cost'] - row['sg@a'], 4)
+    assert frame['net_profit_after_tax'].iloc[3] == expected
+
+
+def test_metrics_are_memoized_per_data_version(ledger):
+    frame = FinancialFrame(ledger)
+    first = frame.memo('calls', lambda f: object())
+    assert frame.memo('calls', lambda f: object()) is first
+    frame.update(ledger.iloc[:12])
+    assert frame.memo('calls', lambda f: object()) is not first
+    assert len(frame['net_profit_after_tax']) == 12
+
+
+def test_missing_amount_keeps_nan(ledger):
+    ledger.loc[ledger.index[4], 'opex'] = np.nan
+    profit = FinancialFrame(ledger)['net_profit_after_tax']
+    assert np.isnan(profit.iloc[4]) and profit.notna().sum() == 35
+    assert FinancialCube(ledger).rollup('total')['revenue'] == ledger['revenue'].sum()
+
+
+def test_cost_structure_mean_skips_missing_amounts(ledger):
+    ledger.loc[ledger.index[4], 'opex'] = np.nan
+    costs = FinancialCube(ledger).cost_structure()
+    assert costs.at['opex', 'mean'] == pytest.approx(ledger['opex'].mean())
+    assert costs.at['tax', 'mean'] == pytest.approx(ledger['tax'].mean())
+
+
+def test_amounts_beyond_fixed_point_range_fall_back_to_float(ledger):
+    ledger['revenue'] = ledger['revenue'] * 1e9
+    profit = FinancialFrame(ledger)['net_profit_after_tax']
+    assert profit.iloc[0] == pytest.approx(ledger['revenue'].iloc[0], rel=1e-9)
+    cube = FinancialCube(ledger)
+    assert cube.rollup('total')['revenue'] == pytest.approx(ledger['revenue'].sum())
+
+
+def test_totals_that_would_overflow_int64_fall_back_to_float():
+    dates = pd.date_range('2025-01-01', periods=30_000, freq='h')
+    df = pd.DataFrame({'monthes': dates.strftime('%b-%y'), 'date': dates, 'revenue': 5e11,
+                       'opex': 0.0, 'tax': 0.0, 'fianance cost': 0.0, 'sg@a': 0.0})
+    totals = FinancialCube(df).rollup('total')
+    assert totals['revenue'] == pytest.approx(1.5e16)
+    assert totals['revenue'] > 0
+
+
+def test_cube_rollups_match_groupby(ledger):
+    frame = FinancialFrame(ledger, discount_basis='month')
+    cube = cube_for(frame)
+    assert cube_for(frame) is cube
+    quarterly = frame.materialize(['net_profit_after_tax', 'quarter_label']).groupby('quarter_label')
+    expected = quarterly['net_profit_after_tax'].sum()
+    pd.testing.assert_series_equal(cube.quarterly()['net_profit_after_tax'], expected, check_names=False,
+                                   atol=1e-6)
+    assert cube.value('revenue', 2025, month=1) == 3000.0
+    assert cube.rollup('total')['npv_net_profit'] == pytest.approx(frame['npv_net_profit'].sum())
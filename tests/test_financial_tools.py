@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+import pytest
+
+from conftest import SAMPLE_LEDGER
+from financial_metrics import FinancialFrame, load_ledger
+from financial_tools import FinancialToolkit, to_json
+
+
+@pytest.fixture
+def ledger():
+    return load_ledger(SAMPLE_LEDGER, store=False)
+
+
+def test_quarterly_segmentation_matches_the_ledger(ledger):
+    result = json.loads(FinancialToolkit(ledger).quarterly_segmentation())
+    frame = FinancialFrame(ledger)
+    assert len(result['quarters']) == 12
+    assert result['quarters'][0]['quarter'] == 'Q1-2025'
+    assert result['totals']['revenue'] == pytest.approx(ledger['revenue'].sum(), abs=0.005)
+    assert result['totals']['net_profit_after_tax'] == pytest.approx(frame['net_profit_after_tax'].sum(), abs=0.005)
+
+
+def test_npv_at_another_rate_is_recomputed_and_memoized(ledger):
+    toolkit = FinancialToolkit(ledger)
+    default, higher = json.loads(toolkit.npv()), json.loads(toolkit.npv(0.12))
+    assert higher['npv'] < default['npv'] < default['undiscounted_profit']
+    assert toolkit.npv(0.12) is toolkit.npv(0.12)
+
+
+def test_rebinding_records_invalidates_memoized_results(ledger):
+    toolkit = FinancialToolkit(ledger)
+    before = json.loads(toolkit.cost_structure())
+    records = ledger.assign(opex=ledger['opex'] * 2).drop(columns='date').to_dict('records')
+    after = json.loads(toolkit.bind(records).cost_structure())
+    assert after['costs']['opex']['total'] == pytest.approx(2 * before['costs']['opex']['total'], abs=0.01)
+    assert after['costs']['tax']['total'] == before['costs']['tax']['total']
+
+
+def test_growth_rates_and_forecast_shapes(ledger):
+    toolkit = FinancialToolkit(ledger)
+    growth = json.loads(toolkit.growth_rates('revenue', 'year'))
+    assert [period['period'] for period in growth['periods']] == ['2025', '2026', '2027']
+    assert growth['periods'][0]['growth_pct'] is None
+    forecast = json.loads(toolkit.scenario_forecast(24))
+    assert set(forecast['scenarios']) == {'Conservative', 'Moderate', 'Optimistic'}
+    assert len(forecast['scenarios']['Moderate']['yearly']) == 2
+    with pytest.raises(ValueError):
+        toolkit.growth_rates(level='week')
+
+
+def test_unbound_toolkit_and_compact_json():
+    with pytest.raises(ValueError):
+        FinancialToolkit().npv()
+    assert to_json({'a': np.float64(1.23456), 'b': np.nan, 'c': np.int64(3)}) == '{"a":1.23,"b":null,"c":3}'
@@ -0,0 +1,93 @@
+import json
+import os
+
+import pytest
+
+import forecast_export as fe
+from forecast_export import MONTHLY_COLUMNS, ExportManifest, ForecastExporter, forecast_key
+
+
+def forecast(scale=1.0, months=3):
+    data = {'Month': [f'2028-{month:02d}' for month in range(1, months + 1)]}
+    for column in MONTHLY_COLUMNS[1:]:
+        data[column] = [scale * (month + 1) for month in range(months)]
+    data.update({'Total_Revenue': 6.0 * scale, 'Total_Profit': 3.0 * scale,
+                 'Avg_Monthly_Revenue': 2.0 * scale, 'Avg_Monthly_Profit': 1.0 * scale})
+    return {'Moderate': data, 'Optimistic': dict(data)}
+
+
+def visible_files(directory):
+    return sorted(name for name in os.listdir(directory) if not name.startswith(fe.MANIFEST_NAME))
+
+
+def test_export_writes_one_file_per_scenario_and_records_absolute_paths(tmp_path):
+    with ForecastExporter(str(tmp_path), months_ahead=3) as exporter:
+        exporter.add(forecast(), entity='a')
+        exporter.add(forecast(2.0), entity='b')
+    assert len(exporter.paths) == 3
+    assert all(os.path.isabs(path) and os.path.exists(path) for path in exporter.paths)
+    assert exporter.key == forecast_key({'a': forecast(), 'b': forecast(2.0)}, months_ahead=3)
+
+    with open(tmp_path / fe.MANIFEST_NAME, encoding='utf-8') as fh:
+        entries = json.load(fh)
+    assert entries[exporter.key]['files'] == exporter.paths
+
+
+def test_failed_with_block_publishes_nothing(tmp_path):
+    with pytest.raises(RuntimeError):
+        with ForecastExporter(str(tmp_path), batch_rows=1) as exporter:
+            exporter.add(forecast(), entity='a')
+            raise RuntimeError("forecast failed")
+    assert visible_files(tmp_path) == []
+    assert ExportManifest(str(tmp_path)).entries == {}
+
+
+def test_failed_write_removes_partial_files(tmp_path, monkeypatch):
+    def failing_summary(self, *args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(fe.pd.DataFrame, 'to_csv', failing_summary, raising=True)
+    exporter = ForecastExporter(str(tmp_path))
+    exporter.add(forecast(), entity='a')
+    with pytest.raises(OSError):
+        exporter.close()
+    assert visible_files(tmp_path) == []
+    assert ExportManifest(str(tmp_path)).entries == {}
+
+
+def test_identical_rerun_publishes_nothing(tmp_path):
+    with ForecastExporter(str(tmp_path)) as first:
+        first.add(forecast(), entity='a')
+    before = {name: os.stat(tmp_path / name).st_mtime_ns for name in visible_files(tmp_path)}
+
+    with ForecastExporter(str(tmp_path)) as second:
+        second.add(forecast(), entity='a')
+    assert second.reused and second.paths == first.paths
+    assert {name: os.stat(tmp_path / name).st_mtime_ns for name in visible_files(tmp_path)} == before
+
+
+def test_add_streams_each_entity_to_disk(tmp_path):
+    exporter = ForecastExporter(str(tmp_path), batch_rows=1)
+    exporter.add(forecast(), entity='a')
+    partial = [name for name in os.listdir(tmp_path) if name.startswith('.forecast_moderate')]
+    assert len(partial) == 1
+    exporter._csv['forecast_moderate'].flush()
+    with open(tmp_path / partial[0], encoding='utf-8') as fh:
+        assert len(fh.read().splitlines()) == 4
+    exporter.add(forecast(2.0), entity='b')
+    assert exporter._pending == {}
+    exporter.close()
+    with open(next(path for path in exporter.paths if 'forecast_moderate' in path), encoding='utf-8') as fh:
+        assert len(fh.read().splitlines()) == 7
+
+
+def _record_exports(args):
+    output_dir, worker = args
+    for index in range(20):
+        ExportManifest(output_dir).record(f'{worker}-{index}', [f'{worker}-{index}.csv'])
+
+
+def test_concurrent_workers_keep_every_manifest_entry(tmp_path):
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        list(executor.map(_record_exports, [(str(tmp_path), worker) for worker in range(4)]))
+    assert len(ExportManifest(str(tmp_path)).entries) == 80
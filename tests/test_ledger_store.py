@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from conftest import SAMPLE_LEDGER
+from financial_metrics import FinancialFrame, load_ledger
+from ledger_store import LedgerStore
+
+
+@pytest.fixture
+def store():
+    with LedgerStore(':memory:') as store:
+        yield store
+
+
+@pytest.fixture
+def gap_ledger(tmp_path):
+    """The sample ledger with the May 2025 opex cell left empty"""
+    lines = open(SAMPLE_LEDGER, encoding='utf-8').read().splitlines()
+    for index, line in enumerate(lines):
+        if line.startswith('May-25'):
+            cells = line.split(',')
+            cells[3] = ''
+            lines[index] = ','.join(cells)
+    path = tmp_path / 'gap.csv'
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def test_ingest_round_trips_postings_exactly(store):
+    entity, rows, ingested = store.ingest(SAMPLE_LEDGER)
+    assert (entity, rows, ingested) == ('agent_test', 36, True)
+    assert store.ingest(SAMPLE_LEDGER)[2] is False
+
+    csv = load_ledger(SAMPLE_LEDGER, store=False)
+    postings = store.postings(entity)
+    for column in ('revenue', 'opex', 'tax', 'fianance cost', 'sg@a'):
+        np.testing.assert_array_equal(postings[column].to_numpy(), csv[column].to_numpy())
+
+
+def test_aggregates_match_the_frame(store):
+    entity = store.ingest(SAMPLE_LEDGER)[0]
+    frame = FinancialFrame(load_ledger(SAMPLE_LEDGER, store=False))
+    assert store.quarterly(entity)['net_profit_after_tax'].sum() == pytest.approx(
+        frame['net_profit_after_tax'].sum(), abs=1e-4)
+    assert store.value(entity, 'revenue', 2025, month=1) == 3000.0
+    assert store.value(entity, 'fianance cost', 2025, quarter=1) == 360.0
+
+
+def test_missing_amount_is_stored_as_null(store, gap_ledger):
+    entity, rows, _ = store.ingest(gap_ledger)
+    assert rows == 36
+    postings = store.postings(entity)
+    assert postings['opex'].isna().sum() == 1
+    may = store.monthly(entity).loc['2025-05']
+    assert np.isnan(may['opex']) and np.isnan(may['net_profit_after_tax'])
+    assert may['revenue'] == 8000.0
+
+    frame = FinancialFrame(load_ledger(gap_ledger, store=False))
+    assert store.quarterly(entity)['net_profit_after_tax'].sum() == pytest.approx(
+        frame['net_profit_after_tax'].sum(), abs=1e-4)
+
+
+def test_load_reads_through_the_store(store, gap_ledger):
+    df = store.load(gap_ledger)
+    assert len(df) == 36 and df['opex'].isna().sum() == 1
+
+
+def test_same_file_name_in_two_directories_needs_an_explicit_entity(store, tmp_path):
+    for directory in ('a', 'b'):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / 'ledger.csv').write_text(open(SAMPLE_LEDGER, encoding='utf-8').read(),
+                                                         encoding='utf-8')
+    assert store.ingest(str(tmp_path / 'a' / 'ledger.csv'))[0] == 'ledger'
+    with pytest.raises(ValueError, match='explicit entity'):
+        store.ingest(str(tmp_path / 'b' / 'ledger.csv'))
+    assert store.ingest(str(tmp_path / 'b' / 'ledger.csv'), entity='b-ledger')[2] is True
+    assert [entry['entity'] for entry in store.entities()] == ['b-ledger', 'ledger']
+    assert store.ingest(str(tmp_path / 'a' / 'ledger.csv'))[2] is False
+
+
+def test_amount_beyond_the_fixed_point_range_fails_clearly(store):
+    df = load_ledger(SAMPLE_LEDGER, store=False)
+    store.ingest_frame('acme', df)
+    huge = df.assign(revenue=df['revenue'] * 1e9)
+    with pytest.raises(OverflowError, match="'acme'.*'revenue'"):
+        store.ingest_frame('acme', huge)
+    assert store.value('acme', 'revenue', 2025, month=1) == 3000.0
+
+    many = df.loc[df.index.repeat(3000)].assign(revenue=8e11)
+    with pytest.raises(OverflowError, match="'acme'"):
+        store.ingest_frame('acme', many)
@@ -0,0 +1,61 @@
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import llm_client_pool
+from llm_client_pool import LLMClientPool, PoolMetrics
+
+
+def test_metrics_count_requests_connections_and_reuse():
+    metrics = PoolMetrics()
+    metrics.trace('connection.connect_tcp.complete', {})
+    metrics.trace('connection.start_tls.complete', {})
+    for _ in range(3):
+        metrics.trace('http11.send_request_headers.started', {})
+    metrics.trace('http2.send_request_headers.started', {})
+    metrics.trace('http11.receive_response_body.complete', {})
+    summary = metrics.summary()
+    assert (summary['requests'], summary['connections'], summary['tls_handshakes']) == (4, 1, 1)
+    assert summary['http2_requests'] == 1
+    assert summary['reused'] == 3 and summary['reuse_ratio'] == 0.75
+
+
+def test_shared_pool_is_one_instance_per_process(monkeypatch):
+    monkeypatch.setattr(llm_client_pool, '_shared', None)
+    assert llm_client_pool.shared_pool() is llm_client_pool.shared_pool()
+
+
+def test_install_reports_missing_litellm(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'litellm', None)
+    assert LLMClientPool(http2=False).install() is False
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_requests_reuse_one_kept_alive_connection():
+    pytest.importorskip('httpx')
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _OkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    pool = LLMClientPool(http2=False)
+    try:
+        for _ in range(3):
+            assert pool.client.get(f'http://127.0.0.1:{server.server_address[1]}/').text == 'ok'
+        summary = pool.summary()
+        assert (summary['requests'], summary['connections'], summary['reused']) == (3, 1, 2)
+    finally:
+        pool.close()
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,145 @@
+import threading
+
+import pytest
+
+import llm_scheduler
+from llm_scheduler import LLMScheduler, TokenBucket, estimate_tokens, prompt_key
+
+
+class FakeClock:
+    """monotonic() and sleep() of llm_scheduler; waiting advances the clock instead of blocking"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeCondition(threading.Condition):
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+        self.waits = []
+
+    def wait(self, timeout=None):
+        assert timeout is not None, "a single caller would wait forever"
+        self.waits.append(timeout)
+        self.clock.sleep(timeout)
+        return False
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__('rate limited')
+        self.response = type('Response', (), {'headers': {'retry-after': str(retry_after)}})()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_scheduler.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(llm_scheduler.time, 'sleep', clock.sleep)
+    return clock
+
+
+def scheduler_on(clock, **options):
+    scheduler = LLMScheduler(seed=0, **options)
+    scheduler._cond = FakeCondition(clock)
+    return scheduler
+
+
+def test_token_bucket_refills_up_to_its_burst():
+    bucket = TokenBucket(60, burst_seconds=10)
+    bucket.updated = 0.0
+    assert bucket.capacity == 10
+    bucket.take(10, 0.0)
+    assert bucket.delay(1, 0.0) == pytest.approx(1.0)
+    assert bucket.delay(1, 0.5) == pytest.approx(0.5)
+    assert bucket.delay(1, 100.0) == 0.0
+    assert bucket.level == 10
+    # A request larger than the bucket waits for a full bucket, not forever
+    bucket.take(10, 100.0)
+    assert bucket.delay(50, 100.0) == pytest.approx(10.0)
+
+
+def test_requests_beyond_the_burst_are_spaced_at_the_rate(clock):
+    scheduler = scheduler_on(clock, rpm=60, tpm=1e9)
+    started = []
+    for _ in range(12):
+        scheduler.submit(lambda: started.append(clock.now))
+    assert started[:10] == [1000.0] * 10
+    assert started[10:] == pytest.approx([1001.0, 1002.0])
+    assert scheduler.summary()['wait_seconds'] == pytest.approx(2.0)
+
+
+def test_token_limit_delays_large_prompts(clock):
+    scheduler = scheduler_on(clock, rpm=1e6, tpm=600)
+    scheduler.submit(lambda: None, tokens=100)
+    scheduler.submit(lambda: None, tokens=10)
+    assert clock.now == pytest.approx(1001.0)
+
+
+def test_rate_limit_pauses_for_retry_after_and_retries(clock):
+    scheduler = scheduler_on(clock, rpm=1e6, tpm=1e9)
+    attempts = []
+
+    def call():
+        attempts.append(clock.now)
+        if len(attempts) == 1:
+            raise RateLimited(7)
+        return 'answer'
+
+    assert scheduler.submit(call) == 'answer'
+    assert attempts[1] - attempts[0] == pytest.approx(7.0)
+    stats = scheduler.summary()
+    assert (stats['retries'], stats['rate_limited']) == (1, 1)
+
+
+def test_non_retryable_errors_are_raised_at_once(clock):
+    scheduler = scheduler_on(clock)
+    calls = []
+
+    def call():
+        calls.append(1)
+        raise ValueError('bad request')
+
+    with pytest.raises(ValueError):
+        scheduler.submit(call)
+    assert len(calls) == 1 and scheduler.summary()['running'] == 0
+
+
+def test_identical_requests_in_flight_share_one_call():
+    scheduler = LLMScheduler()
+    release, entered = threading.Event(), threading.Event()
+    calls, answers = [], []
+
+    def call():
+        calls.append(1)
+        entered.set()
+        release.wait(5)
+        return 'answer'
+
+    key = prompt_key('gpt-4', [{'role': 'user', 'content': 'hi'}])
+    leader = threading.Thread(target=lambda: answers.append(scheduler.submit(call, key=key)))
+    leader.start()
+    assert entered.wait(5)
+    follower = threading.Thread(target=lambda: answers.append(scheduler.submit(call, key=key)))
+    follower.start()
+    while scheduler.summary()['coalesced'] == 0:
+        threading.Event().wait(0.01)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert answers == ['answer', 'answer'] and len(calls) == 1
+
+
+def test_estimate_tokens_counts_characters_and_completion_budget():
+    messages = [{'role': 'system', 'content': 'x' * 40}, {'role': 'user', 'content': None}]
+    assert estimate_tokens(messages, 100) == 110
+    assert estimate_tokens('y' * 8, 0) == 2
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import money
+from money import MONEY_SCALE, check_sum_bound, compound, from_units, subtract, to_units, total
+
+
+def test_to_units_rounds_half_to_even_at_fourth_decimal():
+    np.testing.assert_array_equal(to_units([1454.775, 0.00005, 0.00025, 0.00035, -2.5]),
+                                  [14547750, 0, 2, 4, -25000])
+    assert isinstance(to_units(1.5), np.int64)
+
+
+def test_decimal_arithmetic_is_exact():
+    units = to_units([0.1, 0.2])
+    assert total(units) == 0.3
+    assert from_units(subtract(to_units(1454.775), to_units(0.005))) == 1454.77
+
+
+def test_missing_amount_raises_value_error():
+    with pytest.raises(ValueError):
+        to_units([1.0, np.nan])
+
+
+def test_amount_beyond_exact_range_raises_overflow_error():
+    with pytest.raises(OverflowError):
+        to_units([1e12])
+
+
+def test_sum_bound_rejects_totals_that_would_wrap_around():
+    units = np.full(20_000, to_units(5e11))
+    with pytest.raises(OverflowError):
+        check_sum_bound(units)
+    with pytest.raises(OverflowError):
+        total(units)
+    check_sum_bound(units[:10])
+    assert total(units[:10]) == 5e12
+
+
+def test_compound_rounds_each_period_from_the_base():
+    units = compound(to_units(100.0), 0.1, 3)
+    np.testing.assert_array_equal(units, to_units([110.0, 121.0, 133.1]))
+    assert units.dtype == money.MONEY_DTYPE and MONEY_SCALE == 10_000
+
+
+def test_growth_past_the_range_raises_instead_of_wrapping():
+    with np.errstate(invalid='raise'):
+        with pytest.raises(OverflowError):
+            compound(to_units(1e7), 2.4, 60)
+        with pytest.raises(OverflowError):
+            money.round_units([1.0, 1e30])
+        with pytest.raises(ValueError):
+            money.round_units([np.nan])
+
+
+def test_sum_bound_does_not_trust_abs_of_the_int64_minimum():
+    with pytest.raises(OverflowError):
+        check_sum_bound(np.array([np.iinfo(np.int64).min, 1], dtype=np.int64))
@@ -0,0 +1,37 @@
+import matplotlib.image as mpimg
+import pytest
+
+from chart_cache import ChartCache
+from conftest import SAMPLE_LEDGER
+from create_visualizations import chart_path, load_and_prepare_data, render_chart
+
+CHART = '03_quarterly_revenue'
+
+
+@pytest.fixture(scope='module')
+def data():
+    return load_and_prepare_data(SAMPLE_LEDGER)
+
+
+def test_vector_profiles_write_svg_and_pdf(data, tmp_path):
+    svg = render_chart(data, CHART, output_dir=str(tmp_path), profile='svg')
+    pdf = render_chart(data, CHART, output_dir=str(tmp_path), profile='pdf')
+    assert svg.endswith(f'{CHART}.svg') and pdf.endswith(f'{CHART}.pdf')
+    assert b'<svg' in open(svg, 'rb').read(4096)
+    assert open(pdf, 'rb').read(5) == b'%PDF-'
+
+
+def test_raster_profiles_scale_with_their_dpi(data, tmp_path):
+    heights = {profile: mpimg.imread(render_chart(data, CHART, output_dir=str(tmp_path), profile=profile)).shape[0]
+               for profile in ('print', 'preview', 'thumbnail')}
+    assert heights['print'] > heights['preview'] > heights['thumbnail']
+    assert heights['print'] / heights['preview'] == pytest.approx(300 / 72, rel=0.05)
+
+
+def test_profiles_do_not_share_cache_entries(data, tmp_path):
+    cache = ChartCache(str(tmp_path / 'cache'))
+    for profile in ('preview', 'svg', 'preview'):
+        render_chart(data, CHART, output_dir=str(tmp_path / 'out'), cache=cache, profile=profile)
+    assert (cache.hits, cache.misses) == (1, 2)
+    with pytest.raises(KeyError):
+        chart_path(str(tmp_path), CHART, profile='jpeg')
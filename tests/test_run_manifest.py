@@ -0,0 +1,76 @@
+import os
+
+import pandas as pd
+import pytest
+
+from run_manifest import RunManifest, frame_digest, run_fingerprint
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    with RunManifest(str(tmp_path / 'manifest.db')) as store:
+        yield store
+
+
+def producer(path, calls):
+    def produce():
+        calls.append(path)
+        with open(path, 'w') as fh:
+            fh.write('report')
+        return [path]
+    return produce
+
+
+def test_fingerprint_covers_inputs_and_parameters():
+    base = run_fingerprint('detailed_results', {'ledger': 'abc'}, discount_rate=0.06, months_ahead=60)
+    assert base == run_fingerprint('detailed_results', {'ledger': 'abc'}, months_ahead=60, discount_rate=0.06)
+    assert base != run_fingerprint('detailed_results', {'ledger': 'abc'}, discount_rate=0.08, months_ahead=60)
+    assert base != run_fingerprint('detailed_results', {'ledger': 'abd'}, discount_rate=0.06, months_ahead=60)
+    assert base != run_fingerprint('crew', {'ledger': 'abc'}, discount_rate=0.06, months_ahead=60)
+
+
+def test_frame_digest_ignores_the_index_only():
+    df = pd.DataFrame({'revenue': [1.0, 2.0], 'opex': [0.5, 0.5]})
+    assert frame_digest(df) == frame_digest(df.set_axis([10, 11]))
+    assert frame_digest(df) != frame_digest(df.assign(revenue=[1.0, 2.5]))
+    assert frame_digest(df) != frame_digest(df.rename(columns={'opex': 'tax'}))
+
+
+def test_second_run_reuses_the_recorded_artifacts(manifest, tmp_path):
+    calls = []
+    produce = producer(str(tmp_path / 'report.md'), calls)
+    first, reused_first = manifest.run_once('crew', 'fp', {'model': 'gpt-4'}, produce)
+    second, reused_second = manifest.run_once('crew', 'fp', {'model': 'gpt-4'}, produce)
+    assert (reused_first, reused_second) == (False, True)
+    assert first == second == [str(tmp_path / 'report.md')] and len(calls) == 1
+    assert manifest.history('crew')[0]['params'] == {'model': 'gpt-4'}
+
+
+def test_missing_artifact_runs_again(manifest, tmp_path):
+    calls = []
+    produce = producer(str(tmp_path / 'report.md'), calls)
+    manifest.run_once('crew', 'fp', {}, produce)
+    os.remove(tmp_path / 'report.md')
+    assert manifest.lookup('crew', 'fp') is None
+    assert manifest.run_once('crew', 'fp', {}, produce)[1] is False
+    assert len(calls) == 2
+
+
+def test_failed_run_releases_its_claim(manifest):
+    def produce():
+        raise RuntimeError('crew failed')
+
+    with pytest.raises(RuntimeError):
+        manifest.run_once('crew', 'fp', {}, produce)
+    assert manifest.history() == []
+
+
+def test_fresh_claim_of_another_node_is_respected_until_it_goes_stale(tmp_path):
+    path = str(tmp_path / 'manifest.db')
+    with RunManifest(path) as node_a, RunManifest(path, claim_timeout=3600) as node_b:
+        node_b.owner = ('other-host', 1)
+        assert node_a.claim('crew', 'fp')
+        assert not node_b.claim('crew', 'fp')
+        node_a.conn.execute("UPDATE runs SET started = started - 7200")
+        assert node_b.claim('crew', 'fp')
+        assert node_b.history()[0]['host'] == 'other-host'
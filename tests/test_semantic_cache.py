@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import semantic_cache as sc
+
+
+def ledger(revenue, dates=('2025-01-01', '2025-01-15', '2025-02-01')):
+    return pd.DataFrame({
+        'date': pd.to_datetime(list(dates)),
+        'revenue': revenue,
+        'opex': [100.0, np.nan, 50.0],
+        'tax': 0.0,
+        'fianance cost': 0.0,
+        'sg@a': 0.0,
+    })
+
+
+def test_ledger_rows_sums_postings_per_month():
+    rows = sc.ledger_rows(ledger([1000.0, 2000.0, 3000.0]))
+    assert list(rows) == ['2025-01', '2025-02']
+    assert rows['2025-01']['revenue'] == 3000.0
+    assert rows['2025-01']['opex'] == 100.0
+    assert rows['2025-01']['postings'] == 2
+    assert rows['2025-01']['missing'] == 1
+
+
+def test_change_to_earlier_posting_in_month_is_a_delta():
+    before = sc.ledger_rows(ledger([1000.0, 2000.0, 3000.0]))
+    after = sc.ledger_rows(ledger([1500.0, 2000.0, 3000.0]))
+    delta = sc.ledger_delta(before, after)
+    assert list(delta['changed']) == ['2025-01']
+    assert sc.delta_size(delta) == 1
+
+
+def test_new_month_is_added():
+    before = sc.ledger_rows(ledger([1000.0, 2000.0, 3000.0]).iloc[:2])
+    after = sc.ledger_rows(ledger([1000.0, 2000.0, 3000.0]))
+    delta = sc.ledger_delta(before, after)
+    assert list(delta['added']) == ['2025-02'] and not delta['changed'] and not delta['removed']
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with sc.SemanticCache(str(tmp_path / 'cache.db'), embedder=sc.HashingEmbedder()) as cache:
+        yield cache
+
+
+def test_lookup_reuses_answer_for_small_delta(cache):
+    description = "Calculate net profit after tax. " * 5
+    before = sc.ledger_rows(ledger([1000.0, 2000.0, 3000.0]).iloc[:2])
+    after = sc.ledger_rows(ledger([1000.0, 2000.0, 3000.0]))
+    cache.store('math_analysis', description, before, 'gpt-4', 3, 'previous answer', entity='acme')
+
+    match = cache.lookup('math_analysis', description, after, 'gpt-4', 3, entity='acme')
+    assert match is not None and match['output'] == 'previous answer'
+    assert list(match['delta']['added']) == ['2025-02']
+    # Other models, prompt versions and entities are not reused
+    assert cache.lookup('math_analysis', description, after, 'gpt-3.5-turbo', 3, entity='acme') is None
+    assert cache.lookup('math_analysis', description, after, 'gpt-4', 4, entity='acme') is None
+    assert cache.lookup('math_analysis', description, after, 'gpt-4', 3, entity='other') is None
+
+
+def test_lookup_rejects_ledger_with_too_many_changed_months(cache):
+    description = "Forecast net profit. " * 5
+    rows = {f'2025-{month:02d}': {'revenue': 1000.0 * month} for month in range(1, 13)}
+    scaled = {month: {'revenue': values['revenue'] * 1.1} for month, values in rows.items()}
+    cache.store('forecasting', description, rows, 'gpt-4', 3, 'answer')
+    assert cache.lookup('forecasting', description, scaled, 'gpt-4', 3) is None
+
+
+def test_store_keeps_newest_entries(tmp_path):
+    with sc.SemanticCache(str(tmp_path / 'cache.db'), embedder=sc.HashingEmbedder(), max_entries=3) as cache:
+        rows = {'2025-01': {'revenue': 1.0}}
+        for index in range(5):
+            cache.store('validation', 'd', rows, 'gpt-4', 3, f'answer {index}')
+        outputs = [row[0] for row in cache.conn.execute("SELECT output FROM entries ORDER BY id")]
+    assert outputs == ['answer 2', 'answer 3', 'answer 4']
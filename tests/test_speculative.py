@@ -0,0 +1,109 @@
+import json
+import types
+from contextlib import contextmanager
+
+import pytest
+
+import financial_analysis_crew
+from conftest import SAMPLE_LEDGER
+from financial_metrics import load_ledger
+from financial_tools import FinancialToolkit
+from speculative import SpeculativeRun, UsageMeter, reference_figures
+
+STAGES = ['math_analysis', 'npv_visualization']
+
+
+class FakeLLM:
+    def __init__(self, answer):
+        self.answer = answer
+        self.prompts = []
+
+    def call(self, messages, *args, **kwargs):
+        self.prompts.append(messages)
+        return self.answer(messages) if callable(self.answer) else self.answer
+
+
+class FakeCrew:
+    """Runs the stages in order like a sequential crewai kickoff, passing each raw output on as context"""
+
+    def __init__(self, drafts):
+        self.tasks = {
+            'math_analysis': types.SimpleNamespace(description='math', expected_output='- net_profit_after_tax: total'),
+            'npv_visualization': types.SimpleNamespace(description='npv', expected_output='- summary: text'),
+        }
+        self.stages = STAGES
+        self.agents = {stage: types.SimpleNamespace(llm=FakeLLM(drafts[stage])) for stage in STAGES}
+        self.toolkit = FinancialToolkit()
+        self.scheduler = None
+        self.contexts = []
+
+    def run_analysis(self, financial_data, entity=None, on_task=None):
+        self.toolkit.bind(financial_data)
+        context = ''
+        for stage in self.stages:
+            self.contexts.append(context)
+            output = types.SimpleNamespace(raw=self.agents[stage].llm.call([{'role': 'user', 'content': context}]))
+            on_task(stage, output)
+            context = output.raw
+
+
+@pytest.fixture
+def ledger():
+    return load_ledger(SAMPLE_LEDGER, store=False)
+
+
+@pytest.fixture
+def speculative_crew(monkeypatch):
+    def install(drafts, repair):
+        crew = FakeCrew(drafts)
+
+        class Pool:
+            @contextmanager
+            def acquire(self):
+                yield crew
+
+        monkeypatch.setattr(financial_analysis_crew, 'shared_crew_pool', lambda *args, **kwargs: Pool())
+        verifier = FakeLLM(repair)
+        run = SpeculativeRun(llm_verify=False)
+        monkeypatch.setattr(run, '_verifier_llm', lambda scheduler: verifier)
+        return run, crew, verifier
+    return install
+
+
+def test_failing_field_is_repaired_before_the_next_task(ledger, speculative_crew):
+    expected = reference_figures(FinancialToolkit(ledger))[('math_analysis', 'net_profit_after_tax')][0][0]
+    run, crew, verifier = speculative_crew(
+        {'math_analysis': '{"net_profit_after_tax": 1}', 'npv_visualization': '{"summary": "ok"}'},
+        json.dumps({'net_profit_after_tax': expected}))
+
+    result = run.run(ledger)
+
+    assert result['tasks']['math_analysis']['escalated'] == ['net_profit_after_tax']
+    assert result['outputs']['math_analysis']['net_profit_after_tax'] == expected
+    # The dependent task was drafted from the repaired answer, not the draft
+    assert json.loads(crew.contexts[1])['net_profit_after_tax'] == expected
+    assert result['tasks']['npv_visualization']['escalated'] == []
+    assert result['verify_calls'] == len(verifier.prompts) == 1
+
+
+def test_accepted_drafts_make_no_verify_calls(ledger, speculative_crew):
+    expected = reference_figures(FinancialToolkit(ledger))[('math_analysis', 'net_profit_after_tax')][0][0]
+    draft = json.dumps({'net_profit_after_tax': expected})
+    run, crew, verifier = speculative_crew({'math_analysis': draft, 'npv_visualization': '{"summary": "ok"}'}, '{}')
+
+    result = run.run(ledger)
+
+    assert result['acceptance_rate'] == 1.0
+    assert crew.contexts[1] == draft
+    assert result['verify_calls'] == 0 and result['tokens']['verify'] == 0
+    assert result['tokens']['draft'] > 0
+
+
+def test_usage_meter_counts_calls_and_restores_the_llm():
+    llm = FakeLLM('x' * 40)
+    call = llm.call
+    meter = UsageMeter()
+    with meter.metering([llm, llm, None]):
+        llm.call([{'role': 'user', 'content': 'y' * 80}])
+    assert (meter.calls, meter.tokens) == (1, 30)
+    assert llm.call == call
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from conftest import SAMPLE_LEDGER
+from financial_metrics import FinancialFrame, load_ledger
+from validation_gates import STAGES, check_npv_consistency, evaluate_gates
+
+
+@pytest.fixture(scope='module')
+def ledger():
+    return load_ledger(SAMPLE_LEDGER, store=False)
+
+
+def test_clean_ledger_skips_validation_only(ledger):
+    report = evaluate_gates(ledger)
+    assert all(check['passed'] for check in report['checks'].values())
+    assert report['stages'] == [stage for stage in STAGES if stage != 'validation']
+
+
+def test_out_of_order_postings_fail_npv_consistency(ledger):
+    shuffled = ledger.sample(frac=1, random_state=1)
+    assert not check_npv_consistency(FinancialFrame(shuffled))['passed']
+    assert 'validation' in evaluate_gates(shuffled)['stages']
+
+
+def test_missing_amount_needs_validation(ledger):
+    broken = ledger.copy()
+    broken.loc[broken.index[3], 'opex'] = np.nan
+    report = evaluate_gates(broken)
+    assert not report['checks']['nan_rows']['passed']
+    assert not report['checks']['npv_consistency']['passed']
+    assert 'validation' in report['stages']
+
+
+def test_loss_needs_validation(ledger):
+    loss = ledger.copy()
+    loss.loc[loss.index[0], 'opex'] = 1e6
+    report = evaluate_gates(loss)
+    assert not report['checks']['negative_margins']['passed']
+    assert 'validation' in report['stages']
+
+
+def test_short_history_skips_forecasting(ledger):
+    report = evaluate_gates(ledger.iloc[:6])
+    assert 'forecasting' in report['skipped']
+    assert 'forecasting' not in report['stages']
+
+
+def test_month_gap_fails_completeness(ledger):
+    report = evaluate_gates(ledger.drop(index=ledger.index[5]))
+    assert not report['checks']['completeness']['passed']
+
+
+def test_empty_ledger_runs_every_stage(ledger):
+    report = evaluate_gates(ledger.iloc[:0])
+    assert report['stages'] == STAGES
@@ -0,0 +1,339 @@
+# Lightweight Tracing Spans
+# מדידת זמנים לפי שלבי הריצה
+
+import atexit
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# Optional sampling profiler
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+# Environment switches: FINANCIAL_TRACE=<trace.json> enables tracing for the
+# whole process; FINANCIAL_TRACE_PROFILE=<stage,stage> profiles those stages
+TRACE_ENV = 'FINANCIAL_TRACE'
+PROFILE_ENV = 'FINANCIAL_TRACE_PROFILE'
+
+# Stage categories used by the instrumented modules
+STAGES = ['ingestion', 'metrics', 'forecasting', 'export', 'charts', 'crew_task', 'tool', 'llm']
+
+
+class _NoopSpan:
+    """Shared do-nothing context manager returned while tracing is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    def __init__(self, tracer, name, cat, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.attrs = attrs
+        self._profile = None
+
+    def set(self, **attrs):
+        """Attach attributes discovered while the span is open"""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._profile = self.tracer._start_profile(self.name, self.cat)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer.record(self.name, self.cat, self.start, end, self.attrs)
+        if self._profile is not None:
+            self.tracer._stop_profile(self._profile, self.name)
+        return False
+
+
+class Tracer:
+    """
+    Collects timing spans and exports them as a Chrome trace or a summary table
+
+    While disabled, span() returns a shared no-op context manager, so
+    instrumented code pays one attribute check and a function call.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.profile_stages = set()
+        self.profile_dir = 'trace_profiles'
+        self.profiler = 'cprofile'
+        self._profiles_written = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # perf_counter is used for spans; wall clock anchors external timestamps (LLM callbacks)
+        self._wall0 = time.time()
+        self._perf0 = time.perf_counter()
+
+    def enable(self, profile_stages=(), profile_dir='trace_profiles', profiler='cprofile'):
+        """
+        Start recording spans
+
+        Args:
+            profile_stages (tuple): Span names or categories to profile while open
+            profile_dir (str): Directory for the profile files
+            profiler (str): 'cprofile' (.prof files) or 'pyinstrument' (.html, if installed)
+        """
+        if profiler == 'pyinstrument' and pyinstrument is None:
+            print("⚠️ pyinstrument is not installed; falling back to cProfile")
+            profiler = 'cprofile'
+        self.enabled = True
+        self.profile_stages = set(profile_stages)
+        self.profile_dir = profile_dir
+        self.profiler = profiler
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+
+    def span(self, name, cat='app', **attrs):
+        """Context manager timing a block of code"""
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name, cat, attrs)
+
+    def record(self, name, cat, start, end, attrs=None):
+        """Add a finished span (start/end in perf_counter seconds)"""
+        event = {
+            'name': name,
+            'cat': cat,
+            'start': start,
+            'end': end,
+            'tid': threading.get_ident(),
+            'args': attrs or {},
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def record_wall(self, name, cat, start_wall, end_wall, attrs=None):
+        """Add a finished span given wall-clock epoch seconds (e.g. from library callbacks)"""
+        offset = self._perf0 - self._wall0
+        self.record(name, cat, start_wall + offset, end_wall + offset, attrs)
+
+    # -- Stage profiling --------------------------------------------------
+
+    def _start_profile(self, name, cat):
+        if not self.profile_stages or (name not in self.profile_stages and cat not in self.profile_stages):
+            return None
+        # Profilers cannot nest; the outermost profiled stage wins
+        if getattr(self._local, 'profiling', False):
+            return None
+        self._local.profiling = True
+        if self.profiler == 'pyinstrument':
+            profile = pyinstrument.Profiler()
+            profile.start()
+        else:
+            profile = cProfile.Profile()
+            profile.enable()
+        return profile
+
+    def _stop_profile(self, profile, name):
+        self._local.profiling = False
+        os.makedirs(self.profile_dir, exist_ok=True)
+        with self._lock:
+            self._profiles_written += 1
+            number = self._profiles_written
+        safe_name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in name)
+        if self.profiler == 'pyinstrument':
+            profile.stop()
+            path = os.path.join(self.profile_dir, f"{number:03d}_{safe_name}.html")
+            with open(path, 'w', encoding='utf-8') as fh:
+                fh.write(profile.output_html())
+        else:
+            profile.disable()
+            path = os.path.join(self.profile_dir, f"{number:03d}_{safe_name}.prof")
+            profile.dump_stats(path)
+
+    # -- Export -----------------------------------------------------------
+
+    def chrome_trace(self):
+        """Return the spans in Chrome trace event format (chrome://tracing, Perfetto)"""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+        return {
+            'traceEvents': [{
+                'name': event['name'],
+                'cat': event['cat'],
+                'ph': 'X',
+                'ts': (event['start'] - self._perf0) * 1e6,
+                'dur': (event['end'] - event['start']) * 1e6,
+                'pid': pid,
+                'tid': event['tid'],
+                'args': event['args'],
+            } for event in events],
+            'displayTimeUnit': 'ms',
+        }
+
+    def export_chrome_trace(self, path='trace.json', file=None):
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump(self.chrome_trace(), fh, default=str)
+        print(f"✅ Trace saved: {path} (open in chrome://tracing or ui.perfetto.dev)", file=file)
+        return path
+
+    def summary(self):
+        """
+        Aggregate spans by name
+
+        Returns:
+            list: Dicts with name, cat, count, total_ms, mean_ms and max_ms, slowest first
+        """
+        with self._lock:
+            events = list(self.events)
+        rows = {}
+        for event in events:
+            duration = (event['end'] - event['start']) * 1000
+            row = rows.setdefault((event['cat'], event['name']), {
+                'name': event['name'], 'cat': event['cat'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            row['count'] += 1
+            row['total_ms'] += duration
+            row['max_ms'] = max(row['max_ms'], duration)
+        for row in rows.values():
+            row['mean_ms'] = row['total_ms'] / row['count']
+        return sorted(rows.values(), key=lambda row: row['total_ms'], reverse=True)
+
+    def print_summary(self, file=None):
+        """Print the span summary table (to stdout, or the given file)"""
+        print(f"\n⏱️ TRACE SUMMARY ({len(self.events)} spans)", file=file)
+        print(f"{'Stage':<12} {'Span':<36} {'Count':>7} {'Total (ms)':>12} {'Mean (ms)':>11} {'Max (ms)':>10}", file=file)
+        print("-" * 93, file=file)
+        for row in self.summary():
+            print(f"{row['cat']:<12} {row['name'][:36]:<36} {row['count']:>7} {row['total_ms']:>12.2f} "
+                  f"{row['mean_ms']:>11.2f} {row['max_ms']:>10.2f}", file=file)
+
+
+TRACER = Tracer()
+
+
+def span(name, cat='app', **attrs):
+    """Time a block with the global tracer: with span('forecast', 'forecasting'): ..."""
+    return TRACER.span(name, cat, **attrs)
+
+
+def traced(name=None, cat='app'):
+    """
+    Decorator recording a span for every call of the decorated function
+
+    Args:
+        name (str, optional): Span name (default: the function's qualified name)
+        cat (str): Stage category (see STAGES)
+    """
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            with TRACER.span(label, cat):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TaskSpanRecorder:
+    """
+    Crew task_callback recording one span per finished task
+
+    CrewAI runs tasks sequentially inside kickoff() and calls task_callback
+    after each one, so every task span runs from the previous callback (or
+    start()) to its own callback.
+    """
+
+    def __init__(self, tracer=None):
+        self.tracer = tracer or TRACER
+        self._last = None
+
+    def start(self):
+        self._last = time.perf_counter()
+        return self
+
+    def __call__(self, output):
+        now = time.perf_counter()
+        if self.tracer.enabled and self._last is not None:
+            agent = getattr(output, 'agent', '') or ''
+            label = getattr(output, 'name', None) or str(getattr(output, 'description', 'task'))[:40]
+            self.tracer.record(f"task: {label}", 'crew_task', self._last, now, {'agent': str(agent)})
+        self._last = now
+
+
+def _litellm_success(kwargs, completion_response, start_time, end_time):
+    """litellm callback recording every LLM call as a span"""
+    if not TRACER.enabled:
+        return
+    usage = getattr(completion_response, 'usage', None)
+    attrs = {'model': kwargs.get('model')}
+    if usage is not None:
+        attrs['prompt_tokens'] = getattr(usage, 'prompt_tokens', None)
+        attrs['completion_tokens'] = getattr(usage, 'completion_tokens', None)
+    TRACER.record_wall(f"llm: {kwargs.get('model')}", 'llm', start_time.timestamp(), end_time.timestamp(), attrs)
+
+
+def instrument_llm_calls():
+    """
+    Record a span for every LLM call made through litellm (the client used by CrewAI)
+
+    Returns:
+        bool: True if the callback was registered
+    """
+    try:
+        import litellm
+    except ImportError:
+        return False
+    if _litellm_success not in litellm.success_callback:
+        litellm.success_callback.append(_litellm_success)
+    return True
+
+
+def enable_tracing(output_path='trace.json', profile_stages=(), profiler='cprofile', summary=True):
+    """
+    Enable the global tracer and write the trace when the process exits
+
+    Args:
+        output_path (str): Chrome trace file written at exit
+        profile_stages (tuple): Stages or span names to profile
+        profiler (str): 'cprofile' or 'pyinstrument'
+        summary (bool): Print the summary table at exit
+    """
+    TRACER.enable(profile_stages=profile_stages, profiler=profiler)
+    instrument_llm_calls()
+
+    # Report on stderr so machine-readable stdout (e.g. JSON output) stays intact
+    def _finish():
+        if TRACER.events:
+            TRACER.export_chrome_trace(output_path, file=sys.stderr)
+            if summary:
+                TRACER.print_summary(file=sys.stderr)
+    atexit.register(_finish)
+
+
+if os.environ.get(TRACE_ENV):
+    enable_tracing(os.environ[TRACE_ENV],
+                   profile_stages=[stage for stage in os.environ.get(PROFILE_ENV, '').split(',') if stage])
@@ -0,0 +1,119 @@
+# Validation Gates for the Crew Stages
+# בדיקות דטרמיניסטיות שקובעות אילו שלבי סוכנים נדרשים
+
+import numpy as np
+
+from financial_metrics import BASE_COLUMNS, COST_COLUMNS, FinancialFrame, as_frame
+
+# Crew stages (task names in FinancialAnalysisCrew.create_tasks), in run order
+STAGES = ['math_analysis', 'npv_visualization', 'forecasting', 'validation']
+# Months of history below which a 5-year forecast is not worth an LLM stage
+MIN_FORECAST_MONTHS = 12
+# Largest accepted difference between the two NPV computations
+NPV_TOLERANCE = 0.01
+# calculate_correct_npv overflows (1 + rate) ** t beyond ~12k periods; only the first postings are compared
+MAX_NPV_TERMS = 10_000
+# Checks whose failure needs the validation agent's review
+QUALITY_CHECKS = ['completeness', 'nan_rows', 'negative_margins', 'npv_consistency']
+
+
+def _check(passed, detail):
+    return {'passed': bool(passed), 'detail': detail}
+
+
+def check_completeness(frame):
+    """Every ledger column present, at least one posting, and no month missing between first and last"""
+    df = frame.data
+    missing_columns = [column for column in BASE_COLUMNS if column not in df.columns]
+    if missing_columns:
+        return _check(False, f"missing columns: {', '.join(missing_columns)}")
+    if df.empty:
+        return _check(False, "no postings")
+    months = df['date'].dt.to_period('M')
+    expected = (months.max() - months.min()).n + 1
+    gaps = expected - months.nunique()
+    return _check(gaps == 0, f"{months.nunique()} of {expected} months present")
+
+
+def check_nan_rows(frame):
+    """No posting with a missing revenue or cost amount"""
+    columns = [column for column in ['revenue'] + COST_COLUMNS if column in frame.data.columns]
+    nan_rows = int(frame.data[columns].isna().any(axis=1).sum())
+    return _check(nan_rows == 0, f"{nan_rows} rows with missing amounts")
+
+
+def check_negative_margins(frame):
+    """No posting with a loss (negative net profit after tax)"""
+    negative = int((frame['net_profit_after_tax'] < 0).sum())
+    return _check(negative == 0, f"{negative} rows with negative margin")
+
+
+def check_npv_consistency(frame, discount_rate=0.06):
+    """
+    The two NPV figures of the detailed report agree
+
+    compute_detailed_results reports calculate_correct_npv over the net
+    profit in ledger (file) order next to the cube's total of the monthly
+    npv_net_profit column, which discounts each posting by its date rank.
+    They disagree when the postings are out of chronological order or a
+    net profit is missing, and the report then shows two different NPVs.
+    """
+    from detailed_results import calculate_correct_npv
+    monthly = FinancialFrame(frame.data, discount_rate=discount_rate, discount_basis='month')
+    profit = monthly['net_profit_after_tax'].to_numpy()[:MAX_NPV_TERMS]
+    reference = calculate_correct_npv(profit, discount_rate)
+    column = monthly['npv_net_profit'].to_numpy()[:MAX_NPV_TERMS]
+    column = column[np.isfinite(column)].sum()
+    difference = abs(reference - column)
+    return _check(difference <= NPV_TOLERANCE,
+                  f"calculate_correct_npv {reference:,.2f} vs npv_net_profit {column:,.2f} (diff {difference:.4f})")
+
+
+def check_history_length(frame, min_months=MIN_FORECAST_MONTHS):
+    """Enough months of history to extrapolate growth"""
+    months = frame.data['date'].dt.to_period('M').nunique() if 'date' in frame.data.columns else 0
+    return _check(months >= min_months, f"{months} months of history (minimum {min_months})")
+
+
+def evaluate_gates(df, discount_rate=0.06, min_forecast_months=MIN_FORECAST_MONTHS):
+    """
+    Run the deterministic checks and decide which crew stages need the LLM
+
+    Forecasting is skipped when the history is too short to extrapolate;
+    validation is skipped when every data quality check passes, since
+    there is nothing left for the validation agent to catch.
+
+    Args:
+        df: DataFrame or FinancialFrame with the ledger
+        discount_rate (float): Annual rate of the NPV consistency check
+        min_forecast_months (int): Months of history the forecasting stage needs
+
+    Returns:
+        dict: 'checks' (name -> passed, detail), 'stages' to run and 'skipped' (stage -> reason)
+    """
+    frame = as_frame(df)
+    checks = {'completeness': check_completeness(frame)}
+    if frame.data.empty or any(column not in frame.data.columns for column in BASE_COLUMNS):
+        # Nothing else can be computed; every stage runs and validation reports the problem
+        return {'checks': checks, 'stages': list(STAGES), 'skipped': {}}
+    checks['nan_rows'] = check_nan_rows(frame)
+    checks['negative_margins'] = check_negative_margins(frame)
+    checks['npv_consistency'] = check_npv_consistency(frame, discount_rate)
+    checks['history_length'] = check_history_length(frame, min_forecast_months)
+
+    skipped = {}
+    if not checks['history_length']['passed']:
+        skipped['forecasting'] = checks['history_length']['detail']
+    if all(checks[name]['passed'] for name in QUALITY_CHECKS):
+        skipped['validation'] = "all data quality checks passed"
+    return {'checks': checks, 'stages': [stage for stage in STAGES if stage not in skipped], 'skipped': skipped}
+
+
+def print_gate_report(report):
+    """Print the checks and the stage decisions"""
+    print("\n🚦 VALIDATION GATES")
+    for name, check in report['checks'].items():
+        print(f"{'✅' if check['passed'] else '❌'} {name:<18} {check['detail']}")
+    for stage, reason in report['skipped'].items():
+        print(f"⏭️ Skipping {stage}: {reason}")
+    print(f"🤖 LLM stages: {len(report['stages'])} of {len(STAGES)}")